@@ -9,11 +9,21 @@ from dotenv import find_dotenv, load_dotenv
 load_dotenv(find_dotenv())
 
 from database.orm_query import orm_update_banner_description
+from database.reference_cache import load_reference_cache
 from middlewares.db import DataBaseSession
+from middlewares.metrics import setup_handler_metrics
 from database.engine import create_db, drop_db, session_maker
 from handlers.user_private import user_private_router
 from handlers.user_group import user_group_router
 from handlers.admin_private import admin_router
+from services.extraction import extraction_executor
+from services.background import cancel_all
+from services.cache_maintenance import start_cache_maintenance
+from services.llm_ledger import ledger
+from services.metrics import start_metrics_server, stop_metrics_server
+from services.rescoring import resume_rescore_jobs
+from services.scoring_queue import scoring_queue
+from services.warmup import start_checklist_backfill
 
 # Настройка логирования
 logging.basicConfig(
@@ -39,6 +49,11 @@ dp.include_router(user_private_router)
 dp.include_router(user_group_router)
 dp.include_router(admin_router)
 
+# Замер времени обработчиков по роутерам (метрики /metrics)
+setup_handler_metrics(user_private_router, "user_private")
+setup_handler_metrics(user_group_router, "user_group")
+setup_handler_metrics(admin_router, "admin_private")
+
 # Создание таблиц в БД при запуске бота, если они еще не были созданы
 async def on_startup(bot) -> None:
     # Если нужно удалить БД, строку ниже необходимо раскомментировать
@@ -52,10 +67,30 @@ async def on_startup(bot) -> None:
         for name, description in description_for_info_pages.items():
             await orm_update_banner_description(session, name, description)
         logger.info("Banner descriptions updated successfully.")
+        # баннеры и категории — в память, меню дальше рисуется без запросов к БД
+        await load_reference_cache(session)
+
+    # Запуск фоновых воркеров оценки резюме
+    await scoring_queue.start(bot, session_maker)
+    # Продолжение пересчётов оценок, прерванных перезапуском
+    await resume_rescore_jobs(bot, session_maker)
+    # Фоновая запись журнала расходов на LLM
+    ledger.start(session_maker)
+    # Отметки попаданий и очистка таблицы llm_cache
+    start_cache_maintenance(session_maker)
+    # Прогрев чек-листов вакансий, которых нет в кэше
+    start_checklist_backfill(session_maker)
+    # Эндпоинт метрик для Prometheus (если задан ATS_METRICS_PORT)
+    await start_metrics_server()
         
 # Оповещение о том, что бот не работает
 async def on_shutdown(bot) -> None:
     logger.info("Bot is shutting down...")
+    await scoring_queue.stop()
+    await ledger.stop()
+    await stop_metrics_server()
+    await cancel_all()
+    extraction_executor.shutdown()
 
 # Функция для запуска бота
 async def main() -> None:
@@ -0,0 +1,304 @@
+"""
+Сквозной бенчмарк оценки резюме: score_resume_api на синтетических вакансиях и PDF
+(с текстовым слоем и «сканах» без него) с записью в локальную БД.
+
+Запуск из корня репозитория:
+    python -m benchmarks.score_bench --resumes 100 --concurrency 1,8,32 --output bench.json
+
+По умолчанию используется LLM_BACKEND=fake и SQLite во временном файле;
+для прогона на Postgres — --db-url postgresql+asyncpg://...
+Результат — JSON (перцентили задержек, пропускная способность, попадания в кэш, пиковый RSS),
+который удобно сравнивать между коммитами.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+
+# конфигурация сервисов читается при импорте — бэкенд выбираем до него
+os.environ.setdefault("LLM_BACKEND", "fake")
+if os.environ["LLM_BACKEND"] == "fake":
+    # лимиты провайдера для fake не нужны; чтобы измерить и их, задайте LLM_RPM/LLM_TPM явно
+    os.environ.setdefault("LLM_RPM", "1000000")
+    os.environ.setdefault("LLM_TPM", "1000000000")
+
+import fitz  # PyMuPDF
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from database.models import Base, Category, User, Vacancy
+from database.orm_query import orm_save_resume
+from services.extraction import extraction_executor
+from services.llm_matching import (
+    backend, cache_stats, rate_limiter_stats, resume_content_sha256, save_resume_score, score_resume_api,
+)
+
+SKILLS = [
+    "python", "django", "fastapi", "postgresql", "redis", "docker", "kubernetes", "kafka", "rabbitmq",
+    "celery", "asyncio", "sqlalchemy", "linux", "nginx", "terraform", "ansible", "grafana", "prometheus",
+    "elasticsearch", "clickhouse", "mongodb", "graphql", "react", "typescript", "golang", "airflow",
+]
+FILLER = (
+    "Worked in a cross-functional team delivering backend services, reviewing code, "
+    "writing documentation and supporting production releases for internal customers."
+)
+BENCH_USER_ID = 1
+
+
+# ===================== синтетические данные =====================
+def make_vacancy(rng: random.Random, idx: int) -> Dict[str, str]:
+    skills = rng.sample(SKILLS, 8)
+    must = [f"Must have {s} experience {rng.randint(1, 5)}+ years" for s in skills[:4]]
+    nice = [f"Nice to have {s} {skills[i + 5]}" for i, s in enumerate(skills[4:7])]
+    return {
+        "name": f"Backend engineer #{idx}",
+        "description": f"Backend engineer #{idx} for a product team.",
+        "requirements": "\n".join(must + nice),
+    }
+
+
+def make_resume_pdf(rng: random.Random, idx: int, scanned: bool) -> bytes:
+    skills = rng.sample(SKILLS, rng.randint(3, 10))
+    lines = [f"Candidate {idx}", f"Backend developer, {rng.randint(1, 12)} years of experience", ""]
+    for s in skills:
+        lines.append(f"- {s}: production projects, {rng.randint(1, 8)} years")
+    lines += ["", *[FILLER] * rng.randint(5, 25)]
+
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 60
+    for line in lines:
+        if y > 800:
+            page = doc.new_page()
+            y = 60
+        page.insert_text((50, y), line[:95], fontsize=10)
+        y += 14
+    if not scanned:
+        return doc.tobytes()
+
+    # «скан»: страницы растеризуются в картинки, текстового слоя нет
+    scan = fitz.open()
+    for src in doc:
+        pix = src.get_pixmap(dpi=100)
+        dst = scan.new_page(width=src.rect.width, height=src.rect.height)
+        dst.insert_image(dst.rect, pixmap=pix)
+    return scan.tobytes()
+
+
+# ===================== измерения =====================
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль по методу ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    ms = [x * 1000.0 for x in latencies]
+    return {
+        "p50": round(percentile(ms, 50), 2),
+        "p95": round(percentile(ms, 95), 2),
+        "p99": round(percentile(ms, 99), 2),
+        "mean": round(sum(ms) / len(ms), 2) if ms else 0.0,
+        "max": round(max(ms), 2) if ms else 0.0,
+    }
+
+
+def _rss_mb_of(pid: int) -> Optional[float]:
+    """Пиковый RSS процесса (VmHWM) из /proc, только Linux."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        return None
+    return None
+
+
+def peak_rss() -> Dict[str, Optional[float]]:
+    self_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    pool = getattr(extraction_executor, "_pool", None)
+    workers = [_rss_mb_of(pid) for pid in (getattr(pool, "_processes", None) or {})]
+    workers = [w for w in workers if w is not None]
+    return {
+        "main_mb": round(self_mb, 1),
+        "extract_worker_max_mb": round(max(workers), 1) if workers else None,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ===================== прогон =====================
+async def setup_db(session_pool: async_sessionmaker, vacancies: List[Dict[str, str]]) -> List[int]:
+    async with session_pool() as session:
+        category = Category(name="Benchmark")
+        session.add(category)
+        session.add(User(user_id=BENCH_USER_ID, first_name="bench"))
+        await session.flush()
+        rows = [Vacancy(category_id=category.category_id, **v) for v in vacancies]
+        session.add_all(rows)
+        await session.commit()
+        return [v.vacancy_id for v in rows]
+
+
+async def upload_one(
+    session_pool: async_sessionmaker, sem: asyncio.Semaphore, vacancy_id: int, idx: int, pdf: bytes
+) -> Tuple[float, Dict[str, Any]]:
+    """Как обработчик загрузки и воркер оценки: запись резюме в БД и score_resume_api."""
+    async with sem:
+        start = time.perf_counter()
+        try:
+            async with session_pool() as session:
+                resume = await orm_save_resume(
+                    session, BENCH_USER_ID, vacancy_id, file_id=f"bench-{idx}", content_sha256=resume_content_sha256(pdf)
+                )
+                result = await score_resume_api(session, vacancy_id, pdf)
+                if "error" not in result:
+                    await save_resume_score(session, resume.resume_id, vacancy_id, result)
+        except Exception as e:
+            result = {"error": f"{e.__class__.__name__}: {e}"}
+        return time.perf_counter() - start, result
+
+
+async def run_pass(
+    name: str,
+    session_pool: async_sessionmaker,
+    concurrency: int,
+    uploads: List[Tuple[int, int, bytes]],
+) -> Dict[str, Any]:
+    sem = asyncio.Semaphore(concurrency)
+    mem_before = cache_stats()
+    calls_before = getattr(backend, "calls", None)
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*[upload_one(session_pool, sem, v, i, pdf) for v, i, pdf in uploads])
+    wall = time.perf_counter() - start
+    mem_after = cache_stats()
+
+    latencies = [lat for lat, _ in outcomes]
+    errors: Dict[str, int] = {}
+    modes: Dict[str, int] = {}
+    for _, result in outcomes:
+        if "error" in result:
+            errors[result["error"]] = errors.get(result["error"], 0) + 1
+        else:
+            mode = result.get("meta", {}).get("input_mode", "unknown")
+            modes[mode] = modes.get(mode, 0) + 1
+
+    hits = mem_after["hits"] - mem_before["hits"]
+    misses = mem_after["misses"] - mem_before["misses"]
+    report: Dict[str, Any] = {
+        "name": name,
+        "concurrency": concurrency,
+        "uploads": len(uploads),
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(len(uploads) / wall, 2) if wall else 0.0,
+        "latency_ms": latency_summary(latencies),
+        "errors": errors,
+        "input_modes": modes,
+        "memory_cache": {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        },
+    }
+    if calls_before is not None:
+        llm_calls = backend.calls - calls_before
+        report["llm_calls"] = llm_calls
+        report["llm_calls_per_upload"] = round(llm_calls / len(uploads), 3) if uploads else 0.0
+    return report
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    db_path = None
+    db_url = args.db_url
+    if not db_url:
+        fd, db_path = tempfile.mkstemp(suffix=".sqlite3", prefix="score_bench_")
+        os.close(fd)
+        db_url = f"sqlite+aiosqlite:///{db_path}"
+
+    connect_args = {"timeout": 30} if db_url.startswith("sqlite") else {}
+    engine = create_async_engine(db_url, connect_args=connect_args)
+    session_pool = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    vacancy_ids = await setup_db(session_pool, [make_vacancy(rng, i) for i in range(args.vacancies)])
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    passes: List[Dict[str, Any]] = []
+    next_idx = 0
+    try:
+        for level in levels:
+            # свои резюме на каждый уровень, чтобы холодный прогон не попадал в кэш предыдущего
+            uploads = []
+            for _ in range(args.resumes):
+                pdf = make_resume_pdf(rng, next_idx, scanned=rng.random() < args.scanned_ratio)
+                uploads.append((rng.choice(vacancy_ids), next_idx, pdf))
+                next_idx += 1
+            passes.append(await run_pass("cold", session_pool, level, uploads))
+            if not args.no_warm:
+                passes.append(await run_pass("warm", session_pool, level, uploads))
+        rss = peak_rss()
+    finally:
+        extraction_executor.shutdown()
+        await engine.dispose()
+        if db_path:
+            os.unlink(db_path)
+
+    return {
+        "commit": git_commit(),
+        "config": {
+            "llm_backend": backend.name,
+            "db": db_url.split("://")[0],
+            "vacancies": args.vacancies,
+            "resumes_per_level": args.resumes,
+            "scanned_ratio": args.scanned_ratio,
+            "seed": args.seed,
+            "env": {k: v for k, v in sorted(os.environ.items()) if k.startswith(("ATS_", "FAKE_LLM_", "LLM_"))},
+        },
+        "passes": passes,
+        "memory_cache": cache_stats(),
+        "rate_limiter": rate_limiter_stats(),
+        "peak_rss": rss,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of score_resume_api")
+    parser.add_argument("--db-url", default=None, help="async SQLAlchemy URL (по умолчанию — временный SQLite)")
+    parser.add_argument("--vacancies", type=int, default=3)
+    parser.add_argument("--resumes", type=int, default=50, help="резюме на каждый уровень конкурентности")
+    parser.add_argument("--concurrency", default="1,8,32", help="уровни одновременных загрузок через запятую")
+    parser.add_argument("--scanned-ratio", type=float, default=0.2, help="доля PDF без текстового слоя")
+    parser.add_argument("--no-warm", action="store_true", help="не делать повторный (тёплый) прогон")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="-", help="файл для JSON-отчёта ('-' — stdout)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Report written to {args.output}", file=sys.stderr)
@@ -0,0 +1,33 @@
+from sqlalchemy import DateTime, LargeBinary, cast, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def upsert_insert(session: AsyncSession, model):
+    """
+    INSERT с поддержкой ON CONFLICT для диалекта сессии:
+    PostgreSQL в боевой базе, SQLite — в локальных бенчмарках.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def byte_length(session: AsyncSession, column):
+    """
+    Длина значения в байтах (length() в обоих диалектах считает символы текста):
+    octet_length в PostgreSQL, length(CAST(... AS BLOB)) в SQLite.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        return func.length(cast(column, LargeBinary))
+    return func.octet_length(column)
+
+
+def naive_now(session: AsyncSession):
+    """
+    now() базы в виде timestamp без часового пояса — так его сохраняют колонки DateTime с default=func.now().
+    В SQLite CURRENT_TIMESTAMP уже без пояса (а CAST к DATETIME дал бы число).
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        return func.now()
+    return cast(func.now(), DateTime)
@@ -1,4 +1,4 @@
-from sqlalchemy import DateTime, String, Text, func, ForeignKey
+from sqlalchemy import BigInteger, Boolean, DateTime, Float, Index, Integer, LargeBinary, String, Text, UniqueConstraint, func, ForeignKey
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 # Класс, наследующийся от класса для таблиц, определенного в SQLAlchemy
@@ -34,6 +34,9 @@ class Cart(Base):
     user: Mapped['User'] = relationship('User', back_populates='carts')
     vacancy: Mapped['Vacancy'] = relationship('Vacancy', back_populates='cart')
 
+# Корзина пользователя: подсчёт и листание по keyset без чтения чужих строк
+Index('ix_cart_user_id', Cart.user_id, Cart.id)
+
 # Таблица "Вакансии", содержит вакансии, добавленные администратором
 class Vacancy(Base):
     __tablename__ = 'vacancy'
@@ -49,6 +52,9 @@ class Vacancy(Base):
     resumes: Mapped[list['Resume']] = relationship('Resume', back_populates='vacancy')
     category: Mapped['Category'] = relationship('Category', back_populates='vacancies')
 
+# Листание вакансий категории в меню (keyset по vacancy_id)
+Index('ix_vacancy_category_vacancy', Vacancy.category_id, Vacancy.vacancy_id)
+
 # Таблица "Резюме", содержащая резюме пользователей
 class Resume(Base):
     __tablename__ = 'resume'
@@ -56,20 +62,62 @@ class Resume(Base):
     user_id: Mapped[int] = mapped_column(ForeignKey('user.user_id', ondelete='CASCADE'), nullable=False) # id пользователя в Telegram
     vacancy_id: Mapped[int] = mapped_column(ForeignKey('vacancy.vacancy_id', ondelete='CASCADE'), nullable=False)
     file_id: Mapped[str] = mapped_column(nullable=False) # id pdf-файла для отправки текста AI
+    content_sha256: Mapped[str] = mapped_column(String(64), nullable=True, index=True) # SHA-256 байтов pdf-файла
     date_receipt: Mapped[DateTime] = mapped_column(DateTime, default=func.now())
 
     vacancy: Mapped['Vacancy'] = relationship('Vacancy', back_populates='resumes')
     user: Mapped['User'] = relationship('User', back_populates='resumes')
-    resume_text: Mapped['ResumeText'] = relationship('ResumeText', back_populates='resume')
-
-# Таблица "Текст резюме" содержит преобразованный из pdf текст отправленных пользователями резюме
+    # Текст общий для всех резюме с одинаковым pdf-файлом, поэтому связь по хэшу, а не по resume_id
+    resume_text: Mapped['ResumeText'] = relationship(
+        'ResumeText',
+        primaryjoin='foreign(Resume.content_sha256) == ResumeText.content_sha256',
+        viewonly=True,
+        uselist=False,
+    )
+
+# Таблица "Текст резюме" содержит преобразованный из pdf текст, адресуемый по SHA-256 байтов pdf-файла
 class ResumeText(Base):
     __tablename__ = 'resume_text'
     text_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    resume_id: Mapped[int] = mapped_column(ForeignKey('resume.resume_id', ondelete='CASCADE'), nullable=False)
+    content_sha256: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    # Пустая строка, если текст извлечь не удалось (тогда оценка идёт по pdf через LLM)
     resume_text: Mapped[str] = mapped_column(Text, nullable=False)
+    extract_method: Mapped[str] = mapped_column(String(16), nullable=False) # pymupdf | ocr | none
 
-    resume: Mapped['Resume'] = relationship('Resume', back_populates='resume_text')
+# Таблица "Оценки резюме": итог последней оценки резюме по его вакансии (для шорт-листов без разбора JSON из llm_cache)
+class ResumeScore(Base):
+    __tablename__ = 'resume_score'
+    resume_id: Mapped[int] = mapped_column(ForeignKey('resume.resume_id', ondelete='CASCADE'), primary_key=True)
+    # дублирует Resume.vacancy_id, чтобы шорт-лист вакансии читался одним индексом
+    vacancy_id: Mapped[int] = mapped_column(ForeignKey('vacancy.vacancy_id', ondelete='CASCADE'), nullable=False)
+    score_overall: Mapped[float] = mapped_column(Float, nullable=False)
+    score_must: Mapped[float] = mapped_column(Float, nullable=False) # subscores.must_have
+    score_optional: Mapped[float] = mapped_column(Float, nullable=False) # subscores.optional
+    input_mode: Mapped[str] = mapped_column(String(24), nullable=True) # local_text | llm_file | prefilter_reject
+    model: Mapped[str] = mapped_column(String(64), nullable=True)
+    prompt_version: Mapped[str] = mapped_column(String(32), nullable=True)
+    rules_version: Mapped[str] = mapped_column(String(32), nullable=True)
+
+    resume: Mapped['Resume'] = relationship('Resume')
+    items: Mapped[list['ResumeScoreItem']] = relationship(
+        'ResumeScoreItem', back_populates='score', cascade='all, delete-orphan', passive_deletes=True,
+    )
+
+# Топ-N вакансии и отбор по порогу must-have — по индексу, без сортировки всей выборки
+Index('ix_resume_score_vacancy_overall', ResumeScore.vacancy_id, ResumeScore.score_overall.desc(), ResumeScore.resume_id)
+Index('ix_resume_score_vacancy_must', ResumeScore.vacancy_id, ResumeScore.score_must.desc(), ResumeScore.resume_id)
+
+# Статус отдельного требования в оценке резюме
+class ResumeScoreItem(Base):
+    __tablename__ = 'resume_score_item'
+    resume_id: Mapped[int] = mapped_column(ForeignKey('resume_score.resume_id', ondelete='CASCADE'), primary_key=True)
+    req_index: Mapped[int] = mapped_column(Integer, primary_key=True) # номер пункта в чек-листе вакансии
+    requirement: Mapped[str] = mapped_column(Text, nullable=False)
+    must: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    status: Mapped[float] = mapped_column(Float, nullable=False) # 1 | 0.5 | 0
+    years: Mapped[float] = mapped_column(Float, nullable=True)
+
+    score: Mapped['ResumeScore'] = relationship('ResumeScore', back_populates='items')
 
 # Таблица "Категории" с информацией о категориях вакансий
 class Category(Base):
@@ -86,4 +134,47 @@ class Category(Base):
 class LLMCache(Base):
     __tablename__ = "llm_cache"
     key: Mapped[str] = mapped_column(String(64), primary_key=True)
-    payload_json: Mapped[str] = mapped_column(Text, nullable=False)
+    # payload хранится либо JSON-текстом (старые записи, ATS_CACHE_FORMAT=json), либо в бинарном виде
+    payload_json: Mapped[str] = mapped_column(Text, nullable=True)
+    payload_bin: Mapped[bytes] = mapped_column(LargeBinary, nullable=True) # байт формата + msgpack (опц. zstd)
+    kind: Mapped[str] = mapped_column(String(32), nullable=True) # requirements | final_score | req_item | ...
+    # версии, от которых зависит запись (NULL — не зависит); записи прежних версий удаляет GC
+    prompt_version: Mapped[str] = mapped_column(String(32), nullable=True)
+    rules_version: Mapped[str] = mapped_column(String(32), nullable=True)
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=True)
+    last_hit_at: Mapped[DateTime] = mapped_column(DateTime, default=func.now(), nullable=True, index=True)
+
+
+# Задание на пересчёт оценок всех резюме вакансии после её изменения (с чекпоинтом для продолжения)
+class RescoreJob(Base):
+    __tablename__ = 'rescore_job'
+    __table_args__ = (UniqueConstraint('vacancy_id', 'vacancy_text_sha'),)
+
+    job_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    vacancy_id: Mapped[int] = mapped_column(ForeignKey('vacancy.vacancy_id', ondelete='CASCADE'), nullable=False)
+    vacancy_text_sha: Mapped[str] = mapped_column(String(64), nullable=False) # версия текста вакансии
+    chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False) # куда присылать прогресс
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default='running') # running | done | superseded
+    last_resume_id: Mapped[int] = mapped_column(default=0) # чекпоинт: все резюме до него включительно обработаны
+    total: Mapped[int] = mapped_column(default=0)
+    scored: Mapped[int] = mapped_column(default=0)
+    failed: Mapped[int] = mapped_column(default=0)
+
+
+# Журнал вызовов LLM (только добавление): расход токенов и стоимость по вакансиям и путям оценки
+class LLMCallLedger(Base):
+    __tablename__ = 'llm_call_ledger'
+    __table_args__ = (Index('ix_llm_call_ledger_created_at', 'created_at'),)
+
+    entry_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    call: Mapped[str] = mapped_column(String(48), nullable=False) # parse_vacancy_requirements | score_requirements_from_text | ...
+    backend: Mapped[str] = mapped_column(String(16), nullable=False) # openai | fake
+    model: Mapped[str] = mapped_column(String(64), nullable=False)
+    mode: Mapped[str] = mapped_column(String(16), nullable=True) # local_text | llm_file (для вызовов скоринга)
+    # без внешнего ключа: расходы по удалённой вакансии остаются в журнале
+    vacancy_id: Mapped[int] = mapped_column(Integer, nullable=True, index=True)
+    input_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    cached_tokens: Mapped[int] = mapped_column(Integer, default=0) # часть input_tokens из кэша промптов
+    output_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    latency_ms: Mapped[int] = mapped_column(Integer, default=0)
+    cost_usd: Mapped[float] = mapped_column(Float, default=0.0) # по ценам LLM_PRICES на момент вызова
@@ -1,9 +1,15 @@
 import logging
-from sqlalchemy import select, update, delete
+from sqlalchemy import and_, case, delete, func, insert, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
 
-from database.models import Banner, ResumeText, User, Cart, Vacancy, Resume, Category
+from database.dialect import byte_length, naive_now, upsert_insert
+from database.reference_cache import (
+    BANNERS, CATEGORIES, VACANCY_COUNTS, cached_banners, cached_categories, cached_vacancy_count, mark_dirty,
+)
+from database.session import commit, rollback
+from database.models import (
+    Banner, LLMCache, LLMCallLedger, RescoreJob, ResumeScore, ResumeScoreItem, ResumeText, User, Cart, Vacancy, Resume, Category,
+)
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -17,44 +23,46 @@ async def orm_add_banner_description(session: AsyncSession, data: dict):
         if result.first():
             return
         session.add_all([Banner(name=name, description=description) for name, description in data.items()])
-        await session.commit()
+        mark_dirty(session, BANNERS)
+        await commit(session)
         logger.info("Banner descriptions added successfully.")
     except Exception as e:
-        await session.rollback()
+        await rollback(session)
         logger.error(f"Error adding banner descriptions: {e}", exc_info=True)
 
 ### Доработать обновление описания баннеров
 async def orm_update_banner_description(session: AsyncSession, name: str, description: str):
     query = update(Banner).where(Banner.name == name).values(description=description)
     await session.execute(query)
-    await session.commit()
+    mark_dirty(session, BANNERS)
+    await commit(session)
 
 
 async def orm_change_banner_image(session: AsyncSession, name: str, image: str):
     try:
         query = update(Banner).where(Banner.name == name).values(image=image)
         await session.execute(query)
-        await session.commit()
+        mark_dirty(session, BANNERS)
+        await commit(session)
         logger.info(f"Banner image for '{name}' changed successfully.")
     except Exception as e:
-        await session.rollback()
+        await rollback(session)
         logger.error(f"Error changing banner image: {e}", exc_info=True)
 
 
+# Баннеры и категории читаются из кэша справочников (database/reference_cache.py)
 async def orm_get_banner(session: AsyncSession, page: str) -> Banner:
     try:
-        query = select(Banner).where(Banner.name == page)
-        result = await session.execute(query)
-        return result.scalar()
+        banners = await cached_banners(session)
+        return banners.get(page)
     except Exception as e:
         logger.error(f"Error fetching banner for page '{page}': {e}", exc_info=True)
 
 
 async def orm_get_info_pages(session: AsyncSession) -> list[Banner]:
     try:
-        query = select(Banner)
-        result = await session.execute(query)
-        return result.scalars().all()
+        banners = await cached_banners(session)
+        return list(banners.values())
     except Exception as e:
         logger.error(f"Error fetching info pages: {e}", exc_info=True)
 
@@ -62,9 +70,7 @@ async def orm_get_info_pages(session: AsyncSession) -> list[Banner]:
 
 async def orm_get_categories(session: AsyncSession) -> list[Category]:
     try:
-        query = select(Category)
-        result = await session.execute(query)
-        return result.scalars().all()
+        return await cached_categories(session)
     except Exception as e:
         logger.error(f"Error fetching categories: {e}", exc_info=True)
 
@@ -76,15 +82,16 @@ async def orm_create_categories(session: AsyncSession, categories: list):
         if result.first():
             return
         session.add_all([Category(name=name) for name in categories])
-        await session.commit()
+        mark_dirty(session, CATEGORIES)
+        await commit(session)
         logger.info("Categories created successfully.")
     except Exception as e:
-        await session.rollback()
+        await rollback(session)
         logger.error(f"Error creating categories: {e}", exc_info=True)
 
 ############################ Админка ######################################
 
-async def orm_add_vacancy(session: AsyncSession, data: dict):
+async def orm_add_vacancy(session: AsyncSession, data: dict) -> Vacancy:
     try:
         obj = Vacancy(
             name=data["name"],
@@ -94,10 +101,12 @@ async def orm_add_vacancy(session: AsyncSession, data: dict):
             category_id=int(data["category"])
         )
         session.add(obj)
-        await session.commit()
+        mark_dirty(session, VACANCY_COUNTS)
+        await commit(session)
         logger.info(f"Vacancy '{data['name']}' added successfully.")
+        return obj
     except Exception as e:
-        await session.rollback()
+        await rollback(session)
         logger.error(f"Error adding vacancy: {e}", exc_info=True)
 
 
@@ -110,6 +119,50 @@ async def orm_get_vacancies(session: AsyncSession, category_id: int) -> list[Vac
         logger.error(f"Error fetching vacancies for category '{category_id}': {e}", exc_info=True)
 
 
+# Страница просмотра вакансий категории: keyset по индексу (category_id, vacancy_id).
+# cursor — vacancy_id граничной вакансии соседней страницы; без курсора — по номеру страницы (OFFSET)
+async def orm_get_vacancy_page(
+    session: AsyncSession,
+    category_id: int,
+    limit: int,
+    offset: int = 0,
+    cursor: int | None = None,
+    backward: bool = False,
+) -> list[Vacancy]:
+    try:
+        query = select(Vacancy).where(Vacancy.category_id == int(category_id))
+        if cursor is None:
+            query = query.order_by(Vacancy.vacancy_id).offset(offset)
+        elif backward:
+            query = query.where(Vacancy.vacancy_id < cursor).order_by(Vacancy.vacancy_id.desc())
+        else:
+            query = query.where(Vacancy.vacancy_id > cursor).order_by(Vacancy.vacancy_id)
+        result = await session.execute(query.limit(limit))
+        rows = result.scalars().all()
+        return rows[::-1] if cursor is not None and backward else rows
+    except Exception as e:
+        logger.error(f"Error fetching vacancy page for category '{category_id}': {e}", exc_info=True)
+        return []
+
+# Число вакансий категории (из кэша справочников)
+async def orm_count_vacancies(session: AsyncSession, category_id: int) -> int:
+    try:
+        return await cached_vacancy_count(session, int(category_id))
+    except Exception as e:
+        logger.error(f"Error counting vacancies for category '{category_id}': {e}", exc_info=True)
+        return 0
+
+
+async def orm_get_all_vacancies(session: AsyncSession) -> list[Vacancy]:
+    try:
+        query = select(Vacancy).order_by(Vacancy.vacancy_id)
+        result = await session.execute(query)
+        return result.scalars().all()
+    except Exception as e:
+        logger.error(f"Error fetching all vacancies: {e}", exc_info=True)
+        return []
+
+
 async def orm_get_vacancy(session: AsyncSession, vacancy_id: int) -> Vacancy:
     try:
         query = select(Vacancy).where(Vacancy.vacancy_id == vacancy_id)
@@ -129,10 +182,12 @@ async def orm_update_vacancy(session: AsyncSession, vacancy_id: int, data: dict)
             category_id=int(data["category"])
         )
         await session.execute(query)
-        await session.commit()
+        # категория могла смениться
+        mark_dirty(session, VACANCY_COUNTS)
+        await commit(session)
         logger.info(f"Vacancy '{vacancy_id}' updated successfully.")
     except Exception as e:
-        await session.rollback()
+        await rollback(session)
         logger.error(f"Error updating vacancy: {e}", exc_info=True)
 
 
@@ -140,10 +195,11 @@ async def orm_delete_vacancy(session: AsyncSession, vacancy_id: int):
     try:
         query = delete(Vacancy).where(Vacancy.vacancy_id == vacancy_id)
         await session.execute(query)
-        await session.commit()
+        mark_dirty(session, VACANCY_COUNTS)
+        await commit(session)
         logger.info(f"Vacancy '{vacancy_id}' deleted successfully.")
     except Exception as e:
-        await session.rollback()
+        await rollback(session)
         logger.error(f"Error deleting vacancy: {e}", exc_info=True)
 
 ##################### Добавляем юзера в БД #####################################
@@ -160,48 +216,75 @@ async def orm_add_user(
         result = await session.execute(query)
         if result.first() is None:
             session.add(User(user_id=user_id, first_name=first_name, last_name=last_name, phone=phone))
-            await session.commit()
+            await commit(session)
             logger.info(f"User '{user_id}' added to the database.")
     except Exception as e:
-        await session.rollback()
+        await rollback(session)
         logger.error(f"Error adding user '{user_id}': {e}", exc_info=True)
 
 ######################## Работа с корзинами #######################################
 
 async def orm_add_to_cart(session: AsyncSession, user_id: int, vacancy_id: int) -> Cart:
     try:
-        query = select(Cart).where(Cart.user_id == user_id, Cart.vacancy_id == vacancy_id).options(joinedload(Cart.vacancy))
+        query = select(Cart).where(Cart.user_id == user_id, Cart.vacancy_id == vacancy_id)
         cart = await session.execute(query)
         cart = cart.scalar()
         if cart:
-            await session.commit()
             return cart
         else:
             session.add(Cart(user_id=user_id, vacancy_id=vacancy_id))
-            await session.commit()
+            await commit(session)
             logger.info(f"Vacancy '{vacancy_id}' added to cart for user '{user_id}'.")
     except Exception as e:
-        await session.rollback()
+        await rollback(session)
         logger.error(f"Error adding to cart: {e}", exc_info=True)
 
-# Загрузка связанных корзин с вакансиями
-async def orm_get_user_carts(session: AsyncSession, user_id: int) -> list[Cart]:
+# Страница корзины: keyset по индексу (user_id, id), только колонки для подписи карточки.
+# cursor — Cart.id граничной записи соседней страницы; без курсора — по номеру страницы (OFFSET)
+async def orm_get_user_cart_page(
+    session: AsyncSession,
+    user_id: int,
+    limit: int,
+    offset: int = 0,
+    cursor: int | None = None,
+    backward: bool = False,
+) -> list:
+    try:
+        query = select(
+            Cart.id, Vacancy.vacancy_id, Vacancy.name, Vacancy.description, Vacancy.image,
+        ).join(Vacancy, Vacancy.vacancy_id == Cart.vacancy_id).where(Cart.user_id == user_id)
+        if cursor is None:
+            query = query.order_by(Cart.id).offset(offset)
+        elif backward:
+            query = query.where(Cart.id < cursor).order_by(Cart.id.desc())
+        else:
+            query = query.where(Cart.id > cursor).order_by(Cart.id)
+        result = await session.execute(query.limit(limit))
+        rows = result.all()
+        return rows[::-1] if cursor is not None and backward else rows
+    except Exception as e:
+        logger.error(f"Error fetching cart page for user '{user_id}': {e}", exc_info=True)
+        return []
+
+
+async def orm_count_user_carts(session: AsyncSession, user_id: int) -> int:
     try:
-        query = select(Cart).filter(Cart.user_id == user_id).options(joinedload(Cart.vacancy))
+        query = select(func.count()).select_from(Cart).where(Cart.user_id == user_id)
         result = await session.execute(query)
-        return result.scalars().all()
+        return result.scalar_one()
     except Exception as e:
-        logger.error(f"Error fetching carts for user '{user_id}': {e}", exc_info=True)
+        logger.error(f"Error counting carts for user '{user_id}': {e}", exc_info=True)
+        return 0
 
 # Удаление вакансии из корзины
 async def orm_delete_from_cart(session: AsyncSession, user_id: int, vacancy_id: int):
     try:
         query = delete(Cart).where(Cart.user_id == user_id, Cart.vacancy_id == vacancy_id)
         await session.execute(query)
-        await session.commit()
+        await commit(session)
         logger.info(f"Vacancy '{vacancy_id}' removed from cart for user '{user_id}'.")
     except Exception as e:
-        await session.rollback()
+        await rollback(session)
         logger.error(f"Error deleting from cart: {e}", exc_info=True)
 
 # Удаление вакансии из корзины (уменьшение количества вакансий)
@@ -214,39 +297,367 @@ async def orm_reduce_vacancy_in_cart(session: AsyncSession, user_id: int, vacanc
             return False
         else:
             await orm_delete_from_cart(session, user_id, vacancy_id)
-            await session.commit()
             logger.info(f"Vacancy '{vacancy_id}' reduced in cart for user '{user_id}'.")
             return True
     except Exception as e:
-        await session.rollback()
+        await rollback(session)
         logger.error(f"Error reducing vacancy in cart: {e}", exc_info=True)
         return False
 
 
 ######################## Работа с резюме #######################################
 
-async def orm_save_resume(session: AsyncSession, user_id: int, vacancy_id: int, file_id: str, resume_text: str) -> Resume:
+async def orm_save_resume(session: AsyncSession, user_id: int, vacancy_id: int, file_id: str, content_sha256: str) -> Resume:
     try:
-        # Создание новой записи в таблице Resume
+        # Создание новой записи в таблице Resume (текст хранится отдельно, по хэшу pdf-файла)
         new_resume = Resume(
             user_id=user_id,
             vacancy_id=vacancy_id,
-            file_id=file_id
+            file_id=file_id,
+            content_sha256=content_sha256,
         )
         session.add(new_resume)
-        await session.commit()
-        await session.refresh(new_resume)
-        
-        # Создание новой записи в таблице ResumeText
-        new_resume_text = ResumeText(
-            resume_id=new_resume.resume_id,
-            resume_text=resume_text
-        )
-        session.add(new_resume_text)
-        await session.commit()
+        await commit(session)
         
         logger.info(f"Resume for user '{user_id}' and vacancy '{vacancy_id}' saved successfully.")
         return new_resume
     except Exception as e:
-        await session.rollback()
-        logger.error(f"Error saving resume for user '{user_id}' and vacancy '{vacancy_id}': {e}", exc_info=True)
\ No newline at end of file
+        await rollback(session)
+        logger.error(f"Error saving resume for user '{user_id}' and vacancy '{vacancy_id}': {e}", exc_info=True)
+
+# Текст резюме по SHA-256 байтов pdf-файла
+async def orm_get_resume_text(session: AsyncSession, content_sha256: str) -> ResumeText | None:
+    try:
+        query = select(ResumeText).where(ResumeText.content_sha256 == content_sha256)
+        result = await session.execute(query)
+        return result.scalar()
+    except Exception as e:
+        logger.error(f"Error fetching resume text '{content_sha256}': {e}", exc_info=True)
+
+# Сохранение извлечённого текста; повтор того же файла не создаёт дубликатов
+async def orm_save_resume_text(session: AsyncSession, content_sha256: str, resume_text: str, extract_method: str):
+    try:
+        query = upsert_insert(session, ResumeText).values(
+            content_sha256=content_sha256,
+            resume_text=resume_text,
+            extract_method=extract_method,
+        ).on_conflict_do_nothing(index_elements=[ResumeText.content_sha256])
+        await session.execute(query)
+        await commit(session)
+        logger.info(f"Resume text '{content_sha256}' saved ({extract_method}).")
+    except Exception as e:
+        await rollback(session)
+        logger.error(f"Error saving resume text '{content_sha256}': {e}", exc_info=True)
+
+# Порция резюме вакансии после указанного resume_id (keyset-пагинация для пакетной обработки)
+async def orm_get_vacancy_resumes_batch(session: AsyncSession, vacancy_id: int, after_resume_id: int, limit: int) -> list[Resume]:
+    try:
+        query = (
+            select(Resume)
+            .where(Resume.vacancy_id == vacancy_id, Resume.resume_id > after_resume_id)
+            .order_by(Resume.resume_id)
+            .limit(limit)
+        )
+        result = await session.execute(query)
+        return result.scalars().all()
+    except Exception as e:
+        logger.error(f"Error fetching resumes for vacancy '{vacancy_id}': {e}", exc_info=True)
+        return []
+
+
+async def orm_count_vacancy_resumes(session: AsyncSession, vacancy_id: int) -> int:
+    try:
+        query = select(func.count()).select_from(Resume).where(Resume.vacancy_id == vacancy_id)
+        result = await session.execute(query)
+        return result.scalar_one()
+    except Exception as e:
+        logger.error(f"Error counting resumes for vacancy '{vacancy_id}': {e}", exc_info=True)
+        return 0
+
+######################## Оценки резюме #######################################
+
+# Сохранение итоговой оценки резюме и статусов требований (повторная оценка заменяет прежнюю)
+async def orm_save_resume_score(session: AsyncSession, resume_id: int, vacancy_id: int, score: dict, items: list[dict]):
+    try:
+        values = {"vacancy_id": vacancy_id, **score}
+        query = upsert_insert(session, ResumeScore).values(resume_id=resume_id, **values).on_conflict_do_update(
+            index_elements=[ResumeScore.resume_id],
+            set_={**values, "updated_at": func.now()},
+        )
+        await session.execute(query)
+        await session.execute(delete(ResumeScoreItem).where(ResumeScoreItem.resume_id == resume_id))
+        if items:
+            await session.execute(insert(ResumeScoreItem), [{"resume_id": resume_id, **item} for item in items])
+        await commit(session)
+    except Exception as e:
+        await rollback(session)
+        logger.error(f"Error saving score of resume '{resume_id}': {e}", exc_info=True)
+
+
+# Страница шорт-листа вакансии: keyset по индексу (vacancy_id, score_overall DESC, resume_id).
+# cursor — (score_overall, resume_id) граничной записи предыдущей страницы; backward — листание назад.
+# min_must — порог must-have, requirement — текст пункта чек-листа, который должен быть выполнен хотя бы частично.
+# Возвращает (строки (ResumeScore, Resume, User) по убыванию оценки, есть ли ещё страница в направлении листания).
+async def orm_get_shortlist_page(
+    session: AsyncSession,
+    vacancy_id: int,
+    limit: int,
+    cursor: tuple[float, int] | None = None,
+    backward: bool = False,
+    min_must: float | None = None,
+    requirement: str | None = None,
+) -> tuple[list, bool]:
+    try:
+        query = (
+            select(ResumeScore, Resume, User)
+            .join(Resume, Resume.resume_id == ResumeScore.resume_id)
+            .join(User, User.user_id == Resume.user_id)
+            .where(ResumeScore.vacancy_id == vacancy_id)
+        )
+        if min_must:
+            query = query.where(ResumeScore.score_must >= min_must)
+        if requirement is not None:
+            # по тексту пункта, а не по req_index: после правки вакансии номера в чек-листе сдвигаются,
+            # а оценки, сделанные по прежнему чек-листу, хранят прежние номера
+            query = query.where(
+                select(ResumeScoreItem.resume_id).where(
+                    ResumeScoreItem.resume_id == ResumeScore.resume_id,
+                    ResumeScoreItem.requirement == requirement,
+                    ResumeScoreItem.status >= 0.5,
+                ).exists()
+            )
+        if cursor is not None:
+            score, resume_id = cursor
+            if backward:
+                query = query.where(or_(
+                    ResumeScore.score_overall > score,
+                    and_(ResumeScore.score_overall == score, ResumeScore.resume_id < resume_id),
+                ))
+            else:
+                query = query.where(or_(
+                    ResumeScore.score_overall < score,
+                    and_(ResumeScore.score_overall == score, ResumeScore.resume_id > resume_id),
+                ))
+        if backward:
+            query = query.order_by(ResumeScore.score_overall, ResumeScore.resume_id.desc())
+        else:
+            query = query.order_by(ResumeScore.score_overall.desc(), ResumeScore.resume_id)
+        result = await session.execute(query.limit(limit + 1))
+        rows = result.all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        # назад индекс читается в обратном порядке — разворачиваем страницу
+        return (rows[::-1] if backward else rows), has_more
+    except Exception as e:
+        logger.error(f"Error fetching shortlist for vacancy '{vacancy_id}': {e}", exc_info=True)
+        return [], False
+
+
+async def orm_get_resume(session: AsyncSession, resume_id: int) -> Resume | None:
+    try:
+        return await session.get(Resume, resume_id)
+    except Exception as e:
+        logger.error(f"Error fetching resume '{resume_id}': {e}", exc_info=True)
+
+######################## Пересчёт оценок #######################################
+
+async def orm_get_rescore_job(session: AsyncSession, vacancy_id: int, vacancy_text_sha: str) -> RescoreJob | None:
+    try:
+        query = select(RescoreJob).where(
+            RescoreJob.vacancy_id == vacancy_id,
+            RescoreJob.vacancy_text_sha == vacancy_text_sha,
+        )
+        result = await session.execute(query)
+        return result.scalar()
+    except Exception as e:
+        logger.error(f"Error fetching rescore job for vacancy '{vacancy_id}': {e}", exc_info=True)
+
+
+async def orm_get_running_rescore_jobs(session: AsyncSession) -> list[RescoreJob]:
+    try:
+        query = select(RescoreJob).where(RescoreJob.status == 'running')
+        result = await session.execute(query)
+        return result.scalars().all()
+    except Exception as e:
+        logger.error(f"Error fetching running rescore jobs: {e}", exc_info=True)
+        return []
+
+
+async def orm_add_rescore_job(session: AsyncSession, vacancy_id: int, vacancy_text_sha: str, chat_id: int, total: int) -> RescoreJob:
+    try:
+        job = RescoreJob(vacancy_id=vacancy_id, vacancy_text_sha=vacancy_text_sha, chat_id=chat_id, total=total)
+        session.add(job)
+        await commit(session)
+        logger.info(f"Rescore job for vacancy '{vacancy_id}' created.")
+        return job
+    except Exception as e:
+        await rollback(session)
+        logger.error(f"Error creating rescore job for vacancy '{vacancy_id}': {e}", exc_info=True)
+
+
+async def orm_update_rescore_job(session: AsyncSession, job_id: int, **values):
+    try:
+        query = update(RescoreJob).where(RescoreJob.job_id == job_id).values(**values)
+        await session.execute(query)
+        await commit(session)
+    except Exception as e:
+        await rollback(session)
+        logger.error(f"Error updating rescore job '{job_id}': {e}", exc_info=True)
+
+
+async def orm_supersede_rescore_jobs(session: AsyncSession, vacancy_id: int):
+    try:
+        query = update(RescoreJob).where(
+            RescoreJob.vacancy_id == vacancy_id,
+            RescoreJob.status == 'running',
+        ).values(status='superseded')
+        await session.execute(query)
+        await commit(session)
+    except Exception as e:
+        await rollback(session)
+        logger.error(f"Error superseding rescore jobs for vacancy '{vacancy_id}': {e}", exc_info=True)
+
+
+######################## Обслуживание кэша LLM #######################################
+
+# Отметка попаданий в кэш: обновление last_hit_at пачкой ключей
+async def orm_touch_llm_cache(session: AsyncSession, keys: list[str]):
+    try:
+        query = update(LLMCache).where(LLMCache.key.in_(keys)).values(last_hit_at=func.now())
+        await session.execute(query)
+        await commit(session)
+    except Exception as e:
+        await rollback(session)
+        logger.error(f"Error touching {len(keys)} llm cache entries: {e}", exc_info=True)
+
+
+# Заполнение размера и времени попадания у записей, созданных до появления этих колонок
+async def orm_backfill_llm_cache(session: AsyncSession, limit: int) -> int:
+    try:
+        legacy = select(LLMCache.key).where(LLMCache.size_bytes.is_(None)).limit(limit)
+        query = update(LLMCache).where(LLMCache.key.in_(legacy)).values(
+            size_bytes=byte_length(session, LLMCache.payload_json),
+            last_hit_at=func.coalesce(LLMCache.last_hit_at, LLMCache.created_at),
+        )
+        result = await session.execute(query)
+        await commit(session)
+        return result.rowcount
+    except Exception as e:
+        await rollback(session)
+        logger.error(f"Error backfilling llm cache entries: {e}", exc_info=True)
+        return 0
+
+
+# Удаление порции записей прежних версий промптов/правил; возвращает (key, size_bytes) удалённых
+async def orm_delete_stale_llm_cache(session: AsyncSession, prompt_version: str, rules_version: str, limit: int) -> list:
+    try:
+        stale = select(LLMCache.key).where(or_(
+            and_(LLMCache.prompt_version.is_not(None), LLMCache.prompt_version != prompt_version),
+            and_(LLMCache.rules_version.is_not(None), LLMCache.rules_version != rules_version),
+        )).limit(limit)
+        query = delete(LLMCache).where(LLMCache.key.in_(stale)).returning(LLMCache.key, LLMCache.size_bytes)
+        result = await session.execute(query)
+        rows = result.all()
+        await commit(session)
+        return rows
+    except Exception as e:
+        await rollback(session)
+        logger.error(f"Error deleting stale llm cache entries: {e}", exc_info=True)
+        return []
+
+
+# Удаление порции давно не использованных записей; возвращает (key, size_bytes) удалённых
+async def orm_delete_lru_llm_cache(session: AsyncSession, limit: int) -> list:
+    try:
+        oldest = select(LLMCache.key).order_by(LLMCache.last_hit_at).limit(limit)
+        query = delete(LLMCache).where(LLMCache.key.in_(oldest)).returning(LLMCache.key, LLMCache.size_bytes)
+        result = await session.execute(query)
+        rows = result.all()
+        await commit(session)
+        return rows
+    except Exception as e:
+        await rollback(session)
+        logger.error(f"Error evicting llm cache entries: {e}", exc_info=True)
+        return []
+
+
+# Размер кэша по видам записей: [(kind, count, size_bytes)]
+async def orm_get_llm_cache_usage(session: AsyncSession) -> list:
+    try:
+        query = select(
+            LLMCache.kind,
+            func.count(),
+            func.coalesce(func.sum(LLMCache.size_bytes), 0),
+        ).group_by(LLMCache.kind)
+        result = await session.execute(query)
+        return result.all()
+    except Exception as e:
+        logger.error(f"Error fetching llm cache usage: {e}", exc_info=True)
+        return []
+
+
+######################## Журнал вызовов LLM #######################################
+
+# Запись пачки вызовов одним INSERT (executemany)
+async def orm_add_llm_ledger_entries(session: AsyncSession, entries: list[dict]):
+    if not entries:
+        return
+    try:
+        await session.execute(insert(LLMCallLedger), entries)
+        await commit(session)
+    except Exception as e:
+        await rollback(session)
+        logger.error(f"Error writing {len(entries)} LLM ledger entries: {e}", exc_info=True)
+        raise
+
+
+# Текущее время по часам БД: created_at журнала заполняет func.now() базы, и окно отчёта
+# считаем от её часов и часового пояса, а не от часов процесса бота
+async def orm_get_db_now(session: AsyncSession):
+    result = await session.execute(select(naive_now(session)))
+    return result.scalar_one()
+
+
+# Расходы по дням с момента since: [(день, вызовы, input, cached, output, стоимость)]
+async def orm_get_llm_spend_by_day(session: AsyncSession, since) -> list:
+    try:
+        day = func.date(LLMCallLedger.created_at)
+        query = (
+            select(
+                day,
+                func.count(),
+                func.sum(LLMCallLedger.input_tokens),
+                func.sum(LLMCallLedger.cached_tokens),
+                func.sum(LLMCallLedger.output_tokens),
+                func.sum(LLMCallLedger.cost_usd),
+            )
+            .where(LLMCallLedger.created_at >= since)
+            .group_by(day)
+            .order_by(day)
+        )
+        result = await session.execute(query)
+        return result.all()
+    except Exception as e:
+        logger.error(f"Error fetching LLM spend by day: {e}", exc_info=True)
+        return []
+
+
+# Самые затратные вакансии с момента since:
+# [(vacancy_id, название или None, вызовы, стоимость, стоимость в режиме llm_file)]
+async def orm_get_llm_spend_by_vacancy(session: AsyncSession, since, limit: int) -> list:
+    try:
+        cost = func.sum(LLMCallLedger.cost_usd)
+        file_cost = func.sum(case((LLMCallLedger.mode == "llm_file", LLMCallLedger.cost_usd), else_=0.0))
+        query = (
+            select(LLMCallLedger.vacancy_id, Vacancy.name, func.count(), cost, file_cost)
+            .outerjoin(Vacancy, Vacancy.vacancy_id == LLMCallLedger.vacancy_id)
+            .where(LLMCallLedger.created_at >= since)
+            .group_by(LLMCallLedger.vacancy_id, Vacancy.name)
+            .order_by(cost.desc())
+            .limit(limit)
+        )
+        result = await session.execute(query)
+        return result.all()
+    except Exception as e:
+        logger.error(f"Error fetching LLM spend by vacancy: {e}", exc_info=True)
+        return []
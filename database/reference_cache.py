@@ -0,0 +1,122 @@
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database.models import Banner, Category, Vacancy
+
+logger = logging.getLogger(__name__)
+
+# ключ session.info: какие справочники изменены в текущей транзакции сессии
+_DIRTY = "reference_cache_dirty"
+
+BANNERS = "banners"
+CATEGORIES = "categories"
+VACANCY_COUNTS = "vacancy_counts"
+
+
+class ReferenceCache:
+    def __init__(self):
+        """
+        Баннеры, категории и число вакансий по категориям в памяти процесса: меняются только
+        из админки, а читаются почти на каждом шаге меню. Хранятся отсоединённые от сессий объекты.
+        """
+        self.banners: Optional[Dict[str, Banner]] = None
+        self.categories: Optional[List[Category]] = None
+        self.vacancy_counts: Dict[int, int] = {}
+        # растёт при каждом сбросе: чтение, начатое до сброса, не должно попасть в кэш после него
+        self.generation = 0
+
+    def invalidate(self, *kinds: str) -> None:
+        self.generation += 1
+        if BANNERS in kinds:
+            self.banners = None
+        if CATEGORIES in kinds:
+            self.categories = None
+        if VACANCY_COUNTS in kinds:
+            self.vacancy_counts = {}
+
+
+reference_cache = ReferenceCache()
+
+
+def mark_dirty(session: AsyncSession, kind: str) -> None:
+    """
+    Отмечает изменение справочника в транзакции сессии. Кэш сбрасывается сразу
+    и ещё раз по её окончании, чтобы чтение до COMMIT не оставило в кэше старые данные.
+    """
+    session.info.setdefault(_DIRTY, set()).add(kind)
+    reference_cache.invalidate(kind)
+
+
+def is_dirty(session: AsyncSession, kind: str) -> bool:
+    """Справочник изменён в незавершённой транзакции сессии — её чтения нельзя класть в кэш."""
+    return kind in session.info.get(_DIRTY, ())
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _invalidate_on_transaction_end(session: Session, transaction) -> None:
+    # коммит или откат внешней транзакции: изменения стали видны всем или исчезли
+    if transaction.parent is None and _DIRTY in session.info:
+        reference_cache.invalidate(*session.info.pop(_DIRTY))
+
+
+def _storable(session: AsyncSession, kind: str, generation: int) -> bool:
+    """
+    Прочитанное можно положить в кэш: пока шёл запрос, кэш никто не сбрасывал
+    (чужой COMMIT мог прийти между нашим SELECT и записью в кэш), и сессия сама его не меняла.
+    """
+    return reference_cache.generation == generation and not is_dirty(session, kind)
+
+
+async def cached_banners(session: AsyncSession) -> Dict[str, Banner]:
+    """Баннеры по имени страницы: из памяти, при промахе — одним запросом."""
+    banners = reference_cache.banners
+    if banners is None:
+        generation = reference_cache.generation
+        result = await session.execute(select(Banner).order_by(Banner.banner_id))
+        rows = result.scalars().all()
+        # отсоединяем, чтобы откат этой сессии не сбросил атрибуты общих объектов
+        for banner in rows:
+            session.expunge(banner)
+        banners = {banner.name: banner for banner in rows}
+        if _storable(session, BANNERS, generation):
+            reference_cache.banners = banners
+    return banners
+
+
+async def cached_categories(session: AsyncSession) -> List[Category]:
+    """Категории в порядке создания: из памяти, при промахе — одним запросом."""
+    categories = reference_cache.categories
+    if categories is None:
+        generation = reference_cache.generation
+        result = await session.execute(select(Category).order_by(Category.category_id))
+        categories = list(result.scalars().all())
+        for category in categories:
+            session.expunge(category)
+        if _storable(session, CATEGORIES, generation):
+            reference_cache.categories = categories
+    return categories
+
+
+async def cached_vacancy_count(session: AsyncSession, category_id: int) -> int:
+    """Число вакансий категории (для «Вакансия N из M» и кнопок листания)."""
+    count = reference_cache.vacancy_counts.get(category_id)
+    if count is None:
+        generation = reference_cache.generation
+        result = await session.execute(
+            select(func.count()).select_from(Vacancy).where(Vacancy.category_id == category_id)
+        )
+        count = result.scalar_one()
+        if _storable(session, VACANCY_COUNTS, generation):
+            reference_cache.vacancy_counts[category_id] = count
+    return count
+
+
+async def load_reference_cache(session: AsyncSession) -> None:
+    """Загружает баннеры и категории при запуске бота."""
+    banners = await cached_banners(session)
+    categories = await cached_categories(session)
+    logger.info(f"Reference cache loaded: {len(banners)} banners, {len(categories)} categories.")
@@ -0,0 +1,100 @@
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+# ключ session.info: сессия — единица работы, коммит делает её владелец (middleware апдейта)
+UNIT_OF_WORK = "unit_of_work"
+
+
+async def commit(session: AsyncSession) -> None:
+    """Фиксирует изменения orm-функции. В единице работы только отправляет их в БД (flush)."""
+    if session.info.get(UNIT_OF_WORK):
+        await session.flush()
+    else:
+        await session.commit()
+
+
+async def rollback(session: AsyncSession) -> None:
+    """
+    Откатывает изменения после ошибки. В единице работы внутри savepoint откатывается только он,
+    иначе — вся транзакция.
+    """
+    nested = session.get_nested_transaction() if session.info.get(UNIT_OF_WORK) else None
+    if nested is not None:
+        await nested.rollback()
+    else:
+        await session.rollback()
+
+
+@asynccontextmanager
+async def savepoint(session: AsyncSession) -> AsyncIterator[None]:
+    """
+    SAVEPOINT для частичного отказа в обработчике: ошибка внутри блока откатывает
+    только его изменения, остальное попадёт в общий коммит апдейта.
+    Вне единицы работы каждая orm-функция коммитит сама, и SAVEPOINT не нужен.
+    """
+    if session.info.get(UNIT_OF_WORK):
+        async with session.begin_nested():
+            yield
+    else:
+        yield
+
+
+class LazySession:
+    def __init__(self, session_pool: async_sessionmaker, unit_of_work: bool = False):
+        """
+        Сессия, которая создаётся при первом обращении.
+        Апдейты, не работающие с БД (например, сообщения групп для cleaner), не трогают пул соединений.
+        Заодно считает SQL-запросы и время, пока соединение было взято из пула.
+
+        :param session_pool: Фабрика сессий.
+        :param unit_of_work: orm-функции только делают flush, коммитит владелец сессии.
+        """
+        self._session_pool = session_pool
+        self._unit_of_work = unit_of_work
+        self._session: Optional[AsyncSession] = None
+        self.statements = 0
+        self.connection_seconds = 0.0
+        self._checked_out_at: Optional[float] = None
+
+    @property
+    def used(self) -> bool:
+        return self._session is not None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            session = self._session_pool()
+            if self._unit_of_work:
+                session.info[UNIT_OF_WORK] = True
+            sync_session = session.sync_session
+            event.listen(sync_session, "after_begin", self._on_begin)
+            event.listen(sync_session, "after_transaction_end", self._on_transaction_end)
+            self._session = session
+        return self._session
+
+    def __getattr__(self, name: str) -> Any:
+        # всё, чего нет у прокси (execute, get, add, commit...), берём у настоящей сессии
+        return getattr(self.session, name)
+
+    def _on_begin(self, session, transaction, connection) -> None:
+        # соединение берётся из пула в начале транзакции и возвращается по её окончании
+        if self._checked_out_at is None:
+            self._checked_out_at = time.perf_counter()
+        if not event.contains(connection, "before_cursor_execute", self._on_statement):
+            event.listen(connection, "before_cursor_execute", self._on_statement)
+
+    def _on_statement(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements += 1
+
+    def _on_transaction_end(self, session, transaction) -> None:
+        if transaction.parent is None and self._checked_out_at is not None:
+            self.connection_seconds += time.perf_counter() - self._checked_out_at
+            self._checked_out_at = None
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
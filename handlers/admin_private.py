@@ -1,23 +1,32 @@
+import html
 import logging
-from aiogram import F, Router, types
-from aiogram.filters import Command, StateFilter, or_f
+from aiogram import Bot, F, Router, types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject, StateFilter, or_f
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from database.orm_query import (
     orm_add_vacancy,
     orm_change_banner_image,
     orm_delete_vacancy,
     orm_get_categories,
     orm_get_info_pages,
+    orm_get_resume,
+    orm_get_shortlist_page,
     orm_get_vacancies,
     orm_get_vacancy,
     orm_update_banner_description,
     orm_update_vacancy,
 )
 from filters.chat_types import ChatTypeFilter, IsAdmin
-from kbds.inline import get_callback_btns
+from kbds.inline import ShortlistCallBack, get_callback_btns, get_shortlist_btns, get_shortlist_filter_btns
 from kbds.reply import get_keyboard
+from services.cache_maintenance import ATS_CACHE_MAX_MB
+from services.llm_ledger import spend_summary
+from services.llm_matching import cache_usage, cached_vacancy_requirements
+from services.rescoring import start_vacancy_rescore
+from services.warmup import start_vacancy_warmup
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -46,6 +55,58 @@ async def admin_features(message: types.Message):
     await message.answer("Выберите команду", reply_markup=ADMIN_KB)
     logger.info(f"Admin features menu sent to {message.from_user.id}")
 
+
+def _mb(size: int) -> float:
+    return size / 1024 / 1024
+
+
+@admin_router.message(Command("cache"))
+async def cache_report(message: types.Message, session: AsyncSession):
+    """
+    Отправляет администратору размер кэша LLM по видам записей.
+    """
+    usage = await cache_usage(session)
+    lines = [f"Кэш LLM: {usage['items']} записей, {_mb(usage['bytes']):.1f} из {ATS_CACHE_MAX_MB:.0f} МБ"]
+    for kind, item in sorted(usage["by_kind"].items(), key=lambda kv: -kv[1]["bytes"]):
+        lines.append(f"• {kind}: {item['items']} записей, {_mb(item['bytes']):.1f} МБ")
+    memory = usage["memory"]
+    lines.append(
+        f"В памяти: {memory['items']} записей, {_mb(memory['bytes']):.1f} МБ, "
+        f"попадания {memory['hit_ratio']:.0%}"
+    )
+    await message.answer("\n".join(lines))
+    logger.info(f"Cache report sent to {message.from_user.id}")
+
+@admin_router.message(Command("spend"))
+async def spend_report(message: types.Message, session: AsyncSession, command: CommandObject):
+    """
+    Отправляет администратору расходы на LLM по дням и по вакансиям: /spend [дней], по умолчанию 7.
+    """
+    days = int(command.args) if command.args and command.args.strip().isdigit() else 7
+    days = min(max(days, 1), 90)
+    summary = await spend_summary(session, days)
+    total = summary["total"]
+    lines = [
+        f"Расходы на LLM за {days} дн.: ${total['cost_usd']:.2f}, вызовов: {total['calls']}",
+        f"Токены: input {total['input_tokens']} (из кэша {total['cached_tokens']}), output {total['output_tokens']}",
+    ]
+    if summary["by_day"]:
+        lines.append("\nПо дням:")
+        for row in summary["by_day"]:
+            lines.append(f"• {row['day']}: ${row['cost_usd']:.2f} ({row['calls']} вызовов)")
+    if summary["by_vacancy"]:
+        lines.append("\nВакансии:")
+        for row in summary["by_vacancy"]:
+            if row["vacancy_id"] is None:
+                title = "без вакансии"
+            else:
+                title = f"{row['name'] or 'удалена'} (#{row['vacancy_id']})"
+            lines.append(
+                f"• {title}: ${row['cost_usd']:.2f}, из них по PDF (llm_file) ${row['llm_file_cost_usd']:.2f}"
+            )
+    await message.answer("\n".join(lines), parse_mode=None)
+    logger.info(f"Spend report sent to {message.from_user.id}")
+
 @admin_router.message(F.text == "Показать список вакансий")
 async def vac_list(message: types.Message):
     """
@@ -103,6 +164,7 @@ async def get_vacancies(callback: types.CallbackQuery, session: AsyncSession):
                     btns={
                         "Удалить": f"delete_{vacancy.vacancy_id}",
                         "Изменить": f"change_{vacancy.vacancy_id}",
+                        "Кандидаты": ShortlistCallBack(action="page", vacancy_id=vacancy.vacancy_id).pack(),
                     }
                 ),
             )
@@ -130,6 +192,158 @@ async def delete_vacancy_callback(callback: types.CallbackQuery, session: AsyncS
         await callback.answer("Произошла ошибка при удалении вакансии.")
 
 
+################# Шорт-лист кандидатов по вакансии ############################
+
+# кандидатов на одной странице шорт-листа
+SHORTLIST_PAGE_SIZE = 5
+# сколько пунктов чек-листа показывать в фильтрах
+SHORTLIST_FILTER_REQS = 12
+
+
+async def _shortlist_view(session: AsyncSession, data: ShortlistCallBack):
+    """
+    Текст и клавиатура страницы шорт-листа (одним запросом по индексу оценок).
+
+    :return: (текст, клавиатура) или None, если вакансии нет.
+    """
+    vacancy = await orm_get_vacancy(session, data.vacancy_id)
+    if not vacancy:
+        return None
+    cursor = (data.score, data.resume_id) if data.score is not None and data.resume_id is not None else None
+    # номер в кнопке — из текущего чек-листа; оценки фильтруем по тексту пункта
+    requirement = None
+    if data.req is not None:
+        reqs = await cached_vacancy_requirements(session, data.vacancy_id) or []
+        requirement = reqs[data.req]["text"] if data.req < len(reqs) else None
+    if data.req is not None and requirement is None:
+        # чек-лист успел измениться и пункта с таким номером больше нет
+        rows, has_more = [], False
+    else:
+        rows, has_more = await orm_get_shortlist_page(
+            session, data.vacancy_id, SHORTLIST_PAGE_SIZE,
+            cursor=cursor, backward=data.back, min_must=data.min_must or None, requirement=requirement,
+        )
+
+    filters = []
+    if data.min_must:
+        filters.append(f"must ≥ {data.min_must}%")
+    if data.req is not None:
+        title = requirement or f"требование №{data.req + 1}"
+        filters.append(f"есть «{html.escape(title)}»")
+    lines = [
+        f"<b>Кандидаты: {html.escape(vacancy.name)}</b>",
+        "Фильтры: " + (", ".join(filters) if filters else "нет"),
+        "",
+    ]
+    if not rows:
+        lines.append("Оценённых кандидатов нет." if not filters else "Под фильтры никто не подходит.")
+
+    candidates = []
+    for score, resume, user in rows:
+        name = " ".join(p for p in (user.first_name, user.last_name) if p) or f"id {user.user_id}"
+        received = f", {resume.date_receipt:%d.%m.%Y}" if resume.date_receipt else ""
+        lines.append(
+            f"<b>{score.score_overall:.1f}%</b> — {html.escape(name)} "
+            f"(must {score.score_must:.0f}%, optional {score.score_optional:.0f}%{received})"
+        )
+        candidates.append((f"{name} — {score.score_overall:.0f}%", resume.resume_id))
+
+    # при листании назад has_more относится к предыдущим страницам, вперёд — к следующим
+    has_prev = has_more if data.back else cursor is not None
+    has_next = cursor is not None if data.back else has_more
+    first = (rows[0][0].score_overall, rows[0][0].resume_id) if rows else None
+    last = (rows[-1][0].score_overall, rows[-1][0].resume_id) if rows else None
+    markup = get_shortlist_btns(
+        vacancy_id=data.vacancy_id,
+        min_must=data.min_must,
+        req=data.req,
+        candidates=candidates,
+        prev_cursor=first if has_prev else None,
+        next_cursor=last if has_next else None,
+    )
+    return "\n".join(lines), markup
+
+
+@admin_router.message(Command("shortlist"))
+async def shortlist_command(message: types.Message, session: AsyncSession, command: CommandObject):
+    """
+    Отправляет администратору лучших кандидатов вакансии: /shortlist <id вакансии>.
+    """
+    if not command.args or not command.args.strip().isdigit():
+        await message.answer("Укажите номер вакансии: /shortlist 12")
+        return
+    view = await _shortlist_view(session, ShortlistCallBack(action="page", vacancy_id=int(command.args)))
+    if view is None:
+        await message.answer("Вакансия не найдена.")
+        return
+    text, markup = view
+    await message.answer(text, reply_markup=markup)
+    logger.info(f"Shortlist of vacancy {command.args.strip()} sent to {message.from_user.id}")
+
+
+@admin_router.callback_query(ShortlistCallBack.filter(F.action == "page"), IsAdmin())
+async def shortlist_page(callback: types.CallbackQuery, callback_data: ShortlistCallBack, session: AsyncSession):
+    """
+    Показывает страницу шорт-листа: с карточки вакансии — новым сообщением, при листании — в том же.
+    """
+    try:
+        view = await _shortlist_view(session, callback_data)
+        if view is None:
+            await callback.answer("Вакансия не найдена.")
+            return
+        text, markup = view
+        if callback.message.photo:
+            await callback.message.answer(text, reply_markup=markup)
+        else:
+            try:
+                await callback.message.edit_text(text, reply_markup=markup)
+            except TelegramBadRequest:
+                # страница не изменилась (повторное нажатие)
+                pass
+        await callback.answer()
+    except Exception as e:
+        logger.error(f"Error in shortlist_page: {e}", exc_info=True)
+        await callback.answer("Произошла ошибка при получении кандидатов.")
+
+
+@admin_router.callback_query(ShortlistCallBack.filter(F.action == "filters"), IsAdmin())
+async def shortlist_filters(callback: types.CallbackQuery, callback_data: ShortlistCallBack, session: AsyncSession):
+    """
+    Заменяет клавиатуру шорт-листа выбором фильтров (пункты чек-листа — из кэша, без вызова LLM).
+    """
+    reqs = await cached_vacancy_requirements(session, callback_data.vacancy_id) or []
+    markup = get_shortlist_filter_btns(
+        vacancy_id=callback_data.vacancy_id,
+        min_must=callback_data.min_must,
+        req=callback_data.req,
+        requirements=[r["text"] for r in reqs[:SHORTLIST_FILTER_REQS]],
+    )
+    try:
+        await callback.message.edit_reply_markup(reply_markup=markup)
+    except TelegramBadRequest:
+        pass
+    await callback.answer()
+
+
+@admin_router.callback_query(ShortlistCallBack.filter(F.action == "pdf"), IsAdmin())
+async def shortlist_pdf(callback: types.CallbackQuery, callback_data: ShortlistCallBack, session: AsyncSession):
+    """
+    Отправляет исходный PDF кандидата по сохранённому file_id Telegram (без повторной загрузки).
+    """
+    try:
+        resume = await orm_get_resume(session, callback_data.resume_id)
+        if not resume:
+            await callback.answer("Резюме не найдено.")
+            return
+        await callback.message.answer_document(resume.file_id, caption=f"Резюме №{resume.resume_id}")
+        await callback.answer()
+        logger.info(f"Resume {resume.resume_id} sent to {callback.from_user.id}")
+    except Exception as e:
+        # например, устаревший file_id — Telegram больше не отдаёт этот файл
+        logger.error(f"Error in shortlist_pdf: {e}", exc_info=True)
+        await callback.answer("Не удалось отправить резюме.")
+
+
 ################# Микро-FSM для загрузки/изменения баннеров ############################
 
 class AddBanner(StatesGroup):
@@ -387,7 +601,13 @@ async def category_choice2(message: types.Message, state: FSMContext):
 
 # Ловим данные для состояния vacancy_check, сохраняем все в БД и затем выходим из FSM
 @admin_router.message(AddVacancy.vacancy_check, F.text.lower() == 'да')
-async def add_vacancy_check(message: types.Message, state: FSMContext, session: AsyncSession):
+async def add_vacancy_check(
+    message: types.Message,
+    state: FSMContext,
+    session: AsyncSession,
+    session_pool: async_sessionmaker,
+    bot: Bot,
+):
     data = await state.get_data()
 
     # Только для теста, потом убрать!!!
@@ -395,13 +615,23 @@ async def add_vacancy_check(message: types.Message, state: FSMContext, session:
 
     try:
         if AddVacancy.vacancy_for_change:
-            await orm_update_vacancy(session, AddVacancy.vacancy_for_change.vacancy_id, data)
+            vacancy_id = AddVacancy.vacancy_for_change.vacancy_id
+            await orm_update_vacancy(session, vacancy_id, data)
+            # фоновые задачи читают вакансию своими сессиями — фиксируем до их запуска
+            await session.commit()
             await message.answer("Вакансия успешно изменена", reply_markup=get_keyboard("OK"))
-            logger.info(f"Vacancy {AddVacancy.vacancy_for_change.vacancy_id} updated by {message.from_user.id}")
+            logger.info(f"Vacancy {vacancy_id} updated by {message.from_user.id}")
+            # текст вакансии изменился — пересчёт сам разберёт новый чек-лист (прогрев) до оценки кандидатов;
+            # отдельный прогрев параллельно с ним перезаписал бы базу для сравнения чек-листов
+            start_vacancy_rescore(bot, session_pool, vacancy_id, message.chat.id)
         else:
-            await orm_add_vacancy(session, data)
+            vacancy = await orm_add_vacancy(session, data)
+            await session.commit()
             await message.answer("Отлично, вакансия добавлена!", reply_markup=get_keyboard("OK"))
             logger.info(f"New vacancy added by {message.from_user.id}")
+            # чек-лист разбираем сразу, чтобы первый кандидат не ждал его вместе с оценкой
+            if vacancy:
+                start_vacancy_warmup(session_pool, vacancy.vacancy_id)
 
         await state.clear()
         AddVacancy.vacancy_for_change = None
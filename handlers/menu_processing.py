@@ -3,15 +3,17 @@ from aiogram.types import InputMediaPhoto
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.orm_query import (
     orm_add_to_cart,
+    orm_count_user_carts,
+    orm_count_vacancies,
     orm_delete_from_cart,
     orm_get_banner,
     orm_get_categories,
-    orm_get_user_carts,
-    orm_get_vacancies,
+    orm_get_user_cart_page,
+    orm_get_vacancy_page,
     orm_reduce_vacancy_in_cart
 )
 from kbds.inline import get_user_cart, get_user_main_btns, get_vacancies_btns, get_user_categories_btns
-from utils.paginator import Paginator
+from utils.paginator import Paginator, QueryPaginator
 
 logger = logging.getLogger(__name__)
 
@@ -56,7 +58,7 @@ async def categories(session, level, menu_name):
         logger.error(f"Error in categories: {e}", exc_info=True)
         return InputMediaPhoto(media=DEFAULT_IMAGE_ID, caption=DEFAULT_CAPTION), get_user_main_btns(level=level)
 
-def pages(paginator: Paginator):
+def pages(paginator: Paginator | QueryPaginator):
     """
     Проверяет наличие предыдущих и следующих страниц для добавления кнопок пагинации.
     
@@ -70,20 +72,31 @@ def pages(paginator: Paginator):
         btns["Следующая ▶"] = "next"
     return btns
 
-async def vacancies(session, level, category, page):
+async def vacancies(session, level, menu_name, category, page, cursor):
     """
-    Получает список вакансий, создает пагинатор, возвращает изображение вакансии и кнопки навигации.
+    Получает вакансию текущей страницы (одна строка по keyset-курсору) и число вакансий категории,
+    возвращает изображение вакансии и кнопки навигации.
     
     :param session: Асинхронная сессия для работы с базой данных.
     :param level: Уровень меню.
+    :param menu_name: Название меню (next/previous — листание от вакансии cursor).
     :param category: Категория вакансий.
     :param page: Страница пагинации.
+    :param cursor: vacancy_id вакансии, с которой листают.
     :return: Изображение вакансии и кнопки навигации.
     """
     try:
-        vacancies = await orm_get_vacancies(session, category_id=category)
-        paginator = Paginator(vacancies, page=page)
-        vacancy = paginator.get_page()[0]
+        async def fetch(limit, offset, after, backward):
+            return await orm_get_vacancy_page(session, category, limit, offset=offset, cursor=after, backward=backward)
+
+        paginator = QueryPaginator(
+            fetch,
+            total=await orm_count_vacancies(session, category),
+            page=page,
+            cursor=cursor if menu_name in ('next', 'previous') else None,
+            backward=menu_name == 'previous',
+        )
+        vacancy = (await paginator.get_page())[0]
         image = InputMediaPhoto(
             media=vacancy.image,
             caption=f"<strong>{vacancy.name}</strong>\n{vacancy.description}\nТребования к кандидату: {vacancy.requirements}\n<strong>Вакансия {paginator.page} из {paginator.pages}</strong>",
@@ -92,7 +105,7 @@ async def vacancies(session, level, category, page):
         kbds = get_vacancies_btns(
             level=level,
             category=category,
-            page=page,
+            page=paginator.page,
             pagination_btns=pagination_btns,
             vacancy_id=vacancy.vacancy_id,
         )
@@ -101,10 +114,11 @@ async def vacancies(session, level, category, page):
         logger.error(f"Error in vacancies: {e}", exc_info=True)
         return InputMediaPhoto(media=DEFAULT_IMAGE_ID, caption=DEFAULT_CAPTION), get_user_main_btns(level=level)
 
-async def carts(session, level, menu_name, page, user_id, vacancy_id):
+async def carts(session, level, menu_name, page, user_id, vacancy_id, cursor):
     """
     Обрабатывает добавление, удаление и изменение вакансий в корзине.
-    Получает список корзин пользователя и возвращает изображение и кнопки навигации.
+    Получает запись корзины для текущей страницы (только поля подписи) и число записей,
+    возвращает изображение и кнопки навигации.
     
     :param session: Асинхронная сессия для работы с базой данных.
     :param level: Уровень меню.
@@ -112,6 +126,7 @@ async def carts(session, level, menu_name, page, user_id, vacancy_id):
     :param page: Страница пагинации.
     :param user_id: Идентификатор пользователя.
     :param vacancy_id: Идентификатор вакансии.
+    :param cursor: Cart.id записи, с которой листают.
     :return: Изображение и кнопки навигации.
     """
     try:
@@ -126,8 +141,21 @@ async def carts(session, level, menu_name, page, user_id, vacancy_id):
         elif menu_name == 'increment':
             await orm_add_to_cart(session, user_id, vacancy_id)
         
-        carts = await orm_get_user_carts(session, user_id)
-        if not carts:
+        total = await orm_count_user_carts(session, user_id)
+        cart = None
+        if total:
+            async def fetch(limit, offset, after, backward):
+                return await orm_get_user_cart_page(session, user_id, limit, offset=offset, cursor=after, backward=backward)
+
+            paginator = QueryPaginator(
+                fetch,
+                total=total,
+                page=page,
+                cursor=cursor if menu_name in ('next', 'previous') else None,
+                backward=menu_name == 'previous',
+            )
+            cart = next(iter(await paginator.get_page()), None)
+        if cart is None:
             banner = await orm_get_banner(session, 'cart')
             image = InputMediaPhoto(media=banner.image, caption=f"<strong>{banner.description}</strong>")
             kbds = get_user_cart(
@@ -137,18 +165,17 @@ async def carts(session, level, menu_name, page, user_id, vacancy_id):
                 vacancy_id=None,
             )
         else:
-            paginator = Paginator(carts, page=page)
-            cart = paginator.get_page()[0]
             image = InputMediaPhoto(
-                media=cart.vacancy.image,
-                caption=f"<strong>{cart.vacancy.name}</strong>\n{cart.vacancy.description}\nВакансия {paginator.page} из {paginator.pages} выбранных.",
+                media=cart.image,
+                caption=f"<strong>{cart.name}</strong>\n{cart.description}\nВакансия {paginator.page} из {paginator.pages} выбранных.",
             )
             pagination_btns = pages(paginator)
             kbds = get_user_cart(
                 level=level,
-                page=page,
+                page=paginator.page,
                 pagination_btns=pagination_btns,
-                vacancy_id=cart.vacancy.vacancy_id,
+                vacancy_id=cart.vacancy_id,
+                cursor=cart.id,
             )
         return image, kbds
     except Exception as e:
@@ -163,6 +190,7 @@ async def get_menu_content(
         page: int | None = None,
         vacancy_id: int | None = None,
         user_id: int | None = None,
+        cursor: int | None = None,
 ):
     """
     Определяет, какую функцию вызвать в зависимости от уровня меню и возвращает соответствующее содержимое.
@@ -174,6 +202,7 @@ async def get_menu_content(
     :param page: Страница пагинации (по умолчанию None).
     :param vacancy_id: Идентификатор вакансии (по умолчанию None).
     :param user_id: Идентификатор пользователя (по умолчанию None).
+    :param cursor: Граничная запись страницы, с которой листают (по умолчанию None).
     :return: Соответствующее содержимое меню.
     """
     try:
@@ -182,9 +211,9 @@ async def get_menu_content(
         elif level == 1:
             return await categories(session, level, menu_name)
         elif level == 2:
-            return await vacancies(session, level, category, page)
+            return await vacancies(session, level, menu_name, category, page, cursor)
         elif level == 3:
-            return await carts(session, level, menu_name, page, user_id, vacancy_id)
+            return await carts(session, level, menu_name, page, user_id, vacancy_id, cursor)
     except Exception as e:
         logger.error(f"Error in get_menu_content: {e}", exc_info=True)
         return InputMediaPhoto(media=DEFAULT_IMAGE_ID, caption=DEFAULT_CAPTION), get_user_main_btns(level=level)
@@ -6,12 +6,13 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.orm_query import orm_add_to_cart, orm_add_user, orm_save_resume
+from database.session import savepoint
 from filters.chat_types import ChatTypeFilter
 from handlers.menu_processing import get_menu_content
 from kbds.inline import MenuCallBack
 
-from services.llm_matching import score_resume_api
-from database.orm_query import orm_save_resume
+from services.llm_matching import resume_content_sha256
+from services.scoring_queue import ATS_STREAMING, ScoringJob, ScoringQueueFull, scoring_queue
 
 
 
@@ -62,7 +63,9 @@ async def add_to_cart(callback: types.CallbackQuery, callback_data: MenuCallBack
             last_name=user.last_name,
             phone=None,
         )
-        await orm_add_to_cart(session, user_id=user.id, vacancy_id=callback_data.vacancy_id)
+        # ошибка записи в корзину не должна откатить добавление пользователя
+        async with savepoint(session):
+            await orm_add_to_cart(session, user_id=user.id, vacancy_id=callback_data.vacancy_id)
         await callback.answer("Вакансия добавлена в список отслеживаемых.")
         logger.info(f"Vacancy {callback_data.vacancy_id} added to cart for user {user.id}")
     except Exception as e:
@@ -84,45 +87,45 @@ async def handle_resume_file(message: types.Message, state: FSMContext, session:
         await state.clear()
         return
 
+    ack = None
     try:
         file_info = await bot.get_file(document.file_id)
         downloaded = await bot.download_file(file_info.file_path)
         resume_bytes = downloaded.read()
 
-        # логируем сам факт загрузки (текст не извлекаем локально)
-        await orm_save_resume(session,
+        # сохраняем загрузку; текст извлечёт воркер и сохранит по хэшу pdf-файла
+        resume = await orm_save_resume(session,
                               user_id=message.from_user.id,
                               vacancy_id=vacancy_id,
                               file_id=document.file_id,
-                              resume_text="")
-
-        await message.reply("Резюме получено. Выполняю оценку…")
-
-        result = await score_resume_api(session, vacancy_id=vacancy_id, resume_bytes=resume_bytes)
-        if "error" in result:
-            await message.answer("Не удалось выполнить оценку. Попробуйте ещё раз позже.")
-            await state.clear()
-            return
-
-        score = result["score_overall"]
-        subs  = result["subscores"]
-        matched = ", ".join(result["skills"]["matched"]) if result["skills"]["matched"] else "—"
-        missing = ", ".join(result["skills"]["missing"]) if result["skills"]["missing"] else "—"
-        snips = result.get("highlights", [])[:3]
-
-        lines = [
-            f"Совместимость: <b>{score:.1f}%</b>",
-            f"Must-have: {subs.get('must_have', 0):.1f}%",
-            f"Optional: {subs.get('optional', 0):.1f}%",
-            f"Совпавшие навыки/требования: {matched}",
-            f"Чего не хватает: {missing}",
-        ]
-        if snips:
-            lines.append("\nЦитаты из резюме:")
-            for i, s in enumerate(snips, 1):
-                lines.append(f"{i}) {s}")
-
-        await message.answer("\n".join(lines), parse_mode="HTML")
+                              content_sha256=resume_content_sha256(resume_bytes))
+        # воркер сохранит оценку по resume_id своей сессией — запись резюме должна быть уже зафиксирована
+        await session.commit()
+
+        job = ScoringJob(
+            chat_id=message.chat.id,
+            vacancy_id=vacancy_id,
+            resume_bytes=resume_bytes,
+            reply_to_message_id=message.message_id,
+            resume_id=resume.resume_id if resume else None,
+        )
+        if ATS_STREAMING:
+            # воркер будет дописывать статусы требований в это сообщение, а в конце заменит его итогом
+            ack = await message.reply("Резюме принято. Выполняю оценку…")
+            job.status_message_id = ack.message_id
+            scoring_queue.submit(job)
+        else:
+            # оценка выполняется в фоне, результат воркер пришлёт отдельным сообщением
+            scoring_queue.submit(job)
+            await message.reply("Резюме принято. Выполняю оценку, результат придёт отдельным сообщением…")
+
+    except ScoringQueueFull:
+        logger.warning(f"Scoring queue is full, resume from user {message.from_user.id} rejected")
+        busy = "Сейчас слишком много резюме на оценке. Попробуйте отправить файл через несколько минут."
+        if ack:
+            await ack.edit_text(busy)
+        else:
+            await message.reply(busy)
 
     except Exception as e:
         logger.exception("Произошла ошибка при обработке резюме")
@@ -175,6 +178,7 @@ async def user_menu(callback: types.CallbackQuery, callback_data: MenuCallBack,
             page=callback_data.page,
             vacancy_id=callback_data.vacancy_id,
             user_id=callback.from_user.id,
+            cursor=callback_data.cursor,
         )
 
         await callback.message.edit_media(media=media, reply_markup=reply_markup)
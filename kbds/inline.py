@@ -9,6 +9,19 @@ class MenuCallBack(CallbackData, prefix="menu"):
     category: int | None = None
     page: int = 1
     vacancy_id: int | None = None
+    # keyset-курсор листания: id граничной записи страницы, с которой пришли
+    cursor: int | None = None
+
+# Шорт-лист кандидатов вакансии для администратора
+class ShortlistCallBack(CallbackData, prefix="shortlist"):
+    action: str  # page | filters | pdf
+    vacancy_id: int
+    min_must: int = 0
+    req: int | None = None  # индекс требования чек-листа, которое должно быть выполнено
+    # keyset-курсор: (score, resume_id) граничной записи текущей страницы
+    score: float | None = None
+    resume_id: int | None = None
+    back: bool = False
 
 # Клавиатура для баннера main (стартового баннера)
 def get_user_main_btns(*, level: int, sizes: tuple[int] = (2,)):
@@ -82,7 +95,8 @@ def get_vacancies_btns(
             level=level,
             menu_name=menu_name,
             category=category,
-            page=(page + 1 if menu_name == 'next' else page - 1)
+            page=(page + 1 if menu_name == 'next' else page - 1),
+            cursor=vacancy_id,
         ).pack()
     ) for text, menu_name in pagination_btns.items()]
             
@@ -95,6 +109,7 @@ def get_user_cart(
         page: int | None,
         pagination_btns: dict | None,
         vacancy_id: int | None,
+        cursor: int | None = None,
         sizes: tuple[int] = (3,)
 ):
     keyboard = InlineKeyboardBuilder()
@@ -111,7 +126,8 @@ def get_user_cart(
             callback_data=MenuCallBack(
                 level=level,
                 menu_name=menu_name,
-                page=(page + 1 if menu_name == 'next' else page - 1)
+                page=(page + 1 if menu_name == 'next' else page - 1),
+                cursor=cursor,
             ).pack()
         ) for text, menu_name in pagination_btns.items()]
 
@@ -147,6 +163,82 @@ def get_callback_btns(*, btns: dict[str, str], sizes: tuple[int] = (2,)):
     return keyboard.adjust(*sizes).as_markup()
 
 
+def get_shortlist_btns(
+        *,
+        vacancy_id: int,
+        min_must: int,
+        req: int | None,
+        candidates: list[tuple[str, int]],
+        prev_cursor: tuple[float, int] | None,
+        next_cursor: tuple[float, int] | None,
+):
+    """
+    Клавиатура страницы шорт-листа.
+
+    :param candidates: (подпись, resume_id) кандидатов страницы — кнопки получения PDF.
+    :param prev_cursor: Курсор первой записи страницы, если есть предыдущая страница.
+    :param next_cursor: Курсор последней записи страницы, если есть следующая страница.
+    """
+    keyboard = InlineKeyboardBuilder()
+    for text, resume_id in candidates:
+        keyboard.row(InlineKeyboardButton(
+            text=f"📄 {text}",
+            callback_data=ShortlistCallBack(action='pdf', vacancy_id=vacancy_id, resume_id=resume_id).pack()
+        ))
+
+    row = []
+    if prev_cursor:
+        row.append(InlineKeyboardButton(
+            text='◀ Пред.',
+            callback_data=ShortlistCallBack(
+                action='page', vacancy_id=vacancy_id, min_must=min_must, req=req,
+                score=prev_cursor[0], resume_id=prev_cursor[1], back=True,
+            ).pack()
+        ))
+    if next_cursor:
+        row.append(InlineKeyboardButton(
+            text='След. ▶',
+            callback_data=ShortlistCallBack(
+                action='page', vacancy_id=vacancy_id, min_must=min_must, req=req,
+                score=next_cursor[0], resume_id=next_cursor[1],
+            ).pack()
+        ))
+    if row:
+        keyboard.row(*row)
+
+    keyboard.row(InlineKeyboardButton(
+        text='Фильтры ⚙️',
+        callback_data=ShortlistCallBack(action='filters', vacancy_id=vacancy_id, min_must=min_must, req=req).pack()
+    ))
+    return keyboard.as_markup()
+
+
+def get_shortlist_filter_btns(
+        *,
+        vacancy_id: int,
+        min_must: int,
+        req: int | None,
+        requirements: list[str],
+        thresholds: tuple[int, ...] = (0, 50, 80, 100),
+):
+    """Клавиатура выбора фильтров шорт-листа: порог must-have и обязательное требование."""
+    keyboard = InlineKeyboardBuilder()
+    keyboard.row(*[InlineKeyboardButton(
+        text=('• ' if t == min_must else '') + f"must ≥ {t}%",
+        callback_data=ShortlistCallBack(action='page', vacancy_id=vacancy_id, min_must=t, req=req).pack()
+    ) for t in thresholds])
+    for i, text in enumerate(requirements):
+        keyboard.row(InlineKeyboardButton(
+            text=('• ' if i == req else '') + f"есть: {text[:48]}",
+            callback_data=ShortlistCallBack(action='page', vacancy_id=vacancy_id, min_must=min_must, req=i).pack()
+        ))
+    keyboard.row(InlineKeyboardButton(
+        text='Сбросить фильтры',
+        callback_data=ShortlistCallBack(action='page', vacancy_id=vacancy_id).pack()
+    ))
+    return keyboard.as_markup()
+
+
 
 
 # def get_url_btns(
@@ -177,4 +269,4 @@ def get_callback_btns(*, btns: dict[str, str], sizes: tuple[int] = (2,)):
 #         else:
 #             keyboard.add(InlineKeyboardButton(text=text, callback_data=value))
 
-#     return keyboard.adjust(*sizes).as_markup()
\ No newline at end of file
+#     return keyboard.adjust(*sizes).as_markup()
@@ -1,8 +1,21 @@
+import os
+import time
+import logging
 from typing import Any, Awaitable, Callable, Dict
 from aiogram import BaseMiddleware
-from aiogram.types import Message, TelegramObject
+from aiogram.types import CallbackQuery, Message, TelegramObject, Update
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
+from database.session import LazySession
+from services.metrics import DB_CONNECTION_SECONDS, DB_SESSION_SECONDS, DB_SESSIONS, DB_STATEMENTS
+
+logger = logging.getLogger(__name__)
+
+# единица работы: orm-функции только делают flush, middleware коммитит один раз на апдейт
+ATS_DB_UNIT_OF_WORK = os.getenv("ATS_DB_UNIT_OF_WORK", "1") == "1"
+
+COMMIT_FAILED_TEXT = "Не удалось сохранить изменения. Попробуйте ещё раз."
+
 
 class DataBaseSession(BaseMiddleware):
     def __init__(self, session_pool: async_sessionmaker):
@@ -20,21 +33,67 @@ class DataBaseSession(BaseMiddleware):
         data: Dict[str, Any],
     ) -> Any:
         """
-        Вызов middleware, добавляющий сессию в данные события.
+        Вызов middleware, добавляющий сессию и фабрику сессий в данные события.
+        Сессия ленивая: создаётся и берёт соединение из пула только при первом обращении обработчика.
+        В режиме единицы работы изменения обработчика коммитятся одним COMMIT после него,
+        а при исключении откатываются. Обработчик к этому моменту уже ответил, поэтому
+        об ошибке COMMIT пользователю сообщается отдельным сообщением.
 
         :param handler: Функция-обработчик события.
         :param event: Объект события Telegram.
         :param data: Словарь данных события.
         :return: Результат вызова обработчика.
         """
+        start = time.perf_counter()
+        outcome = "ok"
+        session = LazySession(self.session_pool, unit_of_work=ATS_DB_UNIT_OF_WORK)
+        data['session'] = session
+        # фабрика сессий для фоновых задач, переживающих обработку апдейта
+        data['session_pool'] = self.session_pool
         try:
-            async with self.session_pool() as session:
-                data['session'] = session
-                return await handler(event, data)
+            result = await handler(event, data)
+            if session.used and session.in_transaction():
+                try:
+                    await session.commit()
+                except Exception:
+                    outcome = "error"
+                    logger.exception("DB commit after handler failed, changes are rolled back")
+                    await self._notify_commit_failed(event)
+            return result
         except Exception as e:
+            outcome = "error"
             # Логирование ошибки или обработка исключения
             print(f"Error in DataBaseSession middleware: {e}")
             raise e
+        finally:
+            await session.close()
+            self._account(session, time.perf_counter() - start, outcome)
+
+    @staticmethod
+    async def _notify_commit_failed(event: TelegramObject) -> None:
+        """Сообщает пользователю, что изменения апдейта не сохранились."""
+        inner = event.event if isinstance(event, Update) else event
+        target = inner.message if isinstance(inner, CallbackQuery) else inner
+        if not isinstance(target, Message):
+            return
+        try:
+            await target.answer(COMMIT_FAILED_TEXT)
+        except Exception as e:
+            logger.warning(f"Cannot notify user about failed commit: {e}")
+
+    @staticmethod
+    def _account(session: LazySession, elapsed: float, outcome: str) -> None:
+        """Учёт по апдейту: была ли сессия, сколько запросов и сколько держалось соединение."""
+        DB_SESSIONS.inc(used=str(session.used).lower())
+        if not session.used:
+            return
+        DB_SESSION_SECONDS.observe(elapsed, outcome=outcome)
+        DB_STATEMENTS.observe(session.statements)
+        DB_CONNECTION_SECONDS.observe(session.connection_seconds)
+        logger.debug(
+            f"DB session: {session.statements} statements, "
+            f"connection held {session.connection_seconds * 1000:.1f} ms of {elapsed * 1000:.1f} ms"
+        )
 
 
 
@@ -0,0 +1,51 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware, Router
+from aiogram.types import TelegramObject
+
+from services.metrics import HANDLER_SECONDS
+
+
+class HandlerMetrics(BaseMiddleware):
+    def __init__(self, router_name: str, event_type: str):
+        """
+        Инициализация middleware, замеряющего время обработчиков роутера.
+
+        :param router_name: Имя роутера для метки router.
+        :param event_type: Тип события (message, callback_query) для метки event.
+        """
+        self.router_name = router_name
+        self.event_type = event_type
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        """
+        Вызывает обработчик и записывает его длительность в гистограмму ats_handler_seconds.
+
+        :param handler: Функция-обработчик события.
+        :param event: Объект события Telegram.
+        :param data: Словарь данных события.
+        :return: Результат вызова обработчика.
+        """
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await handler(event, data)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            HANDLER_SECONDS.observe(
+                time.perf_counter() - start, router=self.router_name, event=self.event_type, outcome=outcome,
+            )
+
+
+def setup_handler_metrics(router: Router, router_name: str) -> None:
+    """Подключает замер времени ко всем обработчикам сообщений и колбеков роутера."""
+    router.message.middleware(HandlerMetrics(router_name, "message"))
+    router.edited_message.middleware(HandlerMetrics(router_name, "edited_message"))
+    router.callback_query.middleware(HandlerMetrics(router_name, "callback_query"))
@@ -0,0 +1,38 @@
+import asyncio
+import logging
+from typing import Coroutine, Set
+
+logger = logging.getLogger(__name__)
+
+# ссылки на фоновые задачи, чтобы их не собрал сборщик мусора до завершения
+_tasks: Set[asyncio.Task] = set()
+
+
+def spawn(coro: Coroutine, name: str) -> asyncio.Task:
+    """
+    Запускает корутину в фоне и логирует её падение.
+
+    :param coro: Корутина фоновой работы.
+    :param name: Имя задачи для логов.
+    :return: Созданная задача.
+    """
+    task = asyncio.create_task(coro, name=name)
+    _tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+
+def _on_done(task: asyncio.Task) -> None:
+    _tasks.discard(task)
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.error(f"Background task '{task.get_name()}' failed: {exc}", exc_info=exc)
+
+
+async def cancel_all() -> None:
+    """Отменяет все фоновые задачи (при остановке бота)."""
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
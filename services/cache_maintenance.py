@@ -0,0 +1,44 @@
+import os
+import time
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from services.background import spawn
+from services.llm_matching import flush_cache_hits, gc_llm_cache
+
+logger = logging.getLogger(__name__)
+
+# ===================== конфигурация =====================
+# бюджет размера таблицы llm_cache; сверх него удаляются давно не использованные записи
+ATS_CACHE_MAX_MB = float(os.getenv("ATS_CACHE_MAX_MB", "512"))
+# как часто запускать GC и сбрасывать отметки попаданий в БД, секунды
+ATS_CACHE_GC_INTERVAL = float(os.getenv("ATS_CACHE_GC_INTERVAL", "3600"))
+ATS_CACHE_HIT_FLUSH_INTERVAL = float(os.getenv("ATS_CACHE_HIT_FLUSH_INTERVAL", "60"))
+# сколько записей удаляется/обновляется одним запросом
+ATS_CACHE_GC_BATCH = int(os.getenv("ATS_CACHE_GC_BATCH", "500"))
+
+
+def start_cache_maintenance(session_pool: async_sessionmaker) -> None:
+    """Запускает фоновое обслуживание llm_cache (отметки попаданий и GC)."""
+    spawn(_maintenance_loop(session_pool), name="llm-cache-maintenance")
+
+
+async def _maintenance_loop(session_pool: async_sessionmaker) -> None:
+    last_gc = 0.0
+    while True:
+        try:
+            async with session_pool() as session:
+                await flush_cache_hits(session, ATS_CACHE_GC_BATCH)
+                if time.monotonic() - last_gc >= ATS_CACHE_GC_INTERVAL:
+                    last_gc = time.monotonic()
+                    stats = await gc_llm_cache(session, int(ATS_CACHE_MAX_MB * 1024 * 1024), ATS_CACHE_GC_BATCH)
+                    if stats["stale_deleted"] or stats["lru_deleted"]:
+                        logger.info(
+                            f"LLM cache GC: {stats['stale_deleted']} stale and {stats['lru_deleted']} LRU entries "
+                            f"removed, {stats['freed_bytes'] / 1024 / 1024:.1f} MB freed."
+                        )
+        except Exception:
+            logger.exception("LLM cache maintenance failed")
+        await asyncio.sleep(ATS_CACHE_HIT_FLUSH_INTERVAL)
@@ -0,0 +1,198 @@
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+from services.metrics import EXTRACT_PAGES, EXTRACT_SECONDS, EXTRACTIONS
+
+logger = logging.getLogger(__name__)
+
+# ===================== конфигурация =====================
+# включить OCR на базе tesseract как промежуточный шаг, если PDF без текста
+ATS_OCR = os.getenv("ATS_OCR", "0").strip().lower() in {"1", "true", "yes"}
+
+# число процессов для парсинга PDF/OCR (0 — по числу ядер)
+ATS_EXTRACT_WORKERS = int(os.getenv("ATS_EXTRACT_WORKERS", "0")) or (os.cpu_count() or 1)
+# сколько заданий может одновременно ждать/выполняться в пуле
+ATS_EXTRACT_QUEUE = int(os.getenv("ATS_EXTRACT_QUEUE", "32"))
+# таймаут на выполнение одного задания (секунды); ожидание свободного процесса в него не входит
+ATS_EXTRACT_TIMEOUT = float(os.getenv("ATS_EXTRACT_TIMEOUT", "60"))
+
+# ===================== локальный парсинг PDF (PyMuPDF) =====================
+def _extract_text_pymupdf(pdf_bytes: bytes) -> Tuple[Optional[str], int]:
+    """Быстрый извлекатель текста для цифровых PDF (без OCR). Возвращает (текст, число страниц)."""
+    try:
+        import fitz
+    except Exception:
+        return None, 0
+    try:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    except Exception:
+        return None, 0
+    pieces: List[str] = []
+    pages = doc.page_count
+    try:
+        for page in doc:
+            txt = page.get_text("text")
+            if txt and txt.strip():
+                pieces.append(txt.strip())
+    finally:
+        doc.close()
+    full = "\n\n".join(pieces).strip()
+    return (full if full else None), pages
+
+def _extract_text_ocr_tesseract(pdf_bytes: bytes) -> Tuple[Optional[str], int]:
+    """OCR как резерв, если PyMuPDF не сработал (требует tesseract и poppler для pdf2image)."""
+    try:
+        import pytesseract
+        from pdf2image import convert_from_bytes
+    except Exception:
+        return None, 0
+    try:
+        images = convert_from_bytes(pdf_bytes)
+    except Exception:
+        return None, 0
+    texts: List[str] = []
+    for img in images:
+        try:
+            txt = pytesseract.image_to_string(img)
+        except Exception:
+            txt = ""
+        if txt and txt.strip():
+            texts.append(txt.strip())
+    full = "\n\n".join(texts).strip()
+    return (full if full else None), len(images)
+
+# замер одного этапа: (этап, секунды, страницы)
+StageTiming = Tuple[str, float, int]
+
+def extract_resume_text_timed(pdf_bytes: bytes) -> Tuple[Optional[str], str, List[StageTiming]]:
+    """
+    PyMuPDF, затем (опционально) OCR. Выполняется в процессе пула.
+    Возвращает (текст, способ, замеры этапов) — метрики пишет родительский процесс.
+    """
+    stages: List[StageTiming] = []
+    start = time.perf_counter()
+    text, pages = _extract_text_pymupdf(pdf_bytes)
+    stages.append(("pymupdf", time.perf_counter() - start, pages))
+    if text:
+        return text, "pymupdf", stages
+    if ATS_OCR:
+        start = time.perf_counter()
+        ocr_text, pages = _extract_text_ocr_tesseract(pdf_bytes)
+        stages.append(("ocr", time.perf_counter() - start, pages))
+        if ocr_text and ocr_text.strip():
+            return ocr_text, "ocr", stages
+    return None, "none", stages
+
+def extract_resume_text(pdf_bytes: bytes) -> Tuple[Optional[str], str]:
+    """PyMuPDF, затем (опционально) OCR. Возвращает (текст, способ)."""
+    text, method, _ = extract_resume_text_timed(pdf_bytes)
+    return text, method
+
+# ===================== пул процессов =====================
+class ExtractionQueueFull(Exception):
+    """Очередь на извлечение текста переполнена."""
+
+
+class ExtractionTimeout(Exception):
+    """Локальное извлечение не уложилось в таймаут или пул процессов упал (временная ошибка)."""
+
+
+class ExtractionExecutor:
+    def __init__(self, workers: int, max_pending: int, timeout: float):
+        """
+        Пул процессов для парсинга PDF, чтобы не блокировать event loop.
+
+        :param workers: Число процессов.
+        :param max_pending: Максимум заданий в работе и в ожидании.
+        :param timeout: Таймаут на выполнение одного задания (секунды), без ожидания свободного процесса.
+        """
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        # в пул отправляется не больше workers заданий — остальные ждут здесь, и их ожидание не входит в таймаут
+        self._slots = asyncio.Semaphore(workers)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            logger.info(f"Extraction pool started with {self.workers} workers.")
+        return self._pool
+
+    async def extract(self, pdf_bytes: bytes) -> Tuple[Optional[str], str]:
+        """
+        Извлекает текст резюме в отдельном процессе.
+
+        :return: (текст или None, способ: pymupdf | ocr | none | timeout | error).
+        :raises ExtractionQueueFull: Если очередь заданий заполнена.
+        """
+        if self._pending >= self.max_pending:
+            raise ExtractionQueueFull(f"extraction queue is full ({self._pending})")
+        self._pending += 1
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            self._pending -= 1
+            raise
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._get_pool().submit(extract_resume_text_timed, pdf_bytes)
+        except BaseException:
+            self._release()
+            raise
+        # задание занимает процесс (и место в очереди), пока процесс его не закончит — даже после нашего таймаута
+        future.add_done_callback(lambda _: self._release_threadsafe(loop))
+        try:
+            text, method, stages = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)), timeout=self.timeout,
+            )
+            for stage, seconds, pages in stages:
+                EXTRACT_SECONDS.observe(seconds, stage=stage)
+                EXTRACT_PAGES.observe(pages, stage=stage)
+            EXTRACTIONS.inc(method=method)
+            return text, method
+        except asyncio.TimeoutError:
+            # процесс доработает задание сам, результат просто отбрасываем
+            logger.warning(f"PDF extraction timed out after {self.timeout}s")
+            EXTRACTIONS.inc(method="timeout")
+            return None, "timeout"
+        except BrokenProcessPool:
+            # упавший процесс ломает весь пул — пересоздадим при следующем задании
+            logger.error("Extraction pool is broken, restarting.", exc_info=True)
+            self.shutdown()
+            EXTRACTIONS.inc(method="error")
+            return None, "error"
+
+    def _release(self) -> None:
+        self._pending -= 1
+        self._slots.release()
+
+    def _release_threadsafe(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # цикл событий уже закрыт (остановка бота)
+            pass
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            logger.info("Extraction pool stopped.")
+
+
+extraction_executor = ExtractionExecutor(
+    workers=ATS_EXTRACT_WORKERS,
+    max_pending=ATS_EXTRACT_QUEUE,
+    timeout=ATS_EXTRACT_TIMEOUT,
+)
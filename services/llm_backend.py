@@ -0,0 +1,442 @@
+import os
+import re
+import json
+import math
+import random
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from openai import AsyncOpenAI, APIConnectionError, InternalServerError, RateLimitError
+
+from services.extraction import extract_resume_text
+from services.llm_schemas import Requirement, RequirementScores, ScoredRequirement, VacancyRequirements
+from services.prefilter import build_token_index, tag_matches, tokenize
+
+# ===================== конфигурация =====================
+# openai — реальный API; fake — локальная имитация для нагрузочных тестов без сети и расходов
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").strip().lower()
+
+# задержка fake-бэкенда: логнормальное распределение с медианой и разбросом (sigma)
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "400"))
+FAKE_LLM_LATENCY_SIGMA = float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5"))
+# доля вызовов, завершающихся 429 и временной ошибкой (5xx / сеть)
+FAKE_LLM_429_RATE = float(os.getenv("FAKE_LLM_429_RATE", "0"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_SEED = os.getenv("FAKE_LLM_SEED")
+
+
+class LLMRateLimited(Exception):
+    """Провайдер ответил 429; retry_after — рекомендованная пауза, если известна."""
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__(f"rate limited (retry after {retry_after})")
+        self.retry_after = retry_after
+
+
+class LLMTransientError(Exception):
+    """Временная ошибка (сеть, таймаут, 5xx) — вызов можно повторить."""
+
+
+ItemSink = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class LLMResult:
+    parsed: Any
+    model: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    # часть input_tokens, взятая из кэша промптов провайдера (тарифицируется дешевле)
+    cached_tokens: int = 0
+
+
+class LLMBackend:
+    """
+    Интерфейс LLM-провайдера для пайплайна оценки.
+    Ошибки лимитов и временные сбои реализации приводят к LLMRateLimited / LLMTransientError,
+    повторы и ограничение частоты — на стороне вызывающего кода.
+    """
+    name = "base"
+
+    async def parse_requirements(self, vacancy_text: str, model: str, max_output_tokens: int) -> LLMResult:
+        """Чек-лист требований вакансии (parsed: VacancyRequirements)."""
+        raise NotImplementedError
+
+    async def score_from_text(
+        self, resume_text: str, requirements: List[Dict[str, Any]], model: str, max_output_tokens: int
+    ) -> LLMResult:
+        """Статусы требований по тексту резюме (parsed: RequirementScores)."""
+        raise NotImplementedError
+
+    async def stream_score_from_text(
+        self, resume_text: str, requirements: List[Dict[str, Any]], model: str, max_output_tokens: int, on_item: ItemSink
+    ) -> LLMResult:
+        """
+        То же, что score_from_text, но каждый оценённый пункт передаётся в on_item, как только он готов.
+        По умолчанию — без потоковой передачи: все пункты после ответа целиком.
+        """
+        result = await self.score_from_text(resume_text, requirements, model, max_output_tokens)
+        for item in result.parsed.per_requirement:
+            await on_item(item.model_dump())
+        return result
+
+    async def score_from_file(
+        self, file_id: str, requirements: List[Dict[str, Any]], model: str, max_output_tokens: int
+    ) -> LLMResult:
+        """Статусы требований по загруженному PDF (parsed: RequirementScores)."""
+        raise NotImplementedError
+
+    async def upload_file(self, resume_bytes: bytes) -> str:
+        """Загружает PDF и возвращает file_id."""
+        raise NotImplementedError
+
+
+# ===================== OpenAI =====================
+_INSTRUCTIONS_REQUIREMENTS = (
+    "Extract a concise checklist of job requirements.\n"
+    "- Split composite items into atomic requirements (e.g., 'replication, migrations, backups' -> three lines).\n"
+    "- Set must=true for mandatory items; otherwise false.\n"
+    "- Infer min_years/level if explicitly present.\n"
+    "- Keep tags short (e.g., 'postgresql','replication','backup').\n"
+    "- Only include weight if explicitly implied; otherwise leave it null."
+)
+
+_INSTRUCTIONS_SCORE_FILE = (
+    "You are an ATS evaluator.\n"
+    "- For each requirement return status in {1, 0.5, 0}.\n"
+    "- Include 1–2 verbatim quotes from the resume as evidence; avoid hallucinations.\n"
+    "- If years of experience can be inferred, include it in 'years'.\n"
+    "- Reject non-relevant quotes; do not duplicate evidence strings."
+)
+
+_INSTRUCTIONS_SCORE_TEXT = (
+    "You are an ATS evaluator.\n"
+    "- For each requirement return status in {1, 0.5, 0}.\n"
+    "- Evidence must be verbatim quotes from the provided resume TEXT; avoid hallucinations.\n"
+    "- If years of experience can be inferred, include it in 'years'.\n"
+    "- No duplicate evidence strings. If no relevant quote exists, set status=0."
+)
+
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(self, timeout: float = 60.0):
+        # повторы делает вызывающий код через общий лимитер, встроенные повторы клиента отключены
+        self.client = AsyncOpenAI(timeout=timeout, max_retries=0)
+
+    async def _call(self, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            resp = await coro_fn()
+        except RateLimitError as e:
+            raise LLMRateLimited(_retry_after(e)) from e
+        except (APIConnectionError, InternalServerError) as e:
+            raise LLMTransientError(f"{e.__class__.__name__}: {e}") from e
+        return resp
+
+    async def _parse(self, model: str, **kwargs: Any) -> LLMResult:
+        resp = await self._call(lambda: self.client.responses.parse(
+            model=model,
+            temperature=0,
+            top_p=1,
+            **kwargs,
+        ))
+        return _result(resp, model)
+
+    async def parse_requirements(self, vacancy_text: str, model: str, max_output_tokens: int) -> LLMResult:
+        return await self._parse(
+            model,
+            instructions=_INSTRUCTIONS_REQUIREMENTS,
+            input=f"Vacancy text:\n{vacancy_text}",
+            text_format=VacancyRequirements,
+            max_output_tokens=max_output_tokens,
+        )
+
+    async def score_from_file(
+        self, file_id: str, requirements: List[Dict[str, Any]], model: str, max_output_tokens: int
+    ) -> LLMResult:
+        return await self._parse(
+            model,
+            instructions=_INSTRUCTIONS_SCORE_FILE,
+            input=[{
+                "role": "user",
+                "content": [
+                    {"type": "input_text",
+                     "text": "Requirements JSON:\n" + json.dumps({"requirements": requirements}, ensure_ascii=False)},
+                    {"type": "input_file", "file_id": file_id},
+                ],
+            }],
+            text_format=RequirementScores,
+            max_output_tokens=max_output_tokens,
+        )
+
+    async def score_from_text(
+        self, resume_text: str, requirements: List[Dict[str, Any]], model: str, max_output_tokens: int
+    ) -> LLMResult:
+        return await self._parse(
+            model,
+            instructions=_INSTRUCTIONS_SCORE_TEXT,
+            input=_text_scoring_input(resume_text, requirements),
+            text_format=RequirementScores,
+            max_output_tokens=max_output_tokens,
+        )
+
+    async def stream_score_from_text(
+        self, resume_text: str, requirements: List[Dict[str, Any]], model: str, max_output_tokens: int, on_item: ItemSink
+    ) -> LLMResult:
+        items = _ArrayItemStream("per_requirement")
+
+        async def _stream() -> Any:
+            async with self.client.responses.stream(
+                model=model,
+                instructions=_INSTRUCTIONS_SCORE_TEXT,
+                input=_text_scoring_input(resume_text, requirements),
+                text_format=RequirementScores,
+                temperature=0,
+                top_p=1,
+                max_output_tokens=max_output_tokens,
+            ) as stream:
+                async for event in stream:
+                    if event.type != "response.output_text.delta":
+                        continue
+                    for raw in items.feed(event.delta):
+                        try:
+                            item = ScoredRequirement.model_validate(raw)
+                        except ValueError:
+                            continue
+                        await on_item(item.model_dump())
+                return await stream.get_final_response()
+
+        resp = await self._call(_stream)
+        return _result(resp, model)
+
+    async def upload_file(self, resume_bytes: bytes) -> str:
+        uploaded = await self._call(
+            lambda: self.client.files.create(file=("resume.pdf", resume_bytes), purpose="user_data")
+        )
+        return uploaded.id
+
+
+def _result(resp: Any, model: str) -> LLMResult:
+    """ распарсенный ответ Responses API и расход токенов из usage """
+    usage = getattr(resp, "usage", None)
+    details = getattr(usage, "input_tokens_details", None)
+    return LLMResult(
+        parsed=resp.output_parsed,
+        model=model,
+        input_tokens=getattr(usage, "input_tokens", 0) or 0,
+        output_tokens=getattr(usage, "output_tokens", 0) or 0,
+        cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+    )
+
+def _text_scoring_input(resume_text: str, requirements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{
+        "role": "user",
+        "content": [
+            {"type": "input_text",
+             "text": "Requirements JSON:\n" + json.dumps({"requirements": requirements}, ensure_ascii=False)},
+            {"type": "input_text",
+             "text": "RESUME TEXT (verbatim):\n" + resume_text},
+        ],
+    }]
+
+
+class _ArrayItemStream:
+    def __init__(self, field: str):
+        """Достаёт из потока JSON-текста элементы массива field по мере того, как они приходят целиком."""
+        self.field = field
+        self._buffer = ""
+        self._pos: Optional[int] = None
+        self._done = False
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, delta: str) -> List[Any]:
+        self._buffer += delta
+        if self._done:
+            return []
+        if self._pos is None:
+            start = self._buffer.find(f'"{self.field}"')
+            bracket = self._buffer.find("[", start) if start >= 0 else -1
+            if bracket < 0:
+                return []
+            self._pos = bracket + 1
+        items = []
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n,":
+                self._pos += 1
+            if self._pos >= len(self._buffer):
+                return items
+            if self._buffer[self._pos] == "]":
+                self._done = True
+                return items
+            try:
+                item, self._pos = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # элемент пришёл не полностью — ждём следующих фрагментов
+                return items
+            items.append(item)
+
+
+def _retry_after(exc: Any) -> Optional[float]:
+    """Пауза из заголовков retry-after-ms / retry-after ответа 429."""
+    response = getattr(exc, "response", None)
+    headers = response.headers if response is not None else {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+# ===================== fake (локальная имитация) =====================
+_LINE_STRIP = " \t-•*·—"
+_YEARS_RE = re.compile(r"(\d{1,2})\+?\s*(?:год|лет|year)", re.IGNORECASE)
+_WORD_RE = re.compile(r"[A-Za-zА-Яа-яЁё][A-Za-zА-Яа-яЁё0-9+#.]{2,}")
+_MUST_MARKERS = ("обязательн", "необходим", "требуется", "must", "required")
+# слова, которые не годятся в теги требования
+_TAG_STOPWORDS = frozenset((
+    "опыт", "опыта", "знание", "знания", "умение", "навыки", "работы", "лет", "года", "обязательно",
+    "необходимо", "желательно", "плюсом", "будет", "уровень", "experience", "knowledge", "with",
+    "and", "the", "years", "required", "must", "nice", "have",
+))
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeBackend(LLMBackend):
+    """
+    Детерминированная имитация LLM: требования — строки вакансии, статусы — совпадение тегов
+    с текстом резюме. Задержки и ошибки (429, 5xx) генерируются по настройкам.
+    """
+    name = "fake"
+
+    def __init__(
+        self,
+        latency_ms: float = 400.0,
+        latency_sigma: float = 0.5,
+        rate_limit_rate: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._files: Dict[str, bytes] = {}
+        self.calls = 0
+
+    async def _sleep(self, latency_ms: float) -> None:
+        if latency_ms > 0:
+            await asyncio.sleep(self._rng.lognormvariate(math.log(latency_ms / 1000.0), self.latency_sigma))
+
+    async def _simulate(self, latency_ms: Optional[float] = None) -> None:
+        self.calls += 1
+        roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            await asyncio.sleep(0.01)
+            raise LLMRateLimited(retry_after=1.0)
+        await self._sleep(self.latency_ms if latency_ms is None else latency_ms)
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise LLMTransientError("fake backend: injected server error")
+
+    async def parse_requirements(self, vacancy_text: str, model: str, max_output_tokens: int) -> LLMResult:
+        await self._simulate()
+        lines = [line.strip(_LINE_STRIP) for line in vacancy_text.splitlines()]
+        # первая строка — название вакансии
+        items = [line for line in lines[1:] if _WORD_RE.search(line)][:12]
+        requirements: List[Requirement] = []
+        for i, line in enumerate(items):
+            words = {w.lower().strip(".") for w in _WORD_RE.findall(line)} - _TAG_STOPWORDS
+            words = sorted(words, key=lambda w: (-len(w), w))
+            lowered = line.lower()
+            years = _YEARS_RE.search(line)
+            requirements.append(Requirement(
+                text=line,
+                tags=words[:3],
+                must=any(m in lowered for m in _MUST_MARKERS) or i < len(items) // 2,
+                min_years=float(years.group(1)) if years else None,
+            ))
+        parsed = VacancyRequirements(requirements=requirements)
+        return LLMResult(parsed, model, _approx_tokens(vacancy_text), _approx_tokens(parsed.model_dump_json()))
+
+    def _score(self, resume_text: str, requirements: List[Dict[str, Any]], model: str) -> LLMResult:
+        index = build_token_index(resume_text)
+        resume_lines = [line.strip() for line in resume_text.splitlines() if line.strip()]
+        years = _YEARS_RE.search(resume_text)
+        scored: List[ScoredRequirement] = []
+        for i, r in enumerate(requirements):
+            tags = r.get("tags") or []
+            hits = [t for t in tags if tag_matches(t, index)]
+            status = 1.0 if tags and len(hits) == len(tags) else (0.5 if hits else 0.0)
+            evidence: List[str] = []
+            if hits:
+                tokens = set(tokenize(hits[0]))
+                quote = next((line for line in resume_lines if tokens & set(tokenize(line))), None)
+                if quote:
+                    evidence.append(quote[:300])
+            scored.append(ScoredRequirement(
+                req_index=i,
+                status=status,
+                years=float(years.group(1)) if years and status > 0 else None,
+                evidence=evidence,
+            ))
+        parsed = RequirementScores(per_requirement=scored)
+        prompt = json.dumps({"requirements": requirements}, ensure_ascii=False) + resume_text
+        return LLMResult(parsed, model, _approx_tokens(prompt), _approx_tokens(parsed.model_dump_json()))
+
+    async def score_from_text(
+        self, resume_text: str, requirements: List[Dict[str, Any]], model: str, max_output_tokens: int
+    ) -> LLMResult:
+        await self._simulate()
+        return self._score(resume_text, requirements, model)
+
+    async def stream_score_from_text(
+        self, resume_text: str, requirements: List[Dict[str, Any]], model: str, max_output_tokens: int, on_item: ItemSink
+    ) -> LLMResult:
+        # задержка распределяется между пунктами, как при потоковой генерации
+        step_ms = self.latency_ms / (len(requirements) + 1)
+        await self._simulate(step_ms)
+        result = self._score(resume_text, requirements, model)
+        for item in result.parsed.per_requirement:
+            await self._sleep(step_ms)
+            await on_item(item.model_dump())
+        return result
+
+    async def score_from_file(
+        self, file_id: str, requirements: List[Dict[str, Any]], model: str, max_output_tokens: int
+    ) -> LLMResult:
+        await self._simulate()
+        data = self._files.get(file_id)
+        if data is None:
+            raise ValueError(f"Unknown file_id {file_id}")
+        text, _ = await asyncio.to_thread(extract_resume_text, data)
+        return self._score(text or "", requirements, model)
+
+    async def upload_file(self, resume_bytes: bytes) -> str:
+        await self._simulate()
+        file_id = "file-fake-" + hashlib.sha256(resume_bytes).hexdigest()[:24]
+        self._files[file_id] = resume_bytes
+        return file_id
+
+
+def create_backend(name: str = LLM_BACKEND) -> LLMBackend:
+    """Бэкенд по имени из LLM_BACKEND (openai | fake)."""
+    if name == "openai":
+        return OpenAIBackend()
+    if name == "fake":
+        return FakeBackend(
+            latency_ms=FAKE_LLM_LATENCY_MS,
+            latency_sigma=FAKE_LLM_LATENCY_SIGMA,
+            rate_limit_rate=FAKE_LLM_429_RATE,
+            error_rate=FAKE_LLM_ERROR_RATE,
+            seed=int(FAKE_LLM_SEED) if FAKE_LLM_SEED else None,
+        )
+    raise ValueError(f"Unknown LLM_BACKEND: {name}")
@@ -0,0 +1,205 @@
+import os
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.orm_query import (
+    orm_add_llm_ledger_entries,
+    orm_get_db_now,
+    orm_get_llm_spend_by_day,
+    orm_get_llm_spend_by_vacancy,
+)
+from services.background import spawn
+from services.llm_backend import LLMResult
+
+logger = logging.getLogger(__name__)
+
+# ===================== конфигурация =====================
+# цены за 1M токенов в USD: "модель=input/cached_input/output;..." (модели без цены пишутся с нулевой стоимостью)
+LLM_PRICES = os.getenv("LLM_PRICES", "gpt-4o=2.50/1.25/10.00;gpt-4o-mini=0.15/0.075/0.60")
+# как часто и какими пачками записи журнала уходят в БД
+ATS_LEDGER_FLUSH_INTERVAL = float(os.getenv("ATS_LEDGER_FLUSH_INTERVAL", "5"))
+ATS_LEDGER_BATCH = int(os.getenv("ATS_LEDGER_BATCH", "200"))
+# сколько записей может ждать записи (при недоступной БД лишние отбрасываются)
+ATS_LEDGER_MAX_PENDING = int(os.getenv("ATS_LEDGER_MAX_PENDING", "10000"))
+
+
+def parse_prices(spec: str) -> Dict[str, Tuple[float, float, float]]:
+    """
+    Разбирает LLM_PRICES.
+
+    :param spec: Строка вида "gpt-4o=2.50/1.25/10.00;gpt-4o-mini=0.15/0.075/0.60".
+    :return: {модель: (input, cached_input, output)} в USD за 1M токенов.
+    """
+    prices: Dict[str, Tuple[float, float, float]] = {}
+    for part in spec.split(";"):
+        if not part.strip():
+            continue
+        model, _, values = part.partition("=")
+        numbers = [float(v) for v in values.split("/")]
+        if len(numbers) != 3:
+            raise ValueError(f"LLM_PRICES: expected input/cached/output for {model.strip()!r}")
+        prices[model.strip()] = (numbers[0], numbers[1], numbers[2])
+    return prices
+
+
+PRICES = parse_prices(LLM_PRICES)
+
+
+def call_cost(model: str, input_tokens: int, cached_tokens: int, output_tokens: int) -> float:
+    """Стоимость вызова в USD по LLM_PRICES (0, если цена модели не задана)."""
+    price = PRICES.get(model)
+    if price is None:
+        return 0.0
+    per_input, per_cached, per_output = price
+    return (
+        (input_tokens - cached_tokens) * per_input + cached_tokens * per_cached + output_tokens * per_output
+    ) / 1_000_000
+
+
+# ===================== контекст вызовов =====================
+# вакансия и путь оценки, к которым относятся LLM-вызовы текущей задачи
+_context: ContextVar[Dict[str, Any]] = ContextVar("llm_ledger_context", default={})
+
+
+@contextmanager
+def ledger_context(**values: Any) -> Iterator[None]:
+    """Дополняет контекст журнала (vacancy_id, mode) для вызовов внутри блока with."""
+    token = _context.set({**_context.get(), **values})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+# ===================== запись журнала =====================
+class LedgerWriter:
+    def __init__(self, batch: int, interval: float, max_pending: int):
+        """
+        Копит записи о вызовах LLM в памяти и пишет их в БД пачками в фоне,
+        чтобы учёт не добавлял задержку к оценке резюме.
+
+        :param batch: Записей в одном INSERT.
+        :param interval: Период записи, секунды.
+        :param max_pending: Максимум записей в ожидании.
+        """
+        self.batch = batch
+        self.interval = interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._session_pool: Optional[async_sessionmaker] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def start(self, session_pool: async_sessionmaker) -> None:
+        """Запускает фоновую запись. До запуска (бенчмарк, скрипты) record ничего не делает."""
+        self._session_pool = session_pool
+        self._wake = asyncio.Event()
+        spawn(self._loop(), name="llm-ledger-writer")
+
+    async def stop(self) -> None:
+        """Записывает накопленное (при остановке бота)."""
+        if self._session_pool is not None:
+            await self.flush()
+            self._session_pool = None
+
+    def record(self, call: str, backend: str, result: LLMResult, latency: float) -> None:
+        if self._session_pool is None:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        context = _context.get()
+        self._pending.append({
+            "call": call,
+            "backend": backend,
+            "model": result.model,
+            "mode": context.get("mode"),
+            "vacancy_id": context.get("vacancy_id"),
+            "input_tokens": result.input_tokens,
+            "cached_tokens": result.cached_tokens,
+            "output_tokens": result.output_tokens,
+            "latency_ms": int(latency * 1000),
+            "cost_usd": call_cost(result.model, result.input_tokens, result.cached_tokens, result.output_tokens),
+        })
+        if len(self._pending) >= self.batch:
+            self._wake.set()
+
+    async def flush(self) -> int:
+        written = 0
+        while self._pending:
+            entries = self._pending[:self.batch]
+            del self._pending[:self.batch]
+            try:
+                async with self._session_pool() as session:
+                    await orm_add_llm_ledger_entries(session, entries)
+            except Exception:
+                # вернём пачку в начало очереди и попробуем на следующем цикле
+                room = max(0, self.max_pending - len(self._pending))
+                self.dropped += len(entries) - min(room, len(entries))
+                self._pending[:0] = entries[:room]
+                break
+            written += len(entries)
+        if self.dropped:
+            logger.warning(f"LLM ledger dropped {self.dropped} entries (queue limit {self.max_pending}).")
+            self.dropped = 0
+        return written
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("LLM ledger flush failed")
+
+
+ledger = LedgerWriter(batch=ATS_LEDGER_BATCH, interval=ATS_LEDGER_FLUSH_INTERVAL, max_pending=ATS_LEDGER_MAX_PENDING)
+
+
+# ===================== отчёт =====================
+async def spend_summary(session: AsyncSession, days: int, top: int = 10) -> Dict[str, Any]:
+    """
+    Расходы на LLM за последние days дней: итог, по дням и самые затратные вакансии.
+    """
+    # окно — по часам БД, которыми заполнен created_at (часовые пояса процесса и БД могут различаться)
+    since = await orm_get_db_now(session) - timedelta(days=days)
+    by_day = await orm_get_llm_spend_by_day(session, since)
+    by_vacancy = await orm_get_llm_spend_by_vacancy(session, since, top)
+    day_rows = [
+        {
+            "day": str(day),
+            "calls": calls,
+            "input_tokens": int(inp or 0),
+            "cached_tokens": int(cached or 0),
+            "output_tokens": int(out or 0),
+            "cost_usd": float(cost or 0.0),
+        }
+        for day, calls, inp, cached, out, cost in by_day
+    ]
+    return {
+        "total": {
+            key: sum(row[key] for row in day_rows)
+            for key in ("calls", "input_tokens", "cached_tokens", "output_tokens", "cost_usd")
+        },
+        "by_day": day_rows,
+        "by_vacancy": [
+            {
+                "vacancy_id": vacancy_id,
+                "name": name,
+                "calls": calls,
+                "cost_usd": float(cost or 0.0),
+                "llm_file_cost_usd": float(file_cost or 0.0),
+            }
+            for vacancy_id, name, calls, cost, file_cost in by_vacancy
+        ],
+    }
@@ -1,16 +1,43 @@
 import os
 import json
+import random
+import asyncio
 import hashlib
-from typing import Any, Dict, List, Tuple, Optional
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple, Optional
 
-from pydantic import BaseModel, Field
-from openai import AsyncOpenAI
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 
+from database.dialect import upsert_insert
 from database.models import Vacancy, LLMCache
+from database.session import commit, rollback
+from database.orm_query import (
+    orm_backfill_llm_cache,
+    orm_delete_lru_llm_cache,
+    orm_delete_stale_llm_cache,
+    orm_get_llm_cache_usage,
+    orm_get_resume_text,
+    orm_save_resume_score,
+    orm_save_resume_text,
+    orm_touch_llm_cache,
+)
+from services.background import spawn
+from services.extraction import extraction_executor, ExtractionQueueFull, ExtractionTimeout
+from services.llm_backend import ItemSink, LLMRateLimited, LLMResult, LLMTransientError, create_backend
+from services.llm_ledger import ledger, ledger_context
+from services.llm_schemas import RequirementScores, VacancyRequirements
+from services.metrics import CACHE_LOOKUPS, LLM_CALL_SECONDS, LLM_CALLS, LLM_TOKENS
+from services.prefilter import prefilter_resume
+from services.rate_limiter import AdaptiveRateLimiter
+from services.singleflight import SingleFlight
+from utils.memory_cache import MemoryCache
+from utils.payload_codec import PayloadCodec, PayloadDecodeError
+
+logger = logging.getLogger(__name__)
 
 # ===================== конфигурация =====================
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
@@ -19,14 +46,58 @@ MAX_OUTPUT_TOKENS = int(os.getenv("MAX_OUTPUT_TOKENS", "1200"))
 # как извлекать текст резюме: "local" (по умолчанию) или "llm"
 ATS_EXTRACT_MODE = os.getenv("ATS_EXTRACT_MODE", "local").strip().lower()
 
-# включить OCR на базе tesseract как промежуточный шаг, если PDF без текста
-ATS_OCR = os.getenv("ATS_OCR", "0").strip().lower() in {"1", "true", "yes"}
-
 # версии правил/промптов — меняем при правках, чтобы удалить старый кэш
 PROMPT_VERSION = os.getenv("PROMPT_VERSION", "2025-08-11a")
 RULES_VERSION  = os.getenv("RULES_VERSION",  "2025-08-11a")
 
-client = AsyncOpenAI(timeout=60.0, max_retries=2)
+# каскадный скоринг: дешёвая модель оценивает всех, сильная — только пограничных кандидатов
+ATS_SCORING_MODE = os.getenv("ATS_SCORING_MODE", "single").strip().lower()  # single | cascade
+LLM_MODEL_FAST = os.getenv("LLM_MODEL_FAST", "gpt-4o-mini")
+# диапазон score_overall быстрой модели (включительно), в котором оценку уточняет LLM_MODEL
+_band = os.getenv("ATS_CASCADE_BAND", "40,75").split(",")
+ATS_CASCADE_LOW, ATS_CASCADE_HIGH = float(_band[0]), float(_band[1])
+
+# локальный предфильтр по тегам must-требований (без LLM-вызова для явно нерелевантных резюме)
+ATS_PREFILTER = os.getenv("ATS_PREFILTER", "0").strip().lower() in {"1", "true", "yes"}
+# минимальная доля must-требований (0..1), найденных в тексте резюме
+ATS_PREFILTER_THRESHOLD = float(os.getenv("ATS_PREFILTER_THRESHOLD", "0.25"))
+
+# in-memory уровень кэша перед таблицей llm_cache
+ATS_MEMCACHE_ITEMS = int(os.getenv("ATS_MEMCACHE_ITEMS", "2048"))
+ATS_MEMCACHE_MB = float(os.getenv("ATS_MEMCACHE_MB", "64"))
+ATS_MEMCACHE_TTL = float(os.getenv("ATS_MEMCACHE_TTL", "3600"))
+
+# формат новых записей llm_cache: binary (msgpack + zstd, колонка payload_bin) или json (payload_json)
+ATS_CACHE_FORMAT = os.getenv("ATS_CACHE_FORMAT", "binary").strip().lower()
+ATS_CACHE_ZSTD_LEVEL = int(os.getenv("ATS_CACHE_ZSTD_LEVEL", "3"))
+
+# общий лимит на все вызовы OpenAI (запросы и токены в минуту) и число повторов при 429/сбоях сети
+LLM_RPM = float(os.getenv("LLM_RPM", "500"))
+LLM_TPM = float(os.getenv("LLM_TPM", "30000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+# оценка токенов PDF, переданного файлом (размер промпта заранее неизвестен)
+LLM_FILE_INPUT_TOKENS = int(os.getenv("LLM_FILE_INPUT_TOKENS", "4000"))
+
+# LLM-провайдер (LLM_BACKEND=openai | fake), см. services/llm_backend.py
+backend = create_backend()
+
+_rate_limiter = AdaptiveRateLimiter(rpm=LLM_RPM, tpm=LLM_TPM)
+
+_memory_cache = MemoryCache(
+    max_items=ATS_MEMCACHE_ITEMS,
+    max_bytes=int(ATS_MEMCACHE_MB * 1024 * 1024),
+    ttl=ATS_MEMCACHE_TTL,
+)
+
+_codec = PayloadCodec(zstd_level=ATS_CACHE_ZSTD_LEVEL)
+
+# виды записей llm_cache, которые устаревают при смене PROMPT_VERSION / RULES_VERSION
+_PROMPT_VERSIONED_KINDS = {"requirements", "stage_scores", "req_item", "final_score"}
+_RULES_VERSIONED_KINDS = {"final_score"}
+
+# ключи, по которым были попадания с последнего сброса last_hit_at в БД
+_pending_hits: Set[str] = set()
+_PENDING_HITS_LIMIT = 100_000
 
 # ===================== utils & cache =====================
 def _sha256_hex(*parts: bytes) -> str:
@@ -36,6 +107,12 @@ def _sha256_hex(*parts: bytes) -> str:
         h.update(p)
     return h.hexdigest()
 
+def _backend_profile() -> List[bytes]:
+    """ доп. часть ключей для не-OpenAI бэкендов, чтобы их результаты не смешивались с настоящими """
+    if backend.name == "openai":
+        return []
+    return [f"backend|{backend.name}".encode("utf-8")]
+
 def _cache_key_requirements(vacancy_text: str) -> str:
     """ ключ для кэша требований вакансии """
     key = _sha256_hex(
@@ -43,9 +120,16 @@ def _cache_key_requirements(vacancy_text: str) -> str:
         LLM_MODEL.encode("utf-8"),
         PROMPT_VERSION.encode("utf-8"),
         vacancy_text.encode("utf-8", "ignore"),
+        *_backend_profile(),
     )
     return key
 
+def _scoring_profile() -> List[bytes]:
+    """ доп. части финального ключа для каскада (в режиме single ключи не меняются) """
+    if ATS_SCORING_MODE != "cascade":
+        return []
+    return [f"cascade|{LLM_MODEL_FAST}|{ATS_CASCADE_LOW}|{ATS_CASCADE_HIGH}".encode("utf-8")]
+
 def _cache_key_final_from_text(vacancy_text: str, resume_text_sha: str) -> str:
     """ ключ финального результата (когда есть локально извлечённый текст) """
     key = _sha256_hex(
@@ -56,6 +140,8 @@ def _cache_key_final_from_text(vacancy_text: str, resume_text_sha: str) -> str:
         RULES_VERSION.encode("utf-8"),
         vacancy_text.encode("utf-8", "ignore"),
         resume_text_sha.encode("utf-8"),
+        *_scoring_profile(),
+        *_backend_profile(),
     )
     return key
 
@@ -69,132 +155,325 @@ def _cache_key_final_from_bytes(vacancy_text: str, resume_bytes: bytes) -> str:
         RULES_VERSION.encode("utf-8"),
         vacancy_text.encode("utf-8", "ignore"),
         resume_bytes,
+        *_scoring_profile(),
+        *_backend_profile(),
+    )
+    return key
+
+def _cache_key_stage(vacancy_text: str, resume_ref: str, model: str) -> str:
+    """ ключ результата одной ступени каскада (per-requirement статусы конкретной модели) """
+    key = _sha256_hex(
+        b"stage",
+        model.encode("utf-8"),
+        PROMPT_VERSION.encode("utf-8"),
+        vacancy_text.encode("utf-8", "ignore"),
+        resume_ref.encode("utf-8"),
+        *_backend_profile(),
     )
     return key
 
+def _normalize_requirement(req: Dict[str, Any]) -> str:
+    """ каноническое представление требования: то, от чего зависит его статус в резюме """
+    text = " ".join(req["text"].lower().replace("ё", "е").split())
+    return f"{text}|{req.get('min_years')}|{(req.get('level') or '').lower()}"
+
+def _cache_key_req_item(req: Dict[str, Any], resume_text_sha: str, model: str) -> str:
+    """ ключ оценки одного требования по тексту резюме (переживает правки остальных пунктов вакансии) """
+    key = _sha256_hex(
+        b"reqitem",
+        model.encode("utf-8"),
+        PROMPT_VERSION.encode("utf-8"),
+        _normalize_requirement(req).encode("utf-8"),
+        resume_text_sha.encode("utf-8"),
+        *_backend_profile(),
+    )
+    return key
+
+def _cache_key_vacancy_checklist(vacancy_id: int) -> str:
+    """ ключ последнего известного чек-листа вакансии (для сравнения после правок) """
+    return _sha256_hex(b"vacancy_checklist", str(vacancy_id).encode("utf-8"), *_backend_profile())
+
 def _cache_key_file_id(resume_bytes: bytes) -> str:
     """ ключ для кэша openai file_id по байтам PDF """
-    key = _sha256_hex(b"fileid", resume_bytes)
+    key = _sha256_hex(b"fileid", resume_bytes, *_backend_profile())
     return key
 
-async def _cache_get(session: AsyncSession, key: str) -> Optional[Dict[str, Any]]:
-    q = await session.execute(select(LLMCache).where(LLMCache.key == key))
-    row = q.scalar_one_or_none()
-    return json.loads(row.payload_json) if row else None
+async def _cache_get(session: AsyncSession, key: str, kind: str) -> Optional[Dict[str, Any]]:
+    """Сначала память процесса, затем таблица llm_cache (с прогревом памяти). kind — вид записи для метрик."""
+    payload = _memory_cache.get(key)
+    if payload is not None:
+        _note_hit(key)
+        CACHE_LOOKUPS.inc(kind=kind, result="memory")
+        return payload
+    q = await session.execute(
+        select(LLMCache.payload_json, LLMCache.payload_bin).where(LLMCache.key == key)
+    )
+    row = q.one_or_none()
+    decoded = _decode_row(key, row.payload_json, row.payload_bin) if row is not None else None
+    if decoded is None:
+        CACHE_LOOKUPS.inc(kind=kind, result="miss")
+        return None
+    payload, size = decoded
+    _memory_cache.set(key, payload, size)
+    _note_hit(key)
+    CACHE_LOOKUPS.inc(kind=kind, result="db")
+    return payload
+
+def _note_hit(key: str) -> None:
+    if len(_pending_hits) < _PENDING_HITS_LIMIT:
+        _pending_hits.add(key)
+
+def _memory_size(payload: Dict[str, Any]) -> int:
+    """
+    Размер записи для бюджета ATS_MEMCACHE_MB: в памяти лежит разобранный dict, поэтому
+    считаем по его JSON, а не по сжатому blob из llm_cache (он в разы меньше).
+    """
+    return len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+def _decode_row(key: str, payload_json: Optional[str], payload_bin: Optional[bytes]) -> Optional[Tuple[Dict[str, Any], int]]:
+    """ payload строки llm_cache и его размер в памяти; старые записи хранятся JSON-текстом """
+    if payload_bin is not None:
+        try:
+            payload = _codec.decode(payload_bin)
+            return payload, _memory_size(payload)
+        except PayloadDecodeError as e:
+            # запись в формате, который этот процесс прочитать не может, — считаем промахом
+            logger.warning(f"Cannot decode llm_cache entry {key}: {e}")
+            return None
+    if payload_json is None:
+        return None
+    return json.loads(payload_json), len(payload_json.encode("utf-8"))
+
+def _cache_row(key: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """ строка llm_cache: закодированный payload и метаданные для GC (вид, версии, размер) """
+    kind = payload.get("kind")
+    if ATS_CACHE_FORMAT == "binary":
+        payload_bin = _codec.encode(payload)
+        payload_json = None
+        size = len(payload_bin)
+    else:
+        payload_json = json.dumps(payload, ensure_ascii=False)
+        payload_bin = None
+        size = len(payload_json.encode("utf-8"))
+    return {
+        "key": key,
+        "payload_json": payload_json,
+        "payload_bin": payload_bin,
+        "kind": kind,
+        "prompt_version": PROMPT_VERSION if kind in _PROMPT_VERSIONED_KINDS else None,
+        "rules_version": RULES_VERSION if kind in _RULES_VERSIONED_KINDS else None,
+        "size_bytes": size,
+    }
 
 async def _cache_set(session: AsyncSession, key: str, payload: Dict[str, Any]) -> None:
-    payload_str = json.dumps(payload, ensure_ascii=False)
-    stmt = insert(LLMCache).values(key=key, payload_json=payload_str)
-    
+    """Запись в llm_cache и сразу в память (write-through)."""
+    row = _cache_row(key, payload)
+    stmt = upsert_insert(session, LLMCache).values(**row)
+
     stmt = stmt.on_conflict_do_update(
         index_elements=[LLMCache.key],
-        set_={"payload_json": payload_str}
+        set_={**{k: v for k, v in row.items() if k != "key"}, "last_hit_at": func.now()}
     )
     try:
         await session.execute(stmt)
-        await session.commit()
+        await commit(session)
     except SQLAlchemyError:
-        await session.rollback()
+        await rollback(session)
         raise
+    _memory_cache.set(key, payload, _memory_size(payload))
+
+async def _cache_get_many(session: AsyncSession, keys: List[str], kind: str) -> Dict[str, Dict[str, Any]]:
+    """Пакетное чтение: память, затем один SELECT ... IN по оставшимся ключам."""
+    found: Dict[str, Dict[str, Any]] = {}
+    rest: List[str] = []
+    for key in keys:
+        payload = _memory_cache.get(key)
+        if payload is not None:
+            found[key] = payload
+        else:
+            rest.append(key)
+    memory_hits = len(found)
+    if rest:
+        q = await session.execute(
+            select(LLMCache.key, LLMCache.payload_json, LLMCache.payload_bin).where(LLMCache.key.in_(rest))
+        )
+        for key, payload_json, payload_bin in q.all():
+            decoded = _decode_row(key, payload_json, payload_bin)
+            if decoded is None:
+                continue
+            payload, size = decoded
+            _memory_cache.set(key, payload, size)
+            found[key] = payload
+    for key in found:
+        _note_hit(key)
+    if memory_hits:
+        CACHE_LOOKUPS.inc(memory_hits, kind=kind, result="memory")
+    if len(found) > memory_hits:
+        CACHE_LOOKUPS.inc(len(found) - memory_hits, kind=kind, result="db")
+    if len(keys) > len(found):
+        CACHE_LOOKUPS.inc(len(keys) - len(found), kind=kind, result="miss")
+    return found
+
+async def _cache_set_many(session: AsyncSession, items: Dict[str, Dict[str, Any]]) -> None:
+    """Пакетная запись одним INSERT ... ON CONFLICT и write-through в память."""
+    if not items:
+        return
+    rows = [_cache_row(k, v) for k, v in items.items()]
+    stmt = upsert_insert(session, LLMCache).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LLMCache.key],
+        set_={
+            **{k: stmt.excluded[k] for k in rows[0] if k != "key"},
+            "last_hit_at": func.now(),
+        }
+    )
+    try:
+        await session.execute(stmt)
+        await commit(session)
+    except SQLAlchemyError:
+        await rollback(session)
+        raise
+    for row in rows:
+        _memory_cache.set(row["key"], items[row["key"]], _memory_size(items[row["key"]]))
+
+def cache_stats() -> Dict[str, Any]:
+    """Счётчики in-memory уровня кэша (попадания, промахи, размер)."""
+    return _memory_cache.stats()
+
+async def flush_cache_hits(session: AsyncSession, batch: int = 500) -> int:
+    """Переносит накопленные попадания в last_hit_at пачками (одно UPDATE на batch ключей)."""
+    if not _pending_hits:
+        return 0
+    keys = list(_pending_hits)
+    _pending_hits.clear()
+    for i in range(0, len(keys), batch):
+        await orm_touch_llm_cache(session, keys[i:i + batch])
+    return len(keys)
+
+async def gc_llm_cache(session: AsyncSession, max_bytes: int, batch: int = 500) -> Dict[str, int]:
+    """
+    Обслуживание llm_cache небольшими порциями:
+      1) заполняет размер/время попадания у старых записей;
+      2) удаляет записи прежних PROMPT_VERSION / RULES_VERSION;
+      3) пока размер больше max_bytes — удаляет давно не использованные записи.
+    """
+    while await orm_backfill_llm_cache(session, batch) >= batch:
+        await asyncio.sleep(0)
+
+    stats = {"stale_deleted": 0, "lru_deleted": 0, "freed_bytes": 0}
+    while True:
+        rows = await orm_delete_stale_llm_cache(session, PROMPT_VERSION, RULES_VERSION, batch)
+        _forget(rows, stats, "stale_deleted")
+        if len(rows) < batch:
+            break
+        await asyncio.sleep(0)
+
+    total = sum(size for _, _, size in await orm_get_llm_cache_usage(session))
+    while total > max_bytes:
+        rows = await orm_delete_lru_llm_cache(session, batch)
+        if not rows:
+            break
+        _forget(rows, stats, "lru_deleted")
+        total -= sum(size or 0 for _, size in rows)
+        await asyncio.sleep(0)
+    return stats
+
+def _forget(rows: List[Tuple[str, Optional[int]]], stats: Dict[str, int], counter: str) -> None:
+    for key, size in rows:
+        _memory_cache.delete(key)
+        stats["freed_bytes"] += size or 0
+    stats[counter] += len(rows)
 
-async def _get_vacancy_text(session: AsyncSession, vacancy_id: int) -> str:
+async def cache_usage(session: AsyncSession) -> Dict[str, Any]:
+    """Размер llm_cache по видам записей и состояние in-memory уровня — для отчёта администратору."""
+    by_kind = {kind or "legacy": {"items": count, "bytes": size} for kind, count, size in await orm_get_llm_cache_usage(session)}
+    return {
+        "items": sum(v["items"] for v in by_kind.values()),
+        "bytes": sum(v["bytes"] for v in by_kind.values()),
+        "by_kind": by_kind,
+        "memory": _memory_cache.stats(),
+    }
+
+async def _release_connection(session: AsyncSession) -> None:
+    """Завершаем читающую транзакцию, чтобы не держать соединение из пула на время LLM-вызова."""
+    # через commit(): в единице работы транзакцией владеет middleware, и настоящий COMMIT
+    # зафиксировал бы половину апдейта — там соединение остаётся занятым до его конца
+    await commit(session)
+
+async def get_vacancy_text(session: AsyncSession, vacancy_id: int) -> str:
+    """Нормализованный текст вакансии (название, описание, требования) — основа ключей кэша."""
     v: Optional[Vacancy] = await session.get(Vacancy, vacancy_id)
     if not v:
         return ""
+    return _vacancy_text(v)
+
+def _vacancy_text(v: Vacancy) -> str:
     parts = [v.name or "", v.description or "", getattr(v, "requirements", "") or ""]
     text = "\n".join(p.strip() for p in parts if p and p.strip())
     return "\n".join(line.strip() for line in text.splitlines() if line.strip())
 
-# ===================== локальный парсинг PDF (PyMuPDF) =====================
-def _extract_text_pymupdf(pdf_bytes: bytes) -> Optional[str]:
-    """Быстрый извлекатель текста для цифровых PDF (без OCR)."""
-    try:
-        import fitz
-    except Exception:
-        return None
-    try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    except Exception:
-        return None
-    pieces: List[str] = []
-    try:
-        for page in doc:
-            txt = page.get_text("text")
-            if txt and txt.strip():
-                pieces.append(txt.strip())
-    finally:
-        doc.close()
-    full = "\n\n".join(pieces).strip()
-    return full if full else None
+# ===================== ограничение частоты вызовов =====================
+def _estimate_tokens(*texts: str, extra: int = 0) -> int:
+    """Грубая оценка токенов запроса (~3 символа на токен) с запасом на ответ."""
+    return sum(len(t) for t in texts) // 3 + extra + MAX_OUTPUT_TOKENS
 
-def _extract_text_ocr_tesseract(pdf_bytes: bytes) -> Optional[str]:
-    """OCR как резерв, если PyMuPDF не сработал (требует tesseract и poppler для pdf2image)."""
-    if not ATS_OCR:
-        return None
-    try:
-        import pytesseract
-        from pdf2image import convert_from_bytes
-    except Exception:
-        return None
-    try:
-        images = convert_from_bytes(pdf_bytes)
-    except Exception:
-        return None
-    texts: List[str] = []
-    for img in images:
+def _backoff(attempt: int) -> float:
+    return min(30.0, 2 ** attempt) * (0.5 + random.random() / 2)
+
+async def _llm_call(call: str, model: str, estimated_tokens: int, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Выполняет вызов LLM-бэкенда через общий лимитер.
+    429 снижает лимиты и приостанавливает все вызовы на retry-after;
+    сетевые ошибки и 5xx повторяются с экспоненциальной паузой.
+    call и model — метки метрик (вид вызова и модель).
+    """
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        await _rate_limiter.acquire(estimated_tokens)
+        start = time.perf_counter()
         try:
-            txt = pytesseract.image_to_string(img)
+            result = await fn()
+        except LLMRateLimited as e:
+            LLM_CALLS.inc(call=call, model=model, outcome="rate_limited")
+            _rate_limiter.on_rate_limited(e.retry_after if e.retry_after is not None else _backoff(attempt))
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            continue
+        except LLMTransientError as e:
+            LLM_CALLS.inc(call=call, model=model, outcome="transient_error")
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            delay = _backoff(attempt)
+            logger.warning(f"LLM call failed ({e}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
         except Exception:
-            txt = ""
-        if txt and txt.strip():
-            texts.append(txt.strip())
-    full = "\n\n".join(texts).strip()
-    return full if full else None
-
-# ===================== Pydantic-схемы =====================
-
-class Requirement(BaseModel):
-    text: str
-    tags: List[str] = Field(default_factory=list)
-    must: bool
-    min_years: Optional[float] = None
-    level: Optional[str] = None
-    weight: Optional[float] = None
-
-class VacancyRequirements(BaseModel):
-    requirements: List[Requirement]
-
-class ScoredRequirement(BaseModel):
-    req_index: int
-    # 1.0 выполнено, 0.5 частично, 0 нет
-    status: float                 
-    years: Optional[float] = None
-    evidence: List[str] = Field(default_factory=list)
-    notes: Optional[str] = None
-
-class RequirementScores(BaseModel):
-    per_requirement: List[ScoredRequirement]
+            LLM_CALLS.inc(call=call, model=model, outcome="error")
+            raise
+        latency = time.perf_counter() - start
+        LLM_CALL_SECONDS.observe(latency, call=call, model=model)
+        LLM_CALLS.inc(call=call, model=model, outcome="ok")
+        if isinstance(result, LLMResult):
+            LLM_TOKENS.inc(result.input_tokens, call=call, model=model, direction="input")
+            LLM_TOKENS.inc(result.output_tokens, call=call, model=model, direction="output")
+            # в журнал расходов (пишется в БД в фоне, vacancy_id и mode — из ledger_context)
+            ledger.record(call, backend.name, result, latency)
+        _rate_limiter.on_success()
+        return result
+
+def rate_limiter_stats() -> Dict[str, Any]:
+    """Состояние лимитера: очередь ожидающих вызовов, текущие лимиты, число 429."""
+    return _rate_limiter.stats()
 
 # ===================== LLM вызовы =====================
 async def parse_vacancy_requirements(vacancy_text: str) -> List[Dict[str, Any]]:
     """Достаём чек-лист требований из текста вакансии."""
-    resp = await client.responses.parse(
-        model=LLM_MODEL,
-        instructions=(
-            "Extract a concise checklist of job requirements.\n"
-            "- Split composite items into atomic requirements (e.g., 'replication, migrations, backups' -> three lines).\n"
-            "- Set must=true for mandatory items; otherwise false.\n"
-            "- Infer min_years/level if explicitly present.\n"
-            "- Keep tags short (e.g., 'postgresql','replication','backup').\n"
-            "- Only include weight if explicitly implied; otherwise leave it null."
-        ),
-        input=f"Vacancy text:\n{vacancy_text}",
-        text_format=VacancyRequirements,
-        temperature=0,
-        top_p=1,
-        max_output_tokens=MAX_OUTPUT_TOKENS,
+    resp = await _llm_call(
+        "parse_vacancy_requirements",
+        LLM_MODEL,
+        _estimate_tokens(vacancy_text),
+        lambda: backend.parse_requirements(vacancy_text, LLM_MODEL, MAX_OUTPUT_TOKENS),
     )
-    data: VacancyRequirements = resp.output_parsed
+    data: VacancyRequirements = resp.parsed
     reqs: List[Dict[str, Any]] = []
     for r in data.requirements:
         weight = r.weight if r.weight is not None else (2.0 if r.must else 1.0)
@@ -208,59 +487,39 @@ async def parse_vacancy_requirements(vacancy_text: str) -> List[Dict[str, Any]]:
         })
     return reqs
 
-async def score_requirements_from_file(file_id: str, requirements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Скоринг по PDF через OpenAI (file input)."""
-    resp = await client.responses.parse(
-        model=LLM_MODEL,
-        instructions=(
-            "You are an ATS evaluator.\n"
-            "- For each requirement return status in {1, 0.5, 0}.\n"
-            "- Include 1–2 verbatim quotes from the resume as evidence; avoid hallucinations.\n"
-            "- If years of experience can be inferred, include it in 'years'.\n"
-            "- Reject non-relevant quotes; do not duplicate evidence strings."
-        ),
-        input=[{
-            "role": "user",
-            "content": [
-                {"type": "input_text",
-                 "text": "Requirements JSON:\n" + json.dumps({"requirements": requirements}, ensure_ascii=False)},
-                {"type": "input_file", "file_id": file_id},
-            ],
-        }],
-        text_format=RequirementScores,
-        temperature=0,
-        top_p=1,
-        max_output_tokens=MAX_OUTPUT_TOKENS,
+async def score_requirements_from_file(
+    file_id: str,
+    requirements: List[Dict[str, Any]],
+    model: str = LLM_MODEL,
+) -> List[Dict[str, Any]]:
+    """Скоринг по PDF через LLM (file input)."""
+    reqs_json = json.dumps({"requirements": requirements}, ensure_ascii=False)
+    resp = await _llm_call(
+        "score_requirements_from_file",
+        model,
+        _estimate_tokens(reqs_json, extra=LLM_FILE_INPUT_TOKENS),
+        lambda: backend.score_from_file(file_id, requirements, model, MAX_OUTPUT_TOKENS),
     )
-    parsed: RequirementScores = resp.output_parsed
+    parsed: RequirementScores = resp.parsed
     return [s.model_dump() for s in parsed.per_requirement]
 
-async def score_requirements_from_text(resume_text: str, requirements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Скоринг по локально извлечённому тексту резюме (предпочтительный путь)."""
-    resp = await client.responses.parse(
-        model=LLM_MODEL,
-        instructions=(
-            "You are an ATS evaluator.\n"
-            "- For each requirement return status in {1, 0.5, 0}.\n"
-            "- Evidence must be verbatim quotes from the provided resume TEXT; avoid hallucinations.\n"
-            "- If years of experience can be inferred, include it in 'years'.\n"
-            "- No duplicate evidence strings. If no relevant quote exists, set status=0."
-        ),
-        input=[{
-            "role": "user",
-            "content": [
-                {"type": "input_text",
-                 "text": "Requirements JSON:\n" + json.dumps({"requirements": requirements}, ensure_ascii=False)},
-                {"type": "input_text",
-                 "text": "RESUME TEXT (verbatim):\n" + resume_text},
-            ],
-        }],
-        text_format=RequirementScores,
-        temperature=0,
-        top_p=1,
-        max_output_tokens=MAX_OUTPUT_TOKENS,
-    )
-    parsed: RequirementScores = resp.output_parsed
+async def score_requirements_from_text(
+    resume_text: str,
+    requirements: List[Dict[str, Any]],
+    model: str = LLM_MODEL,
+    on_item: Optional[ItemSink] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Скоринг по локально извлечённому тексту резюме (предпочтительный путь).
+    С on_item ответ читается потоком, и каждый оценённый пункт передаётся в on_item сразу.
+    """
+    reqs_json = json.dumps({"requirements": requirements}, ensure_ascii=False)
+    if on_item is not None:
+        call = lambda: backend.stream_score_from_text(resume_text, requirements, model, MAX_OUTPUT_TOKENS, on_item)
+    else:
+        call = lambda: backend.score_from_text(resume_text, requirements, model, MAX_OUTPUT_TOKENS)
+    resp = await _llm_call("score_requirements_from_text", model, _estimate_tokens(reqs_json, resume_text), call)
+    parsed: RequirementScores = resp.parsed
     return [s.model_dump() for s in parsed.per_requirement]
 
 # ===================== агрегация =====================
@@ -320,100 +579,505 @@ def assemble_final(
 
 
 
-# ===================== публичный API =====================
+# ===================== этапы пайплайна =====================
 
-async def score_resume_api(session: AsyncSession, vacancy_id: int, resume_bytes: bytes) -> Dict[str, Any]:
-    """
-    Основной сценарий:
-      1) Берём текст вакансии из БД.
-      2) Кэшируем/достаём чек-лист требований по вакансии.
-      3) Извлекаем текст резюме локально (PyMuPDF; опц. OCR, но нужно включить соответствующий флаг). Если не получилось — готовим fallback.
-      4) Формируем корректный финальный ключ и сначала проверяем кэш.
-      5) Если кэша нет — выполняем скоринг (по тексту или по PDF) и сохраняем результат.
-    """
-    vacancy_text = await _get_vacancy_text(session, vacancy_id)
-    if not vacancy_text:
-        return {"error": "vacancy_not_found"}
+# одновременные вызовы с одинаковым SHA-ключом склеиваются в один LLM-вызов / одну загрузку
+_flight = SingleFlight()
 
-    # ---------- 1. кэш требований вакансии ----------
+async def _get_or_parse_requirements(session: AsyncSession, vacancy_text: str) -> List[Dict[str, Any]]:
+    """Чек-лист требований из кэша; при промахе — один parse_vacancy_requirements на ключ."""
     reqs_key = _cache_key_requirements(vacancy_text)
-    reqs_cached = await _cache_get(session, reqs_key)
+    reqs_cached = await _cache_get(session, reqs_key, "requirements")
     if reqs_cached and "requirements" in reqs_cached:
-        reqs = reqs_cached["requirements"]
-    else:
+        return reqs_cached["requirements"]
+
+    async def _parse() -> List[Dict[str, Any]]:
+        # ведущий вызов мог завершиться между нашим промахом и входом в single-flight
+        cached = await _cache_get(session, reqs_key, "requirements")
+        if cached and "requirements" in cached:
+            return cached["requirements"]
+        await _release_connection(session)
         reqs = await parse_vacancy_requirements(vacancy_text)
-        if not reqs:
-            return {"error": "requirements_parse_failed"}
-        await _cache_set(session, reqs_key, {
-            "kind": "requirements",
-            "requirements": reqs,
-            "prompt_version": PROMPT_VERSION,
-            "model": LLM_MODEL
-        })
+        if reqs:
+            await _cache_set(session, reqs_key, {
+                "kind": "requirements",
+                "requirements": reqs,
+                "prompt_version": PROMPT_VERSION,
+                "model": LLM_MODEL
+            })
+        return reqs
 
-    # ---------- 2. извлекаем текст резюме / готовим fallback ----------
-    use_llm_file = (ATS_EXTRACT_MODE != "local")
-    resume_text: Optional[str] = None
-    if ATS_EXTRACT_MODE == "local":
-        resume_text = _extract_text_pymupdf(resume_bytes)
-        if not resume_text:
-            ocr_text = _extract_text_ocr_tesseract(resume_bytes)
-            if ocr_text and ocr_text.strip():
-                resume_text = ocr_text
-        if not resume_text:
-            use_llm_file = True
+    return await _flight.do(reqs_key, _parse)
 
-    # ---------- 3. формируем корректный финальный ключ и проверяем кэш ----------
-    if resume_text and not use_llm_file:
-        resume_text_sha = hashlib.sha256(resume_text.encode("utf-8")).hexdigest()
-        final_key = _cache_key_final_from_text(vacancy_text, resume_text_sha)
-    else:
-        final_key = _cache_key_final_from_bytes(vacancy_text, resume_bytes)
+async def _get_or_upload_file(session: AsyncSession, resume_bytes: bytes) -> str:
+    """openai file_id для PDF из кэша; при промахе — одна загрузка на ключ."""
+    file_key = _cache_key_file_id(resume_bytes)
+    cached_file = await _cache_get(session, file_key, "file_id")
+    if cached_file and "openai_file_id" in cached_file:
+        return cached_file["openai_file_id"]
 
-    cached_final = await _cache_get(session, final_key)
+    async def _upload() -> str:
+        cached = await _cache_get(session, file_key, "file_id")
+        if cached and "openai_file_id" in cached:
+            return cached["openai_file_id"]
+        await _release_connection(session)
+        file_id = await _llm_call("upload_file", "-", 0, lambda: backend.upload_file(resume_bytes))
+        await _cache_set(session, file_key, {"kind": "file_id", "openai_file_id": file_id})
+        return file_id
+
+    return await _flight.do(file_key, _upload)
+
+def resume_content_sha256(resume_bytes: bytes) -> str:
+    """Адрес извлечённого текста резюме: SHA-256 байтов PDF."""
+    return _sha256_hex(resume_bytes)
+
+async def _get_resume_text(session: AsyncSession, resume_bytes: bytes) -> Optional[str]:
+    """
+    Текст резюме по хэшу PDF из resume_text; при промахе — извлечение в пуле процессов
+    и сохранение результата (в т.ч. неудачного), чтобы повтор того же файла не парсился заново.
+
+    :raises ExtractionTimeout: Таймаут или сбой пула — не повод отправлять файл в LLM.
+    """
+    content_sha = resume_content_sha256(resume_bytes)
+    stored = await orm_get_resume_text(session, content_sha)
+    if stored is not None:
+        return stored.resume_text or None
+
+    async def _extract() -> Optional[str]:
+        stored = await orm_get_resume_text(session, content_sha)
+        if stored is not None:
+            return stored.resume_text or None
+        await _release_connection(session)
+        text, method = await extraction_executor.extract(resume_bytes)
+        # таймаут и сбой пула — временные ошибки, их не запоминаем
+        if method in ("timeout", "error"):
+            raise ExtractionTimeout(method)
+        await orm_save_resume_text(session, content_sha, text or "", method)
+        return text
+
+    return await _flight.do("text:" + content_sha, _extract)
+
+Scorer = Callable[[str], Awaitable[List[Dict[str, Any]]]]
+
+# промежуточные результаты: (чек-лист, уже оценённые пункты в формате ScoredRequirement)
+ProgressSink = Callable[[List[Dict[str, Any]], List[Dict[str, Any]]], Awaitable[None]]
+
+# получатель промежуточных результатов текущей оценки (задаётся в score_resume_api)
+_progress_sink: ContextVar[Optional[ProgressSink]] = ContextVar("progress_sink", default=None)
+
+async def _send_progress(sink: ProgressSink, reqs: List[Dict[str, Any]], per_req: List[Dict[str, Any]]) -> None:
+    try:
+        await sink(reqs, per_req)
+    except Exception as e:
+        # ошибки показа промежуточных результатов не должны прерывать оценку
+        logger.debug(f"Progress sink failed: {e}")
+
+def _progress_snapshot(items: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{**item, "req_index": i} for i, item in sorted(items.items())]
+
+async def _report_progress(reqs: List[Dict[str, Any]], items: Dict[int, Dict[str, Any]]) -> None:
+    sink = _progress_sink.get()
+    if sink is not None:
+        await _send_progress(sink, reqs, _progress_snapshot(items))
+
+class _ProgressPump:
+    def __init__(self, sink: ProgressSink):
+        """
+        Промежуточные результаты во время LLM-вызова: правка сообщения в Telegram идёт в фоне,
+        а не внутри вызова, иначе её задержка попала бы в метрики и журнал расходов как задержка LLM.
+        Отправляет по одной правке за раз; новая версия заменяет ещё не отправленную.
+        """
+        self._sink = sink
+        self._pending: Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def push(self, reqs: List[Dict[str, Any]], items: Dict[int, Dict[str, Any]]) -> None:
+        self._pending = (reqs, _progress_snapshot(items))
+        if self._task is None or self._task.done():
+            self._task = spawn(self._run(), name="scoring-progress")
+
+    async def _run(self) -> None:
+        while self._pending is not None:
+            reqs, per_req = self._pending
+            self._pending = None
+            await _send_progress(self._sink, reqs, per_req)
+
+    async def drain(self) -> None:
+        """Дожидается последней правки, чтобы она не пришла после итогового сообщения."""
+        if self._task is not None:
+            await self._task
+
+async def _cached_stage(
+    session: AsyncSession,
+    vacancy_text: str,
+    resume_ref: str,
+    model: str,
+    scorer: Scorer,
+) -> List[Dict[str, Any]]:
+    """Одна ступень каскада: per-requirement статусы модели model (с кэшем)."""
+    key = _cache_key_stage(vacancy_text, resume_ref, model)
+    cached = await _cache_get(session, key, "stage_scores")
+    if cached and "per_requirement" in cached:
+        return cached["per_requirement"]
+    await _release_connection(session)
+    per_req = await scorer(model)
+    await _cache_set(session, key, {"kind": "stage_scores", "model": model, "per_requirement": per_req})
+    return per_req
+
+async def _score_text_incremental(
+    session: AsyncSession,
+    resume_text: str,
+    resume_text_sha: str,
+    reqs: List[Dict[str, Any]],
+    model: str,
+) -> List[Dict[str, Any]]:
+    """
+    Скоринг по тексту с кэшем на уровне отдельных требований: в LLM уходят только
+    новые или изменённые пункты чек-листа, остальные статусы берутся из кэша.
+    """
+    keys = [_cache_key_req_item(r, resume_text_sha, model) for r in reqs]
+    cached = await _cache_get_many(session, keys, "req_item")
+    todo = [i for i, k in enumerate(keys) if k not in cached]
+
+    items: Dict[int, Dict[str, Any]] = {i: cached[k]["item"] for i, k in enumerate(keys) if k in cached}
+    if items:
+        await _report_progress(reqs, items)
+    if todo:
+        await _release_connection(session)
+        subset = [reqs[i] for i in todo]
+        on_item: Optional[ItemSink] = None
+        pump: Optional[_ProgressPump] = None
+        sink = _progress_sink.get()
+        if sink is not None:
+            pump = _ProgressPump(sink)
+
+            async def on_item(s: Dict[str, Any]) -> None:
+                if 0 <= s["req_index"] < len(subset):
+                    items[todo[s["req_index"]]] = {k: v for k, v in s.items() if k != "req_index"}
+                    pump.push(reqs, items)
+        try:
+            scored = await score_requirements_from_text(resume_text, subset, model, on_item)
+        finally:
+            if pump is not None:
+                await pump.drain()
+        fresh: Dict[str, Dict[str, Any]] = {}
+        for s in scored:
+            j = s["req_index"]
+            if not 0 <= j < len(subset):
+                continue
+            i = todo[j]
+            item = {k: v for k, v in s.items() if k != "req_index"}
+            items[i] = item
+            fresh[keys[i]] = {"kind": "req_item", "model": model, "item": item}
+        await _cache_set_many(session, fresh)
+    return [{**item, "req_index": i} for i, item in sorted(items.items())]
+
+async def _run_scoring(
+    session: AsyncSession,
+    vacancy_text: str,
+    resume_ref: str,
+    reqs: List[Dict[str, Any]],
+    scorer: Scorer,
+    cache_stages: bool,
+) -> Tuple[List[Dict[str, Any]], str, Dict[str, Any]]:
+    """
+    Скоринг одной моделью или каскадом: LLM_MODEL_FAST для всех, LLM_MODEL —
+    только если оценка быстрой модели попала в ATS_CASCADE_BAND.
+    cache_stages=False, если scorer сам кэширует результаты по модели.
+
+    :return: (per-requirement статусы, модель итоговой оценки, доп. meta).
+    """
+    async def stage(model: str) -> List[Dict[str, Any]]:
+        if cache_stages:
+            return await _cached_stage(session, vacancy_text, resume_ref, model, scorer)
+        return await scorer(model)
+
+    if ATS_SCORING_MODE != "cascade":
+        return await scorer(LLM_MODEL), LLM_MODEL, {}
+
+    fast = await stage(LLM_MODEL_FAST)
+    fast_score = assemble_final(reqs, fast)[0]
+    escalate = ATS_CASCADE_LOW <= fast_score <= ATS_CASCADE_HIGH
+    meta = {"cascade": {"fast_model": LLM_MODEL_FAST, "fast_score": fast_score, "escalated": escalate}}
+    if not escalate:
+        return fast, LLM_MODEL_FAST, meta
+    strong = await stage(LLM_MODEL)
+    return strong, LLM_MODEL, meta
+
+async def _score_and_cache(
+    session: AsyncSession,
+    final_key: str,
+    vacancy_text: str,
+    reqs: List[Dict[str, Any]],
+    resume_text: Optional[str],
+    resume_bytes: Optional[bytes],
+    use_llm_file: bool,
+) -> Dict[str, Any]:
+    """Скоринг, агрегация и запись финального результата (выполняется под single-flight)."""
+    cached_final = await _cache_get(session, final_key, "final_score")
     if cached_final:
         return cached_final
 
+    await _release_connection(session)
+
     # ---------- 4. если нужен fallback — берём или создаём file_id (кэш) ----------
     file_id: Optional[str] = None
     if use_llm_file:
-        file_key = _cache_key_file_id(resume_bytes)
-        cached_file = await _cache_get(session, file_key)
-        if cached_file and "openai_file_id" in cached_file:
-            file_id = cached_file["openai_file_id"]
-        else:
-            uploaded = await client.files.create(file=("resume.pdf", resume_bytes), purpose="user_data")
-            file_id = uploaded.id
-            await _cache_set(session, file_key, {"kind": "file_id", "openai_file_id": file_id})
+        file_id = await _get_or_upload_file(session, resume_bytes)
 
     # ---------- 5. скоринг ----------
+    meta_extra: Dict[str, Any] = {}
     if resume_text and not use_llm_file:
-        per_req = await score_requirements_from_text(resume_text, reqs)
+        if ATS_PREFILTER:
+            verdict = prefilter_resume(resume_text, reqs, ATS_PREFILTER_THRESHOLD)
+            meta_extra["prefilter"] = {"score": verdict.score, "threshold": ATS_PREFILTER_THRESHOLD}
+            if verdict.reject:
+                # явный отказ без LLM; в кэш не пишем — пересчёт дешёвый и зависит от порога
+                return _build_result(reqs, verdict.per_req, "prefilter_reject", "none", meta_extra)
+        resume_ref = hashlib.sha256(resume_text.encode("utf-8")).hexdigest()
+        scorer: Scorer = lambda model: _score_text_incremental(session, resume_text, resume_ref, reqs, model)
         mode_used = "local_text"
     else:
         if not file_id:
             return {"error": "resume_input_unavailable"}
-        per_req = await score_requirements_from_file(file_id, reqs)
+        resume_ref = resume_content_sha256(resume_bytes)
+        scorer = lambda model: score_requirements_from_file(file_id, reqs, model)
         mode_used = "llm_file"
 
+    per_req, model_used, scoring_meta = await _run_scoring(
+        session, vacancy_text, resume_ref, reqs, scorer, cache_stages=(mode_used == "llm_file"),
+    )
+    meta_extra.update(scoring_meta)
+
     # ---------- 6. агрегация и кэш ----------
+    result = _build_result(reqs, per_req, mode_used, model_used, meta_extra)
+    await _cache_set(session, final_key, result)
+    return result
+
+def _build_result(
+    reqs: List[Dict[str, Any]],
+    per_req: List[Dict[str, Any]],
+    mode_used: str,
+    model_used: str,
+    meta_extra: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
     score, subs, matched, missing, highlights = assemble_final(reqs, per_req)
-    result: Dict[str, Any] = {
+    statuses = {s["req_index"]: s for s in per_req}
+    return {
         "kind": "final_score",
         "score_overall": score,
         "subscores": subs,
         "skills": {"matched": matched, "missing": missing},
         "highlights": highlights,
+        # статусы пунктов чек-листа без цитат — для таблицы resume_score_item
+        "requirements": [
+            {
+                "text": r["text"],
+                "must": r["must"],
+                "status": float(statuses.get(i, {}).get("status", 0.0)),
+                "years": statuses.get(i, {}).get("years"),
+            }
+            for i, r in enumerate(reqs)
+        ],
         "explanations": (
             "Оценка по чек-листу требований (must/optional) с цитатами из резюме. "
             f"Input mode: {mode_used}; prompt={PROMPT_VERSION}; rules={RULES_VERSION}."
         ),
-        "model_info": {"llm_model": LLM_MODEL},
+        "model_info": {"llm_model": model_used},
         "meta": {
             "prompt_version": PROMPT_VERSION,
             "rules_version": RULES_VERSION,
             "input_mode": mode_used,
+            **(meta_extra or {}),
         },
     }
-    await _cache_set(session, final_key, result)
-    return result
+
+async def _score_resume(
+    session: AsyncSession,
+    vacancy_text: str,
+    reqs: List[Dict[str, Any]],
+    resume_text: Optional[str],
+    resume_bytes: Optional[bytes],
+    use_llm_file: bool,
+) -> Dict[str, Any]:
+    # ---------- 3. формируем корректный финальный ключ и проверяем кэш ----------
+    if resume_text and not use_llm_file:
+        resume_text_sha = hashlib.sha256(resume_text.encode("utf-8")).hexdigest()
+        final_key = _cache_key_final_from_text(vacancy_text, resume_text_sha)
+        mode = "local_text"
+    else:
+        final_key = _cache_key_final_from_bytes(vacancy_text, resume_bytes)
+        mode = "llm_file"
+
+    cached_final = await _cache_get(session, final_key, "final_score")
+    if cached_final:
+        return cached_final
+
+    with ledger_context(mode=mode):
+        return await _flight.do(
+            final_key,
+            lambda: _score_and_cache(session, final_key, vacancy_text, reqs, resume_text, resume_bytes, use_llm_file),
+        )
+
+# ===================== публичный API =====================
+
+async def score_resume_api(
+    session: AsyncSession,
+    vacancy_id: int,
+    resume_bytes: bytes,
+    on_progress: Optional[ProgressSink] = None,
+) -> Dict[str, Any]:
+    """
+    Основной сценарий:
+      1) Берём текст вакансии из БД.
+      2) Кэшируем/достаём чек-лист требований по вакансии.
+      3) Берём текст резюме по хэшу PDF или извлекаем его локально в пуле процессов (PyMuPDF; опц. OCR, но нужно включить соответствующий флаг). Если не получилось — готовим fallback.
+      4) Формируем корректный финальный ключ и сначала проверяем кэш.
+      5) Если кэша нет — выполняем скоринг (по тексту или по PDF) и сохраняем результат.
+    Одинаковые одновременные запросы (по SHA-ключам кэша) выполняются один раз.
+    on_progress получает уже оценённые пункты по мере ответа модели (только пооценочный скоринг по тексту).
+    """
+    token = _progress_sink.set(on_progress)
+    try:
+        with ledger_context(vacancy_id=vacancy_id):
+            return await _score_resume_api(session, vacancy_id, resume_bytes)
+    finally:
+        _progress_sink.reset(token)
+
+async def _score_resume_api(session: AsyncSession, vacancy_id: int, resume_bytes: bytes) -> Dict[str, Any]:
+    vacancy_text = await get_vacancy_text(session, vacancy_id)
+    if not vacancy_text:
+        return {"error": "vacancy_not_found"}
+
+    # ---------- 1. кэш требований вакансии ----------
+    reqs = await _get_or_parse_requirements(session, vacancy_text)
+    if not reqs:
+        return {"error": "requirements_parse_failed"}
+
+    # ---------- 2. извлекаем текст резюме / готовим fallback ----------
+    use_llm_file = (ATS_EXTRACT_MODE != "local")
+    resume_text: Optional[str] = None
+    if ATS_EXTRACT_MODE == "local":
+        # текст берём из resume_text по хэшу PDF; PyMuPDF/OCR — только для новых файлов и в пуле процессов
+        try:
+            resume_text = await _get_resume_text(session, resume_bytes)
+        except ExtractionQueueFull:
+            return {"error": "extraction_busy"}
+        except ExtractionTimeout:
+            # локальный сбой временный: платный путь llm_file оставляем для PDF, где текста действительно нет
+            return {"error": "extraction_timeout"}
+        if not resume_text:
+            use_llm_file = True
+
+    return await _score_resume(session, vacancy_text, reqs, resume_text, resume_bytes, use_llm_file)
+
+async def score_stored_resume_api(session: AsyncSession, vacancy_id: int, content_sha256: str) -> Dict[str, Any]:
+    """
+    Оценка уже загруженного резюме по сохранённому тексту (без скачивания и парсинга PDF).
+    Если текста нет (скан без OCR или режим llm) — возвращает ошибку resume_text_unavailable,
+    и вызывающий код должен передать байты PDF в score_resume_api.
+    """
+    vacancy_text = await get_vacancy_text(session, vacancy_id)
+    if not vacancy_text:
+        return {"error": "vacancy_not_found"}
+
+    stored = await orm_get_resume_text(session, content_sha256)
+    if ATS_EXTRACT_MODE != "local" or stored is None or not stored.resume_text:
+        return {"error": "resume_text_unavailable"}
+
+    with ledger_context(vacancy_id=vacancy_id):
+        reqs = await _get_or_parse_requirements(session, vacancy_text)
+        if not reqs:
+            return {"error": "requirements_parse_failed"}
+
+        return await _score_resume(session, vacancy_text, reqs, stored.resume_text, None, False)
+
+async def save_resume_score(session: AsyncSession, resume_id: int, vacancy_id: int, result: Dict[str, Any]) -> None:
+    """
+    Сохраняет итог score_resume_api в resume_score / resume_score_item.
+    В финальных результатах из кэша до появления поля requirements статусов пунктов нет — сохраняется только итог.
+    """
+    meta = result.get("meta", {})
+    score = {
+        "score_overall": result["score_overall"],
+        "score_must": result["subscores"].get("must_have", 0.0),
+        "score_optional": result["subscores"].get("optional", 0.0),
+        "input_mode": meta.get("input_mode"),
+        "model": result.get("model_info", {}).get("llm_model"),
+        "prompt_version": meta.get("prompt_version"),
+        "rules_version": meta.get("rules_version"),
+    }
+    items = [
+        {"req_index": i, "requirement": r["text"], "must": r["must"], "status": r["status"], "years": r.get("years")}
+        for i, r in enumerate(result.get("requirements") or [])
+    ]
+    await orm_save_resume_score(session, resume_id, vacancy_id, score, items)
+
+def diff_requirement_checklists(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Сравнивает чек-листы требований по нормализованному тексту пунктов.
+
+    :return: Индексы неизменившихся и новых/изменённых пунктов нового чек-листа и число удалённых.
+    """
+    old_keys = {_normalize_requirement(r) for r in old}
+    new_keys = [_normalize_requirement(r) for r in new]
+    return {
+        "unchanged": [i for i, k in enumerate(new_keys) if k in old_keys],
+        "changed": [i for i, k in enumerate(new_keys) if k not in old_keys],
+        "removed": len(old_keys - set(new_keys)),
+    }
+
+async def warm_vacancy_requirements(session: AsyncSession, vacancy_id: int) -> bool:
+    """
+    Заранее разбирает и кэширует чек-лист вакансии, чтобы первый кандидат не ждал parse_vacancy_requirements.
+    Если для вакансии ещё нет сохранённого чек-листа, запоминает его как базу для сравнения при правках.
+
+    :return: True, если чек-лист есть в кэше.
+    """
+    vacancy_text = await get_vacancy_text(session, vacancy_id)
+    if not vacancy_text:
+        return False
+    with ledger_context(vacancy_id=vacancy_id):
+        reqs = await _get_or_parse_requirements(session, vacancy_text)
+    if not reqs:
+        return False
+    key = _cache_key_vacancy_checklist(vacancy_id)
+    if await _cache_get(session, key, "vacancy_checklist") is None:
+        await _cache_set(session, key, {"kind": "vacancy_checklist", "vacancy_id": vacancy_id, "requirements": reqs})
+    return True
+
+async def cached_vacancy_requirements(session: AsyncSession, vacancy_id: int) -> Optional[List[Dict[str, Any]]]:
+    """Чек-лист текущей версии вакансии, если он уже в кэше (без вызова LLM)."""
+    vacancy_text = await get_vacancy_text(session, vacancy_id)
+    if not vacancy_text:
+        return None
+    cached = await _cache_get(session, _cache_key_requirements(vacancy_text), "requirements")
+    return cached["requirements"] if cached and "requirements" in cached else None
+
+async def vacancies_missing_requirements(session: AsyncSession, vacancies: List[Vacancy]) -> List[int]:
+    """Идентификаторы вакансий, для текущего текста которых чек-листа в кэше нет (один SELECT ... IN)."""
+    keys = {v.vacancy_id: _cache_key_requirements(_vacancy_text(v)) for v in vacancies}
+    cached = await _cache_get_many(session, list(keys.values()), "requirements")
+    return [vacancy_id for vacancy_id, key in keys.items() if key not in cached]
+
+async def refresh_vacancy_checklist(session: AsyncSession, vacancy_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Получает (при необходимости разбирает) чек-лист текущей версии вакансии, сравнивает его
+    с последним сохранённым для этой вакансии и запоминает новый.
+
+    :return: Результат diff_requirement_checklists (None, если прежний чек-лист неизвестен
+             или вакансию не удалось разобрать).
+    """
+    vacancy_text = await get_vacancy_text(session, vacancy_id)
+    if not vacancy_text:
+        return None
+    with ledger_context(vacancy_id=vacancy_id):
+        reqs = await _get_or_parse_requirements(session, vacancy_text)
+    if not reqs:
+        return None
+    key = _cache_key_vacancy_checklist(vacancy_id)
+    previous = await _cache_get(session, key, "vacancy_checklist")
+    await _cache_set(session, key, {"kind": "vacancy_checklist", "vacancy_id": vacancy_id, "requirements": reqs})
+    if not previous or "requirements" not in previous:
+        return None
+    return diff_requirement_checklists(previous["requirements"], reqs)
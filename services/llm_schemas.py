@@ -0,0 +1,28 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+# ===================== Pydantic-схемы =====================
+
+class Requirement(BaseModel):
+    text: str
+    tags: List[str] = Field(default_factory=list)
+    must: bool
+    min_years: Optional[float] = None
+    level: Optional[str] = None
+    weight: Optional[float] = None
+
+class VacancyRequirements(BaseModel):
+    requirements: List[Requirement]
+
+class ScoredRequirement(BaseModel):
+    req_index: int
+    # 1.0 выполнено, 0.5 частично, 0 нет
+    status: float
+    years: Optional[float] = None
+    evidence: List[str] = Field(default_factory=list)
+    notes: Optional[str] = None
+
+class RequirementScores(BaseModel):
+    per_requirement: List[ScoredRequirement]
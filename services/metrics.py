@@ -0,0 +1,248 @@
+import os
+import time
+import logging
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# ===================== конфигурация =====================
+# порт HTTP-эндпоинта /metrics в формате Prometheus (0 — не запускать)
+ATS_METRICS_PORT = int(os.getenv("ATS_METRICS_PORT", "0"))
+# по умолчанию только локально: метрики содержат модели и виды кэша, наружу их не отдаём
+ATS_METRICS_HOST = os.getenv("ATS_METRICS_HOST", "127.0.0.1")
+
+# границы бакетов гистограмм по умолчанию, секунды
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# ===================== метрики =====================
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames) or any(n not in labels for n in self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """Монотонно растущий счётчик с набором меток."""
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        if amount < 0:
+            raise ValueError("counter can only increase")
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{self._labels(k)} {_format_value(v)}" for k, v in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        """
+        Гистограмма с фиксированными бакетами (в выводе — кумулятивные _bucket, _sum и _count).
+
+        :param buckets: Верхние границы бакетов по возрастанию; +Inf добавляется сам.
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # по ключу меток: [счётчики по бакетам (последний — +Inf), сумма, количество]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        """Замеряет длительность блока with в секундах."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: object) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _samples(self) -> List[str]:
+        lines: List[str] = []
+        bounds = [*self.buckets, float("inf")]
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, c in zip(bounds, counts):
+                cumulative += c
+                lines.append(f"{self.name}_bucket{self._labels(key, (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Реестр метрик процесса; render() отдаёт их в текстовом формате Prometheus."""
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"metric {metric.name} is already registered with another type or labels")
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# ---------- LLM ----------
+LLM_CALLS = registry.counter(
+    "ats_llm_calls_total", "LLM calls (every attempt, including retries)", ("call", "model", "outcome"),
+)
+LLM_CALL_SECONDS = registry.histogram(
+    "ats_llm_call_seconds", "LLM call latency without rate limiter wait", ("call", "model"),
+)
+LLM_TOKENS = registry.counter(
+    "ats_llm_tokens_total", "Tokens reported by the LLM backend", ("call", "model", "direction"),
+)
+
+# ---------- кэш ----------
+CACHE_LOOKUPS = registry.counter(
+    "ats_cache_lookups_total", "llm_cache lookups by entry kind and tier (memory, db, miss)", ("kind", "result"),
+)
+
+# ---------- извлечение текста PDF ----------
+EXTRACT_SECONDS = registry.histogram(
+    "ats_extract_seconds", "PDF text extraction time per stage (pymupdf, ocr)", ("stage",),
+)
+EXTRACT_PAGES = registry.histogram(
+    "ats_extract_pages", "Pages processed per PDF by stage", ("stage",),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+EXTRACTIONS = registry.counter(
+    "ats_extractions_total", "PDF extractions by resulting method (pymupdf, ocr, none, timeout, error)", ("method",),
+)
+
+# ---------- БД и обработчики ----------
+DB_SESSION_SECONDS = registry.histogram(
+    "ats_db_session_seconds", "Lifetime of the per-update database session (only updates that used it)", ("outcome",),
+)
+DB_SESSIONS = registry.counter(
+    "ats_db_sessions_total", "Updates by whether they opened a database session", ("used",),
+)
+DB_STATEMENTS = registry.histogram(
+    "ats_db_statements", "SQL statements executed per update that used the database", (),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+DB_CONNECTION_SECONDS = registry.histogram(
+    "ats_db_connection_held_seconds", "Time a pooled connection was held per update", (),
+)
+HANDLER_SECONDS = registry.histogram(
+    "ats_handler_seconds", "Handler latency per router and event type", ("router", "event", "outcome"),
+)
+
+
+# ===================== HTTP-эндпоинт =====================
+_runner: Optional[web.AppRunner] = None
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(
+        body=registry.render().encode("utf-8"),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+async def start_metrics_server(host: str = ATS_METRICS_HOST, port: int = ATS_METRICS_PORT) -> None:
+    """Поднимает GET /metrics на host:port (ничего не делает при port=0)."""
+    global _runner
+    if not port or _runner is not None:
+        return
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    _runner = runner
+    logger.info(f"Metrics endpoint started on http://{host}:{port}/metrics")
+
+
+async def stop_metrics_server() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
@@ -0,0 +1,96 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List
+
+# ===================== нормализация и стемминг =====================
+_TOKEN_RE = re.compile(r"[a-zа-я0-9][a-zа-я0-9+#]*")
+_CYRILLIC_RE = re.compile(r"[а-я]")
+
+# окончания отсортированы по длине, чтобы сначала срезать самые длинные
+_RU_SUFFIXES = sorted((
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ией", "ях", "ах", "ям", "ам",
+    "ов", "ев", "ом", "ем", "ой", "ей", "ий", "ый", "ая", "яя", "ое", "ее", "ые", "ие", "ую", "юю",
+    "ия", "ию", "ии", "ть", "ет", "ют", "ут", "ит", "ат", "ят",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+), key=len, reverse=True)
+_EN_SUFFIXES = ("ing", "ies", "es", "ed", "s")
+
+
+def normalize(text: str) -> str:
+    return text.lower().replace("ё", "е")
+
+
+def stem(token: str) -> str:
+    """Лёгкий стеммер: срезает типовые окончания русских и английских слов."""
+    if any(ch.isdigit() for ch in token) or "+" in token or "#" in token:
+        return token
+    if _CYRILLIC_RE.search(token):
+        for suf in _RU_SUFFIXES:
+            if token.endswith(suf) and len(token) - len(suf) >= 3:
+                return token[: -len(suf)]
+        return token
+    for suf in _EN_SUFFIXES:
+        if token.endswith(suf) and len(token) - len(suf) >= 3:
+            return token[: -len(suf)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(t) for t in _TOKEN_RE.findall(normalize(text))]
+
+
+def build_token_index(text: str) -> FrozenSet[str]:
+    """Множество стемов текста резюме (кириллица и латиница)."""
+    return frozenset(tokenize(text))
+
+
+def tag_matches(tag: str, index: FrozenSet[str]) -> bool:
+    """Тег совпал, если в резюме есть все его слова (например, 'machine learning')."""
+    tokens = tokenize(tag)
+    return bool(tokens) and all(t in index for t in tokens)
+
+# ===================== решение предфильтра =====================
+# статус требования без тегов: предфильтр его не проверял
+UNCHECKED_STATUS = 0.5
+
+@dataclass
+class PrefilterVerdict:
+    # доля (0..1) must-требований с найденными тегами, с учётом весов
+    score: float
+    reject: bool
+    # предварительные статусы в формате ScoredRequirement для assemble_final
+    per_req: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def prefilter_resume(resume_text: str, requirements: List[Dict[str, Any]], threshold: float) -> PrefilterVerdict:
+    """
+    Детерминированно сверяет теги требований с текстом резюме.
+    Требования без тегов проверить нечем: они получают нейтральный статус 0.5 (не «выполнено»
+    и не «отсутствует») и с ним же входят в долю must-требований, чтобы не отсекать резюме
+    по неполным данным.
+
+    :param resume_text: Извлечённый текст резюме.
+    :param requirements: Чек-лист требований вакансии.
+    :param threshold: Минимальная доля must-требований, ниже которой резюме отклоняется.
+    :return: Предварительная оценка и решение.
+    """
+    index = build_token_index(resume_text)
+    per_req: List[Dict[str, Any]] = []
+    must_total = 0.0
+    must_hit = 0.0
+    for i, r in enumerate(requirements):
+        tags = r.get("tags") or []
+        if tags:
+            status = 1.0 if any(tag_matches(t, index) for t in tags) else 0.0
+        else:
+            status = UNCHECKED_STATUS
+        per_req.append({"req_index": i, "status": status, "years": None, "evidence": []})
+        if r["must"]:
+            w = r["weight"]
+            must_total += w
+            must_hit += w * status
+
+    if must_total == 0:
+        return PrefilterVerdict(score=1.0, reject=False, per_req=per_req)
+    score = must_hit / must_total
+    return PrefilterVerdict(score=round(score, 3), reject=score < threshold, per_req=per_req)
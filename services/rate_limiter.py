@@ -0,0 +1,97 @@
+import time
+import asyncio
+import logging
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, rpm: float, tpm: float, min_factor: float = 0.1, recovery_step: float = 0.05):
+        """
+        Общий для всех LLM-вызовов лимитер: два token bucket (запросы и токены в минуту).
+        После 429 лимиты снижаются вдвое и все вызовы ждут retry-after,
+        затем после каждого успешного вызова постепенно восстанавливаются.
+
+        :param rpm: Лимит запросов в минуту.
+        :param tpm: Лимит токенов в минуту.
+        :param min_factor: Минимальная доля от исходных лимитов.
+        :param recovery_step: На сколько доля лимитов растёт после успешного вызова.
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.min_factor = min_factor
+        self.recovery_step = recovery_step
+        self.factor = 1.0
+        self._requests = rpm
+        self._tokens = tpm
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self._waiting = 0
+        self.rate_limited = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Сколько вызовов сейчас ждут разрешения лимитера."""
+        return self._waiting
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._waiting,
+            "factor": round(self.factor, 3),
+            "rpm": round(self.rpm * self.factor, 1),
+            "tpm": round(self.tpm * self.factor, 1),
+            "rate_limited": self.rate_limited,
+        }
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm * self.factor, self._requests + elapsed * self.rpm * self.factor / 60.0)
+        self._tokens = min(self.tpm * self.factor, self._tokens + elapsed * self.tpm * self.factor / 60.0)
+
+    async def acquire(self, tokens: int) -> None:
+        """
+        Ждёт, пока бюджет позволит выполнить запрос с оценкой в tokens токенов.
+        Вызовы обслуживаются по очереди (FIFO).
+        """
+        self._waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    # запрос больше минутного бюджета иначе ждал бы вечно
+                    need = min(tokens, self.tpm * self.factor)
+                    wait = self._blocked_until - now
+                    if wait <= 0:
+                        if self._requests >= 1 and self._tokens >= need:
+                            self._requests -= 1
+                            self._tokens -= need
+                            return
+                        wait = max(
+                            (1 - self._requests) * 60.0 / (self.rpm * self.factor),
+                            (need - self._tokens) * 60.0 / (self.tpm * self.factor),
+                        )
+                    if self._waiting > 1:
+                        logger.debug(f"LLM rate limiter: waiting {wait:.2f}s, queue depth {self._waiting}")
+                    await asyncio.sleep(wait)
+        finally:
+            self._waiting -= 1
+
+    def on_success(self) -> None:
+        self.factor = min(1.0, self.factor + self.recovery_step)
+
+    def on_rate_limited(self, retry_after: float) -> None:
+        """Реакция на 429: пауза для всех вызовов и снижение лимитов."""
+        self.rate_limited += 1
+        self.factor = max(self.min_factor, self.factor / 2)
+        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        # бюджет, накопленный до ошибки, больше не считаем доступным
+        self._requests = min(self._requests, 0.0)
+        self._tokens = min(self._tokens, 0.0)
+        logger.warning(
+            f"LLM rate limited: pausing {retry_after:.1f}s, limits reduced to "
+            f"{self.rpm * self.factor:.0f} rpm / {self.tpm * self.factor:.0f} tpm"
+        )
@@ -0,0 +1,242 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, Optional, Set, Tuple
+
+from aiogram import Bot
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.orm_query import (
+    orm_add_rescore_job,
+    orm_count_vacancy_resumes,
+    orm_get_rescore_job,
+    orm_get_running_rescore_jobs,
+    orm_get_vacancy_resumes_batch,
+    orm_supersede_rescore_jobs,
+    orm_update_rescore_job,
+)
+from services.background import spawn
+from services.llm_matching import (
+    get_vacancy_text,
+    refresh_vacancy_checklist,
+    save_resume_score,
+    score_resume_api,
+    score_stored_resume_api,
+)
+
+logger = logging.getLogger(__name__)
+
+# ===================== конфигурация =====================
+# сколько резюме читаем из БД за раз
+ATS_RESCORE_BATCH = int(os.getenv("ATS_RESCORE_BATCH", "50"))
+# сколько резюме оцениваем одновременно
+ATS_RESCORE_CONCURRENCY = int(os.getenv("ATS_RESCORE_CONCURRENCY", "4"))
+# не чаще, чем раз в столько секунд, редактируем сообщение с прогрессом
+PROGRESS_EDIT_INTERVAL = 3.0
+
+# (vacancy_id, sha текста) заданий, которые уже выполняются в этом процессе
+_running: Set[Tuple[int, str]] = set()
+
+
+def _text_sha(vacancy_text: str) -> str:
+    return hashlib.sha256(vacancy_text.encode("utf-8", "ignore")).hexdigest()
+
+
+def start_vacancy_rescore(
+    bot: Bot, session_pool: async_sessionmaker, vacancy_id: int, chat_id: int, resume: bool = False,
+) -> None:
+    """
+    Запускает в фоне разбор нового чек-листа вакансии и пересчёт оценок всех её резюме.
+    После правки вакансии отдельный прогрев не нужен: он читал бы и писал ту же базу чек-листа.
+    resume=True — продолжить незавершённое задание с чекпоинта (после перезапуска бота).
+    """
+    spawn(rescore_vacancy(bot, session_pool, vacancy_id, chat_id, resume), name=f"rescore-vacancy-{vacancy_id}")
+
+
+async def resume_rescore_jobs(bot: Bot, session_pool: async_sessionmaker) -> None:
+    """Продолжает незавершённые пересчёты после перезапуска бота."""
+    async with session_pool() as session:
+        jobs = await orm_get_running_rescore_jobs(session)
+    # по одному пересчёту на вакансию: актуальную версию текста определит rescore_vacancy
+    chats = {job.vacancy_id: job.chat_id for job in jobs}
+    for vacancy_id, chat_id in chats.items():
+        start_vacancy_rescore(bot, session_pool, vacancy_id, chat_id, resume=True)
+    if chats:
+        logger.info(f"Resumed rescoring for {len(chats)} vacancies.")
+
+
+async def rescore_vacancy(
+    bot: Bot, session_pool: async_sessionmaker, vacancy_id: int, chat_id: int, resume: bool = False,
+) -> None:
+    """
+    Пересчитывает оценки всех резюме вакансии после изменения её текста.
+    Резюме читаются порциями по resume_id, оцениваются с ограниченной параллельностью,
+    после каждой порции сохраняется чекпоинт; прогресс — в одном редактируемом сообщении.
+
+    :param bot: Экземпляр бота.
+    :param session_pool: Фабрика сессий.
+    :param vacancy_id: Идентификатор вакансии.
+    :param chat_id: Чат администратора для отчёта о прогрессе.
+    :param resume: Продолжить незавершённое задание для текущего текста, а не начинать заново.
+    """
+    async with session_pool() as session:
+        vacancy_text = await get_vacancy_text(session, vacancy_id)
+    if not vacancy_text:
+        return
+    text_sha = _text_sha(vacancy_text)
+    if (vacancy_id, text_sha) in _running:
+        return
+    _running.add((vacancy_id, text_sha))
+    try:
+        await _run_rescore(bot, session_pool, vacancy_id, text_sha, chat_id, resume)
+    finally:
+        _running.discard((vacancy_id, text_sha))
+
+
+async def _run_rescore(
+    bot: Bot, session_pool: async_sessionmaker, vacancy_id: int, text_sha: str, chat_id: int, resume: bool,
+) -> None:
+    async with session_pool() as session:
+        job = await orm_get_rescore_job(session, vacancy_id, text_sha)
+        if resume:
+            # после перезапуска продолжаем только незавершённое задание для этого текста
+            if job is None or job.status != "running":
+                return
+            job_id, total = job.job_id, job.total
+            last_id, scored, failed = job.last_resume_id, job.scored, job.failed
+        else:
+            # пересчёты для прежних версий текста вакансии больше не нужны
+            await orm_supersede_rescore_jobs(session, vacancy_id)
+            total = await orm_count_vacancy_resumes(session, vacancy_id)
+            last_id, scored, failed = 0, 0, 0
+            if job is None:
+                job = await orm_add_rescore_job(session, vacancy_id, text_sha, chat_id, total)
+                if job is None:
+                    return
+            else:
+                # текст вернули к прежней версии (A → B → A): оценки посчитаны по B, начинаем заново
+                await orm_update_rescore_job(
+                    session, job.job_id, status="running", chat_id=chat_id, total=total,
+                    last_resume_id=0, scored=0, failed=0,
+                )
+            job_id = job.job_id
+
+    # разбираем новый чек-лист (это и прогрев для следующих кандидатов) и сравниваем с прежним;
+    # неизменившиеся пункты возьмутся из кэша по требованиям. Делаем это и без резюме, чтобы
+    # база для сравнения при следующей правке была актуальной
+    async with session_pool() as session:
+        diff = await refresh_vacancy_checklist(session, vacancy_id)
+
+    if total == 0:
+        async with session_pool() as session:
+            await orm_update_rescore_job(session, job_id, status="done")
+        return
+
+    progress = _Progress(bot, chat_id, vacancy_id, total, diff)
+    await progress.start(scored + failed)
+    sem = asyncio.Semaphore(ATS_RESCORE_CONCURRENCY)
+
+    while True:
+        async with session_pool() as session:
+            # вакансию снова изменили — этот пересчёт устарел, его заменит новый
+            if _text_sha(await get_vacancy_text(session, vacancy_id)) != text_sha:
+                await orm_update_rescore_job(session, job_id, status="superseded")
+                await progress.finish("Пересчёт прерван: вакансия снова изменена.")
+                return
+            batch = await orm_get_vacancy_resumes_batch(session, vacancy_id, last_id, ATS_RESCORE_BATCH)
+            rows = [(r.resume_id, r.content_sha256, r.file_id) for r in batch]
+        if not rows:
+            break
+
+        results = await asyncio.gather(*[
+            _rescore_one(bot, session_pool, sem, vacancy_id, resume_id, content_sha, file_id)
+            for resume_id, content_sha, file_id in rows
+        ])
+        scored += sum(results)
+        failed += len(results) - sum(results)
+        last_id = rows[-1][0]
+
+        async with session_pool() as session:
+            await orm_update_rescore_job(session, job_id, last_resume_id=last_id, scored=scored, failed=failed)
+        await progress.update(scored + failed)
+
+    async with session_pool() as session:
+        await orm_update_rescore_job(session, job_id, status="done")
+    await progress.finish(f"Пересчёт оценок завершён: {scored} оценено, {failed} с ошибкой.")
+    logger.info(f"Rescore of vacancy {vacancy_id} done: {scored} scored, {failed} failed.")
+
+
+async def _rescore_one(
+    bot: Bot,
+    session_pool: async_sessionmaker,
+    sem: asyncio.Semaphore,
+    vacancy_id: int,
+    resume_id: int,
+    content_sha256: Optional[str],
+    file_id: str,
+) -> bool:
+    async with sem:
+        try:
+            async with session_pool() as session:
+                result = {"error": "resume_text_unavailable"}
+                if content_sha256:
+                    result = await score_stored_resume_api(session, vacancy_id, content_sha256)
+                if result.get("error") == "resume_text_unavailable":
+                    # текста нет (скан без OCR, старые записи) — скачиваем pdf по file_id из Telegram
+                    file_info = await bot.get_file(file_id)
+                    downloaded = await bot.download_file(file_info.file_path)
+                    result = await score_resume_api(session, vacancy_id=vacancy_id, resume_bytes=downloaded.read())
+                if "error" in result:
+                    return False
+                await save_resume_score(session, resume_id, vacancy_id, result)
+            return True
+        except Exception:
+            logger.exception(f"Error rescoring resume for vacancy {vacancy_id}")
+            return False
+
+
+class _Progress:
+    def __init__(self, bot: Bot, chat_id: int, vacancy_id: int, total: int, diff: Optional[Dict[str, Any]] = None):
+        """Одно сообщение с прогрессом пересчёта, редактируемое не чаще PROGRESS_EDIT_INTERVAL."""
+        self.bot = bot
+        self.chat_id = chat_id
+        self.vacancy_id = vacancy_id
+        self.total = total
+        self.diff = diff
+        self.message_id: Optional[int] = None
+        self._last_edit = 0.0
+
+    def _text(self, done: int) -> str:
+        text = f"Пересчёт оценок по вакансии #{self.vacancy_id}: {done}/{self.total}"
+        if self.diff is not None:
+            changed = len(self.diff["changed"])
+            reqs_total = changed + len(self.diff["unchanged"])
+            text += f"\nИзменено требований: {changed} из {reqs_total}, удалено: {self.diff['removed']}"
+        return text
+
+    async def start(self, done: int) -> None:
+        try:
+            msg = await self.bot.send_message(self.chat_id, self._text(done))
+            self.message_id = msg.message_id
+            self._last_edit = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Cannot send rescore progress: {e}")
+
+    async def update(self, done: int) -> None:
+        if time.monotonic() - self._last_edit < PROGRESS_EDIT_INTERVAL:
+            return
+        await self._edit(self._text(done))
+
+    async def finish(self, text: str) -> None:
+        await self._edit(f"Вакансия #{self.vacancy_id}. {text}")
+
+    async def _edit(self, text: str) -> None:
+        if self.message_id is None:
+            return
+        try:
+            await self.bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id)
+            self._last_edit = time.monotonic()
+        except Exception as e:
+            logger.debug(f"Cannot edit rescore progress: {e}")
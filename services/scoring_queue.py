@@ -0,0 +1,223 @@
+import os
+import html
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from services.llm_matching import save_resume_score, score_resume_api
+
+logger = logging.getLogger(__name__)
+
+# ===================== конфигурация =====================
+# сколько резюме оцениваются одновременно
+ATS_SCORING_WORKERS = int(os.getenv("ATS_SCORING_WORKERS", "4"))
+# сколько заданий может ждать в очереди, прежде чем начнём отказывать
+ATS_SCORING_QUEUE = int(os.getenv("ATS_SCORING_QUEUE", "100"))
+# 1 = показывать кандидату промежуточные статусы требований, редактируя одно сообщение
+ATS_STREAMING = os.getenv("ATS_STREAMING", "0") == "1"
+# не чаще одного редактирования сообщения за столько секунд (ограничения Telegram на edit)
+ATS_STREAM_EDIT_INTERVAL = float(os.getenv("ATS_STREAM_EDIT_INTERVAL", "1.5"))
+
+
+@dataclass
+class ScoringJob:
+    chat_id: int
+    vacancy_id: int
+    resume_bytes: bytes
+    reply_to_message_id: Optional[int] = None
+    # запись Resume, к которой сохраняется оценка (resume_score)
+    resume_id: Optional[int] = None
+    # сообщение «Резюме принято…», которое обновляется по ходу оценки (ATS_STREAMING=1)
+    status_message_id: Optional[int] = None
+
+
+class ScoringQueueFull(Exception):
+    """Очередь на оценку резюме переполнена."""
+
+
+def format_score_message(result: Dict[str, Any]) -> str:
+    """
+    Формирует текст сообщения с результатом оценки для кандидата.
+
+    :param result: Финальный результат score_resume_api.
+    :return: Текст сообщения в HTML.
+    """
+    score = result["score_overall"]
+    subs = result["subscores"]
+    matched = ", ".join(result["skills"]["matched"]) if result["skills"]["matched"] else "—"
+    missing = ", ".join(result["skills"]["missing"]) if result["skills"]["missing"] else "—"
+    snips = result.get("highlights", [])[:3]
+
+    lines = [
+        f"Совместимость: <b>{score:.1f}%</b>",
+        f"Must-have: {subs.get('must_have', 0):.1f}%",
+        f"Optional: {subs.get('optional', 0):.1f}%",
+        f"Совпавшие навыки/требования: {matched}",
+        f"Чего не хватает: {missing}",
+    ]
+    if snips:
+        lines.append("\nЦитаты из резюме:")
+        for i, s in enumerate(snips, 1):
+            lines.append(f"{i}) {s}")
+    return "\n".join(lines)
+
+
+def format_partial_message(reqs: List[Dict[str, Any]], per_req: List[Dict[str, Any]]) -> str:
+    """
+    Формирует текст промежуточного сообщения: сколько требований проверено, предварительная
+    оценка по уже проверенным и их статусы.
+
+    :param reqs: Чек-лист требований вакансии.
+    :param per_req: Уже оценённые требования (req_index, status, ...).
+    :return: Текст сообщения в HTML.
+    """
+    scored = {s["req_index"]: s for s in per_req if 0 <= s["req_index"] < len(reqs)}
+    weight = sum(reqs[i]["weight"] for i in scored) or 1.0
+    running = 100.0 * sum(reqs[i]["weight"] * float(s.get("status", 0.0)) for i, s in scored.items()) / weight
+
+    lines = [
+        f"Выполняю оценку… проверено {len(scored)} из {len(reqs)} требований",
+        f"Предварительно: <b>{running:.1f}%</b>",
+        "",
+    ]
+    for i in sorted(scored):
+        st = float(scored[i].get("status", 0.0))
+        mark = "✅" if st >= 0.95 else ("🟡" if st >= 0.5 else "❌")
+        lines.append(f"{mark} {html.escape(reqs[i]['text'])}")
+    return "\n".join(lines)
+
+
+class ScoringQueue:
+    def __init__(self, workers: int, maxsize: int):
+        """
+        Очередь фоновой оценки резюме с фиксированным числом воркеров.
+
+        :param workers: Число воркеров (одновременных оценок).
+        :param maxsize: Максимальная длина очереди.
+        """
+        self.workers = workers
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.bot: Optional[Bot] = None
+        self.session_pool: Optional[async_sessionmaker] = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self, bot: Bot, session_pool: async_sessionmaker) -> None:
+        """
+        Запускает воркеры. Вызывается при старте бота.
+
+        :param bot: Экземпляр бота для отправки результатов.
+        :param session_pool: Фабрика сессий для воркеров.
+        """
+        self.bot = bot
+        self.session_pool = session_pool
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"scoring-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Scoring queue started with {self.workers} workers.")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Scoring queue stopped.")
+
+    def submit(self, job: ScoringJob) -> None:
+        """
+        Ставит задание в очередь, не дожидаясь оценки.
+
+        :raises ScoringQueueFull: Если очередь заполнена.
+        """
+        if self._queue is None:
+            raise RuntimeError("scoring queue is not started")
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise ScoringQueueFull(f"scoring queue is full ({self.maxsize})")
+        logger.info(f"Scoring job for vacancy {job.vacancy_id} queued (depth={self.depth}).")
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            job: ScoringJob = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception:
+                logger.exception(f"Scoring worker {n} failed on job for chat {job.chat_id}")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: ScoringJob) -> None:
+        progress = _ProgressMessage(self.bot, job.chat_id, job.status_message_id) if job.status_message_id else None
+        # отдельная короткоживущая сессия на каждое задание
+        try:
+            async with self.session_pool() as session:
+                result = await score_resume_api(
+                    session,
+                    vacancy_id=job.vacancy_id,
+                    resume_bytes=job.resume_bytes,
+                    on_progress=progress.update if progress else None,
+                )
+                if job.resume_id and "error" not in result:
+                    await save_resume_score(session, job.resume_id, job.vacancy_id, result)
+        except Exception:
+            logger.exception("Произошла ошибка при оценке резюме")
+            result = {"error": "scoring_failed"}
+
+        if "error" in result:
+            text = "Не удалось выполнить оценку. Попробуйте ещё раз позже."
+        else:
+            text = format_score_message(result)
+        # итог — в то же сообщение; если его уже нельзя отредактировать, отправляем новое
+        if progress and await progress.edit(text):
+            return
+        await self.bot.send_message(
+            job.chat_id,
+            text,
+            parse_mode="HTML",
+            reply_to_message_id=job.reply_to_message_id,
+            allow_sending_without_reply=True,
+        )
+
+
+class _ProgressMessage:
+    def __init__(self, bot: Bot, chat_id: int, message_id: int):
+        """Промежуточные результаты оценки в одном сообщении, не чаще ATS_STREAM_EDIT_INTERVAL."""
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self._text = ""
+        self._last_edit = 0.0
+
+    async def update(self, reqs: List[Dict[str, Any]], per_req: List[Dict[str, Any]]) -> None:
+        # промежуточные правки пропускаем, последнюю всё равно заменит итоговое сообщение
+        if time.monotonic() - self._last_edit < ATS_STREAM_EDIT_INTERVAL:
+            return
+        await self.edit(format_partial_message(reqs, per_req))
+
+    async def edit(self, text: str) -> bool:
+        if text == self._text:
+            return True
+        try:
+            await self.bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id, parse_mode="HTML")
+        except TelegramBadRequest as e:
+            logger.warning(f"Cannot edit scoring progress message in chat {self.chat_id}: {e}")
+            return False
+        self._text = text
+        self._last_edit = time.monotonic()
+        return True
+
+
+scoring_queue = ScoringQueue(workers=ATS_SCORING_WORKERS, maxsize=ATS_SCORING_QUEUE)
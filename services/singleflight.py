@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Склеивает одновременные вызовы с одинаковым ключом в один:
+        первый вызов выполняет работу, остальные ждут его результат.
+        """
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполняет fn() ровно один раз для всех одновременных вызовов с ключом key.
+
+        :param key: Ключ (например, SHA-ключ кэша).
+        :param fn: Фабрика корутины, выполняющей работу.
+        :return: Результат fn() (общий для всех ожидающих).
+        """
+        while (fut := self._inflight.get(key)) is not None:
+            logger.debug(f"single-flight: joined in-flight call {key[:12]}")
+            try:
+                # shield: отмена ожидающего не должна отменять общий результат
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                # отменили ведущего, а не нас — пробуем стать ведущим сами
+                if fut.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            # помечаем исключение как полученное, если ждущих не было
+            fut.exception()
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
@@ -0,0 +1,59 @@
+import os
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.orm_query import orm_get_all_vacancies
+from services.background import spawn
+from services.llm_matching import vacancies_missing_requirements, warm_vacancy_requirements
+
+logger = logging.getLogger(__name__)
+
+# ===================== конфигурация =====================
+# сколько вакансий разбирается одновременно при прогреве после запуска
+ATS_WARMUP_CONCURRENCY = int(os.getenv("ATS_WARMUP_CONCURRENCY", "2"))
+
+
+def start_vacancy_warmup(session_pool: async_sessionmaker, vacancy_id: int) -> None:
+    """Разбирает и кэширует чек-лист добавленной или изменённой вакансии в фоне."""
+    spawn(_warm_one(session_pool, vacancy_id), name=f"warmup-vacancy-{vacancy_id}")
+
+
+def start_checklist_backfill(session_pool: async_sessionmaker) -> None:
+    """Прогревает в фоне чек-листы всех вакансий, которых нет в кэше."""
+    spawn(backfill_requirement_checklists(session_pool), name="warmup-backfill")
+
+
+async def _warm_one(session_pool: async_sessionmaker, vacancy_id: int) -> bool:
+    async with session_pool() as session:
+        warmed = await warm_vacancy_requirements(session, vacancy_id)
+    if not warmed:
+        logger.warning(f"Cannot warm up requirements checklist of vacancy {vacancy_id}")
+    return warmed
+
+
+async def backfill_requirement_checklists(session_pool: async_sessionmaker) -> None:
+    """
+    Находит вакансии без чек-листа в кэше (после смены PROMPT_VERSION, очистки кэша или
+    правок в обход бота) и разбирает их не более чем по ATS_WARMUP_CONCURRENCY одновременно.
+    """
+    async with session_pool() as session:
+        vacancies = await orm_get_all_vacancies(session)
+        missing = await vacancies_missing_requirements(session, vacancies)
+    if not missing:
+        return
+    logger.info(f"Warming up requirements checklists for {len(missing)} vacancies.")
+
+    sem = asyncio.Semaphore(ATS_WARMUP_CONCURRENCY)
+
+    async def _bounded(vacancy_id: int) -> bool:
+        async with sem:
+            try:
+                return await _warm_one(session_pool, vacancy_id)
+            except Exception:
+                logger.exception(f"Error warming up vacancy {vacancy_id}")
+                return False
+
+    results = await asyncio.gather(*[_bounded(vacancy_id) for vacancy_id in missing])
+    logger.info(f"Requirements checklists warmed up: {sum(results)} of {len(missing)}.")
@@ -0,0 +1,45 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# тесты не ходят в OpenAI: services.llm_matching создаёт бэкенд при импорте
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("FAKE_LLM_LATENCY_MS", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def run_pool(tmp_path):
+    """Выполняет async-функцию test(session_pool) на пустой SQLite-базе со схемой бота."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from database.models import Base
+    from database.reference_cache import BANNERS, CATEGORIES, VACANCY_COUNTS, reference_cache
+
+    def run(test):
+        async def main():
+            # кэш справочников общий на процесс — не тащим в тест данные прошлой базы
+            reference_cache.invalidate(BANNERS, CATEGORIES, VACANCY_COUNTS)
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+            try:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                return await test(async_sessionmaker(engine, expire_on_commit=False))
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+    return run
+
+
+@pytest.fixture
+def run_db(run_pool):
+    """Выполняет async-функцию test(session) на пустой SQLite-базе со схемой бота."""
+    def run(test):
+        async def with_session(session_pool):
+            async with session_pool() as session:
+                return await test(session)
+        return run_pool(with_session)
+    return run
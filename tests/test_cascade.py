@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from services import llm_matching
+
+REQS = [
+    {"text": "Python", "must": True, "weight": 1.0},
+    {"text": "SQL", "must": True, "weight": 1.0},
+]
+
+
+@pytest.fixture
+def cascade(monkeypatch):
+    monkeypatch.setattr(llm_matching, "ATS_SCORING_MODE", "cascade")
+    monkeypatch.setattr(llm_matching, "LLM_MODEL_FAST", "fast")
+    monkeypatch.setattr(llm_matching, "LLM_MODEL", "strong")
+    monkeypatch.setattr(llm_matching, "ATS_CASCADE_LOW", 40.0)
+    monkeypatch.setattr(llm_matching, "ATS_CASCADE_HIGH", 75.0)
+
+
+def _run(fast_statuses):
+    calls = []
+
+    async def scorer(model):
+        calls.append(model)
+        statuses = fast_statuses if model == "fast" else [1.0, 1.0]
+        return [{"req_index": i, "status": s} for i, s in enumerate(statuses)]
+
+    per_req, model, meta = asyncio.run(
+        llm_matching._run_scoring(None, "vacancy", "resume", REQS, scorer, cache_stages=False)
+    )
+    return calls, model, meta
+
+
+@pytest.mark.parametrize("statuses, fast_score", [([1.0, 1.0], 100.0), ([0.0, 0.0], 0.0)])
+def test_confident_fast_score_is_final(cascade, statuses, fast_score):
+    calls, model, meta = _run(statuses)
+    assert calls == ["fast"]
+    assert model == "fast"
+    assert meta["cascade"] == {"fast_model": "fast", "fast_score": fast_score, "escalated": False}
+
+
+@pytest.mark.parametrize("statuses", [[1.0, 0.0], [1.0, 0.5]])
+def test_borderline_score_escalates_including_band_edges(cascade, statuses):
+    # 50 — внутри диапазона, 75 — его граница: оба уходят на сильную модель
+    calls, model, meta = _run(statuses)
+    assert calls == ["fast", "strong"]
+    assert model == "strong"
+    assert meta["cascade"]["escalated"]
+
+
+def test_single_mode_calls_main_model_once(monkeypatch):
+    monkeypatch.setattr(llm_matching, "ATS_SCORING_MODE", "single")
+    monkeypatch.setattr(llm_matching, "LLM_MODEL", "strong")
+    calls, model, meta = _run([1.0, 0.0])
+    assert calls == ["strong"]
+    assert model == "strong"
+    assert meta == {}
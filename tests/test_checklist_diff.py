@@ -0,0 +1,40 @@
+from services.llm_matching import diff_requirement_checklists
+
+
+def _req(text, min_years=None, level=None):
+    return {"text": text, "must": True, "weight": 1.0, "min_years": min_years, "level": level}
+
+
+def test_identical_checklists_have_no_changes():
+    reqs = [_req("Python"), _req("SQL", 2)]
+    assert diff_requirement_checklists(reqs, reqs) == {"unchanged": [0, 1], "changed": [], "removed": 0}
+
+
+def test_reordered_and_reformatted_items_are_unchanged():
+    old = [_req("Опыт с Docker"), _req("Знание  SQL")]
+    new = [_req("знание sql"), _req("опыт с docker ")]
+    assert diff_requirement_checklists(old, new) == {"unchanged": [0, 1], "changed": [], "removed": 0}
+
+
+def test_yo_is_normalized():
+    diff = diff_requirement_checklists([_req("Работа с ёмкими данными")], [_req("работа с емкими данными")])
+    assert diff["changed"] == []
+
+
+def test_added_edited_and_removed_items():
+    old = [_req("Python"), _req("SQL"), _req("Docker")]
+    new = [_req("Python"), _req("Kubernetes"), _req("SQL", 3)]
+    diff = diff_requirement_checklists(old, new)
+    # min_years входит в ключ: «SQL» и «SQL от 3 лет» оцениваются по-разному
+    assert diff == {"unchanged": [0], "changed": [1, 2], "removed": 2}
+
+
+def test_level_change_is_a_change():
+    diff = diff_requirement_checklists([_req("English", level="B2")], [_req("English", level="C1")])
+    assert diff == {"unchanged": [], "changed": [0], "removed": 1}
+
+
+def test_weight_and_must_do_not_affect_the_key():
+    old = [_req("Python")]
+    new = [{**_req("Python"), "must": False, "weight": 0.5}]
+    assert diff_requirement_checklists(old, new)["unchanged"] == [0]
@@ -0,0 +1,133 @@
+from datetime import datetime
+
+import pytest
+from aiogram.types import Chat, Message, Update
+from sqlalchemy import event, func, select
+
+from database.models import ResumeText, User
+from database.orm_query import orm_add_user, orm_save_resume_text
+from database.session import savepoint
+from middlewares import db as db_middleware
+from middlewares.db import COMMIT_FAILED_TEXT, DataBaseSession
+
+
+def _update():
+    message = Message(message_id=1, date=datetime.now(), chat=Chat(id=1, type="private"), text="/start")
+    return Update(update_id=1, message=message)
+
+
+@pytest.fixture
+def unit_of_work(monkeypatch):
+    monkeypatch.setattr(db_middleware, "ATS_DB_UNIT_OF_WORK", True)
+
+
+@pytest.fixture
+def answers(monkeypatch):
+    sent = []
+
+    async def answer(self, text, **kwargs):
+        sent.append(text)
+
+    monkeypatch.setattr(Message, "answer", answer)
+    return sent
+
+
+async def _call(session_pool, handler):
+    """Обрабатывает апдейт через middleware и считает COMMIT на уровне соединения."""
+    commits = []
+    engine = session_pool.kw["bind"].sync_engine
+    listener = lambda conn: commits.append(1)
+    event.listen(engine, "commit", listener)
+    try:
+        try:
+            await DataBaseSession(session_pool)(handler, _update(), {})
+        finally:
+            event.remove(engine, "commit", listener)
+    except Exception as e:
+        return commits, e
+    return commits, None
+
+
+async def _rows(session_pool):
+    async with session_pool() as session:
+        users = (await session.execute(select(User.user_id).order_by(User.user_id))).scalars().all()
+        texts = (await session.execute(select(func.count()).select_from(ResumeText))).scalar_one()
+    return users, texts
+
+
+def test_unit_of_work_commits_once(run_pool, unit_of_work):
+    async def handler(update, data):
+        session = data["session"]
+        await orm_add_user(session, user_id=1)
+        await orm_add_user(session, user_id=2)
+        await orm_save_resume_text(session, "a" * 64, "text", "pymupdf")
+
+    async def test(session_pool):
+        commits, error = await _call(session_pool, handler)
+        return commits, error, await _rows(session_pool)
+
+    commits, error, rows = run_pool(test)
+    assert error is None
+    assert len(commits) == 1
+    assert rows == ([1, 2], 1)
+
+
+def test_handler_error_rolls_back_everything(run_pool, unit_of_work):
+    async def handler(update, data):
+        await orm_add_user(data["session"], user_id=1)
+        raise RuntimeError("handler failed")
+
+    async def test(session_pool):
+        commits, error = await _call(session_pool, handler)
+        return commits, error, await _rows(session_pool)
+
+    commits, error, rows = run_pool(test)
+    assert isinstance(error, RuntimeError)
+    assert commits == []
+    assert rows == ([], 0)
+
+
+def test_savepoint_isolates_failed_write(run_pool, unit_of_work):
+    async def handler(update, data):
+        session = data["session"]
+        await orm_add_user(session, user_id=1)
+        async with savepoint(session):
+            # NOT NULL: запись не пройдёт, откатится только блок
+            await orm_save_resume_text(session, "a" * 64, None, "none")
+        await orm_add_user(session, user_id=2)
+
+    async def test(session_pool):
+        commits, error = await _call(session_pool, handler)
+        return commits, error, await _rows(session_pool)
+
+    commits, error, rows = run_pool(test)
+    assert error is None
+    assert len(commits) == 1
+    assert rows == ([1, 2], 0)
+
+
+def test_failed_commit_is_reported_to_user(run_pool, unit_of_work, answers):
+    async def handler(update, data):
+        # ошибка проявится только при COMMIT в middleware, после ответа обработчика
+        data["session"].add(ResumeText(content_sha256="a" * 64, resume_text=None, extract_method="none"))
+
+    async def test(session_pool):
+        commits, error = await _call(session_pool, handler)
+        return commits, error, await _rows(session_pool)
+
+    commits, error, rows = run_pool(test)
+    assert error is None
+    assert commits == []
+    assert answers == [COMMIT_FAILED_TEXT]
+    assert rows == ([], 0)
+
+
+def test_untouched_session_is_not_committed(run_pool, unit_of_work, answers):
+    async def handler(update, data):
+        return "ok"
+
+    async def test(session_pool):
+        return await _call(session_pool, handler)
+
+    commits, error = run_pool(test)
+    assert (commits, error, answers) == ([], None, [])
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services import extraction
+from services.extraction import ExtractionExecutor, ExtractionQueueFull
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    """Задания выполняются в потоках: «PDF» — это число секунд работы, release досрочно завершает все."""
+    release = threading.Event()
+
+    def extract(seconds):
+        release.wait(seconds)
+        return "text", "pymupdf", [("pymupdf", seconds, 1)]
+
+    monkeypatch.setattr(extraction, "extract_resume_text_timed", extract)
+    executors = []
+
+    def make(workers=1, max_pending=4, timeout=1.0):
+        executor = ExtractionExecutor(workers=workers, max_pending=max_pending, timeout=timeout)
+        pool = ThreadPoolExecutor(max_workers=workers)
+        executor._get_pool = lambda: pool
+        executors.append(pool)
+        return executor
+
+    yield make, release
+    release.set()
+    for pool in executors:
+        pool.shutdown(wait=True)
+
+
+def test_queue_wait_is_not_part_of_timeout(jobs):
+    make, _ = jobs
+
+    async def main():
+        executor = make(workers=1, timeout=0.5)
+        # каждое задание укладывается в таймаут, хотя второе ждёт первое дольше него
+        return await asyncio.gather(*(executor.extract(0.3) for _ in range(2))), executor.pending
+
+    results, pending = asyncio.run(main())
+    assert results == [("text", "pymupdf")] * 2
+    assert pending == 0
+
+
+def test_timed_out_job_holds_its_slot_until_done(jobs):
+    make, release = jobs
+
+    async def main():
+        executor = make(workers=1, timeout=0.05)
+        result = await executor.extract(5.0)
+        # процесс ещё занят заданием: слот и место в очереди не освобождены
+        held = executor.pending, executor._slots.locked()
+        release.set()
+        for _ in range(100):
+            if executor.pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        return result, held, executor.pending, executor._slots.locked()
+
+    result, held, pending, locked = asyncio.run(main())
+    assert result == (None, "timeout")
+    assert held == (1, True)
+    assert (pending, locked) == (0, False)
+
+
+def test_full_queue_is_rejected(jobs):
+    make, release = jobs
+
+    async def main():
+        executor = make(workers=1, max_pending=2, timeout=5.0)
+        running = [asyncio.ensure_future(executor.extract(5.0)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(ExtractionQueueFull):
+            await executor.extract(0)
+        release.set()
+        return await asyncio.gather(*running), executor.pending
+
+    results, pending = asyncio.run(main())
+    assert results == [("text", "pymupdf")] * 2
+    assert pending == 0
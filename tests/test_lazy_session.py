@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from aiogram.types import Chat, Message, Update
+from sqlalchemy import event, select
+
+from database.models import User
+from database.orm_query import orm_add_user
+from database.session import LazySession
+from middlewares.db import DataBaseSession
+from services.metrics import DB_SESSIONS, DB_STATEMENTS
+
+
+def _count_checkouts(session_pool):
+    """Считает соединения, взятые из пула движка."""
+    checkouts = []
+    event.listen(session_pool.kw["bind"].sync_engine.pool, "checkout", lambda *args: checkouts.append(1))
+    return checkouts
+
+
+def test_untouched_session_never_checks_out(run_pool):
+    async def test(session_pool):
+        checkouts = _count_checkouts(session_pool)
+        session = LazySession(session_pool)
+        await session.close()
+        return checkouts, session
+
+    checkouts, session = run_pool(test)
+    assert checkouts == []
+    assert not session.used
+    assert (session.statements, session.connection_seconds) == (0, 0.0)
+
+
+def test_db_free_update_skips_the_pool(run_pool):
+    async def handler(update, data):
+        return "no db"
+
+    async def test(session_pool):
+        checkouts = _count_checkouts(session_pool)
+        before = DB_SESSIONS.value(used="false"), DB_STATEMENTS.count()
+        update = Update(update_id=1, message=Message(
+            message_id=1, date=datetime.now(), chat=Chat(id=-1, type="group"), text="hi",
+        ))
+        result = await DataBaseSession(session_pool)(handler, update, {})
+        after = DB_SESSIONS.value(used="false"), DB_STATEMENTS.count()
+        return checkouts, result, before, after
+
+    checkouts, result, before, after = run_pool(test)
+    assert result == "no db"
+    assert checkouts == []
+    # апдейт учтён как «без сессии», статистика запросов не тронута
+    assert after == (before[0] + 1, before[1])
+
+
+def test_counters_add_up_over_transactions(run_pool):
+    async def test(session_pool):
+        checkouts = _count_checkouts(session_pool)
+        session = LazySession(session_pool)
+        await session.execute(select(User))
+        await session.execute(select(User.user_id))
+        await session.commit()
+        first = session.statements, session.connection_seconds
+        await orm_add_user(session, user_id=1)
+        await session.close()
+        return checkouts, first, session.statements, session.connection_seconds
+
+    checkouts, (first_statements, first_seconds), statements, seconds = run_pool(test)
+    assert first_statements == 2
+    assert first_seconds > 0
+    # SELECT и INSERT orm_add_user во второй транзакции; время соединения суммируется
+    assert statements == 4
+    assert seconds > first_seconds
+    assert len(checkouts) == 2
@@ -0,0 +1,23 @@
+import pytest
+
+from services import llm_ledger
+from services.llm_ledger import call_cost, parse_prices
+
+
+def test_parse_prices():
+    prices = parse_prices(" gpt-4o = 2.50/1.25/10.00 ;gpt-4o-mini=0.15/0.075/0.60;")
+    assert prices == {"gpt-4o": (2.5, 1.25, 10.0), "gpt-4o-mini": (0.15, 0.075, 0.6)}
+    assert parse_prices("") == {}
+
+
+@pytest.mark.parametrize("spec", ["gpt-4o=2.50/10.00", "gpt-4o=2.50/1.25/10.00/1", "gpt-4o=free"])
+def test_parse_prices_rejects_malformed(spec):
+    with pytest.raises(ValueError):
+        parse_prices(spec)
+
+
+def test_call_cost_bills_cached_input_separately(monkeypatch):
+    monkeypatch.setattr(llm_ledger, "PRICES", parse_prices("m=2/1/10"))
+    # 600 некэшированных по 2, 400 кэшированных по 1, 100 выходных по 10 — за 1M токенов
+    assert call_cost("m", 1000, 400, 100) == pytest.approx((600 * 2 + 400 * 1 + 100 * 10) / 1_000_000)
+    assert call_cost("unknown", 1000, 0, 100) == 0.0
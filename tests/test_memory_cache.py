@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services import llm_matching
+from utils import memory_cache, payload_codec
+from utils.memory_cache import MemoryCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Виртуальное время для TTL."""
+    state = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(memory_cache, "time", SimpleNamespace(monotonic=lambda: state.now))
+    return state
+
+
+def test_evicts_least_recently_used(clock):
+    cache = MemoryCache(max_items=2, max_bytes=1000)
+    cache.set("a", 1, 10)
+    cache.set("b", 2, 10)
+    # чтение делает «a» свежей — вытесняется «b»
+    assert cache.get("a") == 1
+    cache.set("c", 3, 10)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget(clock):
+    cache = MemoryCache(max_items=10, max_bytes=100)
+    cache.set("a", 1, 40)
+    cache.set("b", 2, 40)
+    cache.set("c", 3, 40)
+    assert (len(cache), cache.bytes) == (2, 80)
+    assert cache.get("a") is None
+    # запись больше всего бюджета не кэшируется и ничего не вытесняет
+    cache.set("huge", 4, 101)
+    assert (len(cache), cache.bytes) == (2, 80)
+    # перезапись ключа не удваивает его размер
+    cache.set("b", 5, 60)
+    assert (cache.get("b"), cache.bytes) == (5, 100)
+
+
+def test_expired_entry_is_a_miss(clock):
+    cache = MemoryCache(ttl=60)
+    cache.set("a", 1, 10)
+    clock.now += 60
+    assert cache.get("a") == 1
+    clock.now += 1
+    assert cache.get("a") is None
+    assert (len(cache), cache.bytes) == (0, 0)
+    assert cache.stats()["misses"] == 1
+
+
+def test_binary_row_is_sized_by_decoded_payload():
+    payload = {"kind": "final_score", "matched": ["Python"] * 200, "comment": "опыт " * 200}
+    blob = llm_matching._codec.encode(payload)
+    decoded, size = llm_matching._decode_row("k", None, blob)
+    assert decoded == payload
+    # в памяти лежит dict, а не сжатый blob — бюджет считается по JSON
+    assert size == llm_matching._memory_size(payload)
+    if payload_codec.zstandard is not None:
+        assert size > len(blob)
@@ -0,0 +1,52 @@
+import pytest
+
+from services.metrics import MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    hist = registry.histogram("t_seconds", "Test latency", ("call",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        hist.observe(value, call="a")
+    assert registry.render().splitlines() == [
+        "# HELP t_seconds Test latency",
+        "# TYPE t_seconds histogram",
+        # граница включительна: 0.1 попадает в бакет le="0.1"
+        't_seconds_bucket{call="a",le="0.1"} 2',
+        't_seconds_bucket{call="a",le="1"} 3',
+        't_seconds_bucket{call="a",le="+Inf"} 4',
+        't_seconds_sum{call="a"} 3.65',
+        't_seconds_count{call="a"} 4',
+    ]
+    assert hist.count(call="a") == 4
+    assert hist.count(call="b") == 0
+
+
+def test_counter_render_sorts_and_escapes_labels():
+    registry = MetricsRegistry()
+    counter = registry.counter("t_total", "Test counter", ("kind",))
+    counter.inc(kind="b")
+    counter.inc(2.5, kind='a"\\\n')
+    assert registry.render().splitlines()[2:] == [
+        't_total{kind="a\\"\\\\\\n"} 2.5',
+        't_total{kind="b"} 1',
+    ]
+
+
+def test_unlabeled_metric_and_label_checks():
+    registry = MetricsRegistry()
+    counter = registry.counter("t_total", "Test counter")
+    counter.inc()
+    assert registry.render().splitlines()[2:] == ["t_total 1"]
+    with pytest.raises(ValueError):
+        counter.inc(kind="x")
+    with pytest.raises(ValueError):
+        counter.inc(-1)
+
+
+def test_registration_is_idempotent():
+    registry = MetricsRegistry()
+    counter = registry.counter("t_total", "Test counter", ("kind",))
+    assert registry.counter("t_total", "Test counter", ("kind",)) is counter
+    with pytest.raises(ValueError):
+        registry.histogram("t_total", "Test counter", ("kind",))
@@ -0,0 +1,145 @@
+from sqlalchemy import event
+
+from database.orm_query import (
+    orm_add_to_cart,
+    orm_add_user,
+    orm_add_vacancy,
+    orm_count_user_carts,
+    orm_count_vacancies,
+    orm_create_categories,
+    orm_delete_vacancy,
+    orm_get_user_cart_page,
+    orm_get_vacancy_page,
+)
+from utils.paginator import QueryPaginator
+
+
+async def _add_vacancies(session, category, count):
+    ids = []
+    for i in range(count):
+        vacancy = await orm_add_vacancy(session, {
+            "name": f"v{i}", "description": "d", "requirements": "r", "image": "i", "category": category,
+        })
+        ids.append(vacancy.vacancy_id)
+    return ids
+
+
+def test_vacancy_page_keyset(run_db):
+    async def test(session):
+        await orm_create_categories(session, ["IT", "Sales"])
+        it = await _add_vacancies(session, 1, 5)
+        await _add_vacancies(session, 2, 3)
+
+        first = await orm_get_vacancy_page(session, 1, 2)
+        forward = await orm_get_vacancy_page(session, 1, 2, cursor=first[-1].vacancy_id)
+        backward = await orm_get_vacancy_page(session, 1, 2, cursor=forward[0].vacancy_id, backward=True)
+        by_offset = await orm_get_vacancy_page(session, 1, 2, offset=4)
+        return it, first, forward, backward, by_offset
+
+    it, first, forward, backward, by_offset = run_db(test)
+    ids = lambda rows: [v.vacancy_id for v in rows]
+    assert ids(first) == it[:2]
+    assert ids(forward) == it[2:4]
+    # назад — в исходном порядке, без вакансий другой категории
+    assert ids(backward) == it[:2]
+    assert ids(by_offset) == it[4:]
+
+
+def test_vacancy_browser_after_delete(run_db):
+    async def test(session):
+        await orm_create_categories(session, ["IT"])
+        it = await _add_vacancies(session, 1, 4)
+
+        async def fetch(limit, offset, cursor, backward):
+            return await orm_get_vacancy_page(session, 1, limit, offset, cursor, backward)
+
+        # пользователь на 3-й вакансии из 4, тем временем удалили последнюю
+        assert await orm_count_vacancies(session, 1) == 4
+        await orm_delete_vacancy(session, it[3])
+        paginator = QueryPaginator(fetch, await orm_count_vacancies(session, 1), page=3, cursor=it[1])
+        page = await paginator.get_page()
+        return it, page, paginator
+
+    it, page, paginator = run_db(test)
+    assert [v.vacancy_id for v in page] == [it[2]]
+    # счётчик вакансий сброшен удалением: «3 из 3», листать дальше некуда
+    assert (paginator.page, paginator.pages, paginator.has_next()) == (3, 3, False)
+
+
+async def _fill_carts(session):
+    """Корзины двух пользователей вперемешку: вакансии 1..5 у первого, 1..3 у второго."""
+    await orm_create_categories(session, ["IT"])
+    await _add_vacancies(session, 1, 5)
+    for user_id in (1, 2):
+        await orm_add_user(session, user_id=user_id)
+    for vacancy_id in range(1, 6):
+        await orm_add_to_cart(session, 1, vacancy_id)
+        if vacancy_id <= 3:
+            await orm_add_to_cart(session, 2, vacancy_id)
+
+
+def _cart_ids(rows):
+    return [row.vacancy_id for row in rows]
+
+
+def test_cart_page_keyset(run_db):
+    async def test(session):
+        await _fill_carts(session)
+        first = await orm_get_user_cart_page(session, 1, 2)
+        second = await orm_get_user_cart_page(session, 1, 2, cursor=first[-1].id)
+        last = await orm_get_user_cart_page(session, 1, 2, cursor=second[-1].id)
+        after_last = await orm_get_user_cart_page(session, 1, 2, cursor=last[-1].id)
+        back = await orm_get_user_cart_page(session, 1, 2, cursor=last[0].id, backward=True)
+        other = await orm_get_user_cart_page(session, 2, 10)
+        counts = await orm_count_user_carts(session, 1), await orm_count_user_carts(session, 2)
+        return first, second, last, after_last, back, other, counts
+
+    first, second, last, after_last, back, other, counts = run_db(test)
+    assert _cart_ids(first) == [1, 2]
+    assert _cart_ids(second) == [3, 4]
+    assert _cart_ids(last) == [5]
+    assert after_last == []
+    assert _cart_ids(back) == [3, 4]
+    assert _cart_ids(other) == [1, 2, 3]
+    assert counts == (5, 3)
+
+
+def test_cart_paginator_last_page(run_db):
+    async def test(session):
+        await _fill_carts(session)
+
+        async def fetch(limit, offset, cursor, backward):
+            return await orm_get_user_cart_page(session, 1, limit, offset, cursor, backward)
+
+        rows = await orm_get_user_cart_page(session, 1, 2, offset=2)
+        paginator = QueryPaginator(fetch, await orm_count_user_carts(session, 1), page=3, per_page=2, cursor=rows[-1].id)
+        return await paginator.get_page(), paginator
+
+    page, paginator = run_db(test)
+    assert _cart_ids(page) == [5]
+    assert (paginator.page, paginator.pages, paginator.has_previous(), paginator.has_next()) == (3, 3, 2, False)
+
+
+def test_cart_page_reads_only_the_users_index_range(run_db):
+    async def test(session):
+        await _fill_carts(session)
+        statements = []
+        engine = session.bind.sync_engine
+        listener = lambda conn, cursor, statement, parameters, context, executemany: statements.append(
+            (statement, parameters)
+        )
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            await orm_get_user_cart_page(session, 1, 2, cursor=2)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        statement, parameters = statements[-1]
+        connection = await session.connection()
+        plan = await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters))
+        return [row[-1] for row in plan]
+
+    plan = run_db(test)
+    # поиск по (user_id, id) в индексе корзины, без полного прохода по таблице cart
+    assert any("ix_cart_user_id" in step and "user_id=? AND id>?" in step for step in plan)
+    assert not any(step.startswith("SCAN cart") for step in plan)
+
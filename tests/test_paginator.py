@@ -0,0 +1,84 @@
+import asyncio
+
+from utils.paginator import QueryPaginator
+
+
+def make_fetch(rows):
+    """fetch(limit, offset, cursor, backward) поверх отсортированного списка id, как orm_get_*_page."""
+    async def fetch(limit, offset, cursor, backward):
+        if cursor is None:
+            return rows[offset:offset + limit]
+        if backward:
+            return [r for r in rows if r < cursor][-limit:]
+        return [r for r in rows if r > cursor][:limit]
+    return fetch
+
+
+def get_page(rows, total=None, **kwargs):
+    paginator = QueryPaginator(make_fetch(rows), len(rows) if total is None else total, **kwargs)
+    items = asyncio.run(paginator.get_page())
+    return items, paginator
+
+
+def test_first_page_by_number():
+    items, p = get_page(list(range(1, 8)), page=1, per_page=3)
+    assert items == [1, 2, 3]
+    assert (p.page, p.pages, p.has_previous(), p.has_next()) == (1, 3, False, 2)
+
+
+def test_forward_by_cursor():
+    items, p = get_page(list(range(1, 8)), page=2, per_page=3, cursor=3)
+    assert items == [4, 5, 6]
+    assert (p.page, p.has_previous(), p.has_next()) == (2, 1, 3)
+
+
+def test_last_page_by_cursor():
+    items, p = get_page(list(range(1, 8)), page=3, per_page=3, cursor=6)
+    assert items == [7]
+    assert (p.page, p.pages, p.has_next()) == (3, 3, False)
+
+
+def test_backward_by_cursor_keeps_ascending_order():
+    items, p = get_page(list(range(1, 8)), page=2, per_page=3, cursor=7, backward=True)
+    assert items == [4, 5, 6]
+    assert (p.has_previous(), p.has_next()) == (1, 3)
+
+
+def test_backward_to_the_start_fixes_page_number():
+    # номер страницы сбит (записи удалили), но записей перед курсором — ровно одна страница
+    items, p = get_page([1, 2, 3, 10], total=10, page=3, per_page=3, cursor=10, backward=True)
+    assert items == [1, 2, 3]
+    assert (p.page, p.has_previous(), p.has_next()) == (1, False, 2)
+
+
+def test_stale_cursor_falls_back_to_page_number():
+    # за курсором записей не осталось — показываем страницу по номеру
+    items, p = get_page([1, 2, 3, 4], page=2, per_page=3, cursor=9)
+    assert items == [4]
+    assert (p.page, p.has_previous(), p.has_next()) == (2, 1, False)
+
+
+def test_deleted_rows_do_not_hide_the_last_item():
+    # count ещё видит 7 записей, хотя одну удалили: последняя страница не должна звать дальше
+    items, p = get_page([1, 2, 3, 4, 5, 7], total=7, page=2, per_page=3, cursor=3)
+    assert items == [4, 5, 7]
+    assert (p.page, p.pages, p.has_next()) == (2, 2, False)
+
+
+def test_added_rows_are_reachable_despite_stale_count():
+    # count устарел и говорит «это последняя страница», но запись дальше есть
+    items, p = get_page([1, 2, 3, 4, 5, 6, 7], total=6, page=2, per_page=3, cursor=3)
+    assert items == [4, 5, 6]
+    assert (p.pages, p.has_next()) == (3, 3)
+
+
+def test_page_number_is_clamped():
+    items, p = get_page([1, 2, 3], page=9, per_page=2)
+    assert items == [3]
+    assert (p.page, p.has_next()) == (2, False)
+
+
+def test_empty():
+    items, p = get_page([], page=1, per_page=3)
+    assert items == []
+    assert (p.page, p.pages, p.has_previous(), p.has_next()) == (1, 1, False, False)
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from services import llm_matching
+from utils import payload_codec
+from utils.payload_codec import (
+    FORMAT_JSON,
+    FORMAT_MSGPACK,
+    FORMAT_MSGPACK_ZSTD,
+    PayloadCodec,
+    PayloadDecodeError,
+)
+
+PAYLOAD = {
+    "kind": "final_score",
+    "score_overall": 72.5,
+    "matched": ["Опыт с PostgreSQL от 3 лет", "Python"],
+    "per_requirement": [{"req_index": i, "status": 0.5, "years": None, "evidence": ["цитата " * 20]} for i in range(20)],
+    "meta": {"cascade": None},
+}
+
+msgpack_required = pytest.mark.skipif(payload_codec.msgpack is None, reason="msgpack is not installed")
+zstd_required = pytest.mark.skipif(payload_codec.zstandard is None, reason="zstandard is not installed")
+
+
+def test_round_trip():
+    codec = PayloadCodec()
+    assert codec.decode(codec.encode(PAYLOAD)) == PAYLOAD
+
+
+@msgpack_required
+def test_small_payload_is_not_compressed():
+    blob = PayloadCodec().encode({"kind": "requirements", "items": []})
+    assert blob[0] == FORMAT_MSGPACK
+
+
+@msgpack_required
+@zstd_required
+def test_large_payload_is_compressed():
+    blob = PayloadCodec().encode(PAYLOAD)
+    assert blob[0] == FORMAT_MSGPACK_ZSTD
+    assert len(blob) < len(json.dumps(PAYLOAD, ensure_ascii=False).encode("utf-8"))
+
+
+def test_json_body_without_msgpack(monkeypatch):
+    monkeypatch.setattr(payload_codec, "msgpack", None)
+    codec = PayloadCodec(compress_min_bytes=10**9)
+    blob = codec.encode(PAYLOAD)
+    assert blob[0] == FORMAT_JSON
+    assert codec.decode(blob) == PAYLOAD
+
+
+@msgpack_required
+def test_msgpack_blob_without_msgpack_is_a_decode_error(monkeypatch):
+    blob = PayloadCodec().encode({"kind": "x"})
+    monkeypatch.setattr(payload_codec, "msgpack", None)
+    with pytest.raises(PayloadDecodeError):
+        PayloadCodec().decode(blob)
+
+
+@pytest.mark.parametrize("blob", [b"", b"\x7f{}"])
+def test_empty_or_unknown_format_is_a_decode_error(blob):
+    with pytest.raises(PayloadDecodeError):
+        PayloadCodec().decode(blob)
+
+
+def test_cache_row_reads_legacy_json():
+    payload_json = json.dumps(PAYLOAD, ensure_ascii=False)
+    payload, size = llm_matching._decode_row("k" * 64, payload_json, None)
+    assert payload == PAYLOAD
+    assert size == len(payload_json.encode("utf-8"))
+
+
+def test_cache_row_binary_is_sized_by_decoded_payload():
+    blob = PayloadCodec().encode(PAYLOAD)
+    payload, size = llm_matching._decode_row("k" * 64, None, blob)
+    assert payload == PAYLOAD
+    assert size == len(json.dumps(PAYLOAD, ensure_ascii=False).encode("utf-8"))
+
+
+def test_undecodable_cache_row_is_a_miss():
+    assert llm_matching._decode_row("k" * 64, None, b"\x7f") is None
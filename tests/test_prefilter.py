@@ -0,0 +1,92 @@
+import pytest
+
+from services.llm_matching import assemble_final
+from services.prefilter import build_token_index, prefilter_resume, stem, tag_matches
+
+
+def _req(text, tags, must=True, weight=1.0):
+    return {"text": text, "tags": tags, "must": must, "weight": weight}
+
+
+@pytest.mark.parametrize("word, expected", [
+    ("разработка", "разработк"),
+    ("разработкой", "разработк"),
+    ("базами", "баз"),
+    ("testing", "test"),
+    ("pythons", "python"),
+])
+def test_stem_strips_russian_and_english_endings(word, expected):
+    assert stem(word) == expected
+
+
+@pytest.mark.parametrize("token", ["c++", "c#", "k8s", "ios"])
+def test_stem_keeps_technical_tokens(token):
+    assert stem(token) == token
+
+
+def test_tag_matches_word_forms_and_yo():
+    index = build_token_index("Ёмкий опыт разработки микросервисов, работа с базами данных")
+    assert tag_matches("разработка", index)
+    assert tag_matches("база данных", index)
+    assert tag_matches("ёмкий", index)
+    assert not tag_matches("Kubernetes", index)
+
+
+def test_multiword_tag_needs_every_word():
+    index = build_token_index("machine vision")
+    assert not tag_matches("machine learning", index)
+
+
+def test_rejects_below_threshold():
+    reqs = [_req("Python", ["python"]), _req("Docker", ["docker"]), _req("Go", ["golang"]), _req("SQL", ["sql"])]
+    verdict = prefilter_resume("Пишу на Python", reqs, threshold=0.3)
+    assert verdict.score == 0.25
+    assert verdict.reject
+
+
+def test_score_equal_to_threshold_passes():
+    reqs = [_req("Python", ["python"]), _req("Docker", ["docker"]), _req("Go", ["golang"]), _req("SQL", ["sql"])]
+    verdict = prefilter_resume("Пишу на Python", reqs, threshold=0.25)
+    assert not verdict.reject
+
+
+def test_score_is_weighted_and_ignores_optional():
+    reqs = [
+        _req("Python", ["python"], weight=3.0),
+        _req("Docker", ["docker"], weight=1.0),
+        _req("English", ["english"], must=False),
+    ]
+    verdict = prefilter_resume("python developer", reqs, threshold=0.5)
+    assert verdict.score == 0.75
+    assert not verdict.reject
+    assert [r["status"] for r in verdict.per_req] == [1.0, 0.0, 0.0]
+
+
+def test_untagged_requirement_is_neutral_in_score_and_status():
+    reqs = [_req("Коммуникабельность", []), _req("Docker", ["docker"])]
+    verdict = prefilter_resume("ничего подходящего", reqs, threshold=0.5)
+    # непроверенный пункт — половина веса и в доле, и в статусе
+    assert verdict.score == 0.25
+    assert verdict.reject
+    assert [r["status"] for r in verdict.per_req] == [0.5, 0.0]
+
+
+def test_reject_does_not_list_unchecked_requirements_as_missing():
+    reqs = [_req("Коммуникабельность", []), _req("Docker", ["docker"]), _req("Go", ["golang"])]
+    verdict = prefilter_resume("ничего подходящего", reqs, threshold=0.5)
+    assert verdict.reject
+    _, _, matched, missing, _ = assemble_final(reqs, verdict.per_req)
+    assert missing == ["Docker", "Go"]
+    assert matched == []
+
+
+def test_only_untagged_must_requirements_pass():
+    verdict = prefilter_resume("", [_req("Коммуникабельность", []), _req("Ответственность", [])], threshold=0.25)
+    assert verdict.score == 0.5
+    assert not verdict.reject
+
+
+def test_no_must_requirements_never_rejects():
+    verdict = prefilter_resume("", [_req("English", ["english"], must=False)], threshold=0.9)
+    assert verdict.score == 1.0
+    assert not verdict.reject
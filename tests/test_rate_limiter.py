@@ -0,0 +1,95 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services import rate_limiter
+from services.rate_limiter import AdaptiveRateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Виртуальное время: sleep лимитера сдвигает часы и записывает паузу."""
+    state = SimpleNamespace(now=1000.0, sleeps=[])
+
+    async def sleep(seconds):
+        state.sleeps.append(round(seconds, 6))
+        state.now += seconds
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=lambda: state.now))
+    monkeypatch.setattr(rate_limiter, "asyncio", SimpleNamespace(Lock=asyncio.Lock, sleep=sleep))
+    return state
+
+
+def test_request_budget(clock):
+    async def main():
+        limiter = AdaptiveRateLimiter(rpm=60, tpm=1_000_000)
+        for _ in range(60):
+            await limiter.acquire(1)
+        assert clock.sleeps == []
+        await limiter.acquire(1)
+
+    asyncio.run(main())
+    # бюджет исчерпан — следующий запрос ждёт пополнения одного запроса (60 rpm = 1 в секунду)
+    assert clock.sleeps == [1.0]
+
+
+def test_token_budget(clock):
+    async def main():
+        limiter = AdaptiveRateLimiter(rpm=1000, tpm=1000)
+        await limiter.acquire(800)
+        await limiter.acquire(800)
+
+    asyncio.run(main())
+    # осталось 200 токенов, не хватает 600 — при 1000 tpm это 36 секунд
+    assert clock.sleeps == [36.0]
+
+
+def test_request_larger_than_budget_does_not_wait_forever(clock):
+    async def main():
+        limiter = AdaptiveRateLimiter(rpm=1000, tpm=1000)
+        await limiter.acquire(5000)
+
+    asyncio.run(main())
+    assert clock.sleeps == []
+
+
+def test_rate_limited_pauses_and_halves_limits(clock):
+    async def main():
+        limiter = AdaptiveRateLimiter(rpm=60, tpm=1_000_000)
+        limiter.on_rate_limited(retry_after=5)
+        for _ in range(3):
+            await limiter.acquire(1)
+        return limiter.stats()
+
+    stats = asyncio.run(main())
+    # бюджет обнулён; за 5 секунд паузы при 30 rpm накопилось 2.5 запроса,
+    # третьему не хватает половины — это секунда при сниженном лимите
+    assert clock.sleeps == [5.0, 1.0]
+    assert stats["factor"] == 0.5
+    assert stats["rpm"] == 30.0
+    assert stats["rate_limited"] == 1
+
+
+def test_factor_has_floor_and_recovers(clock):
+    limiter = AdaptiveRateLimiter(rpm=60, tpm=1000, min_factor=0.2, recovery_step=0.25)
+    for _ in range(5):
+        limiter.on_rate_limited(retry_after=0)
+    assert limiter.factor == 0.2
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.factor == 1.0
+
+
+def test_waiters_are_counted_in_queue_depth(clock):
+    async def main():
+        limiter = AdaptiveRateLimiter(rpm=1, tpm=1_000_000)
+        await limiter.acquire(1)
+        tasks = [asyncio.create_task(limiter.acquire(1)) for _ in range(3)]
+        await asyncio.sleep(0)
+        depth = limiter.queue_depth
+        await asyncio.gather(*tasks)
+        return depth, limiter.queue_depth
+
+    assert asyncio.run(main()) == (3, 0)
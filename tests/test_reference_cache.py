@@ -0,0 +1,102 @@
+from database.models import Category
+from database.orm_query import orm_create_categories, orm_get_categories
+from database.reference_cache import CATEGORIES, cached_categories, is_dirty, mark_dirty, reference_cache
+
+
+def _names(categories):
+    return [c.name for c in categories]
+
+
+def test_read_is_cached_and_served_from_memory(run_pool):
+    async def test(session_pool):
+        async with session_pool() as session:
+            await orm_create_categories(session, ["IT"])
+        async with session_pool() as session:
+            first = await orm_get_categories(session)
+        async with session_pool() as session:
+            # добавляем в обход orm-функций: кэш об этом не знает
+            session.add(Category(name="Sales"))
+            await session.commit()
+        async with session_pool() as session:
+            second = await orm_get_categories(session)
+        return first, second
+
+    first, second = run_pool(test)
+    assert _names(first) == ["IT"]
+    assert second is first
+
+
+def test_invalidation_during_load_is_not_cached(run_pool):
+    async def test(session_pool):
+        async with session_pool() as session:
+            await orm_create_categories(session, ["IT"])
+        reader = session_pool()
+        execute = reader.execute
+
+        async def execute_then_commit_elsewhere(*args, **kwargs):
+            result = await execute(*args, **kwargs)
+            # старые строки уже прочитаны, а другая сессия успела закоммитить изменение
+            async with session_pool() as writer:
+                writer.add(Category(name="Sales"))
+                mark_dirty(writer, CATEGORIES)
+                await writer.commit()
+            return result
+
+        reader.execute = execute_then_commit_elsewhere
+        stale = await cached_categories(reader)
+        await reader.close()
+        cached = reference_cache.categories
+        async with session_pool() as session:
+            fresh = await orm_get_categories(session)
+        return stale, cached, fresh
+
+    stale, cached, fresh = run_pool(test)
+    assert _names(stale) == ["IT"]
+    assert cached is None
+    assert _names(fresh) == ["IT", "Sales"]
+
+
+def test_own_uncommitted_change_is_not_cached(run_pool):
+    async def test(session_pool):
+        async with session_pool() as session:
+            session.add(Category(name="IT"))
+            mark_dirty(session, CATEGORIES)
+            await session.flush()
+            seen = await cached_categories(session)
+            dirty = is_dirty(session, CATEGORIES)
+            cached = reference_cache.categories
+            await session.rollback()
+            after_rollback = is_dirty(session, CATEGORIES), reference_cache.categories
+        async with session_pool() as session:
+            fresh = await orm_get_categories(session)
+        return seen, dirty, cached, after_rollback, fresh
+
+    seen, dirty, cached, after_rollback, fresh = run_pool(test)
+    # своя незакоммиченная запись видна сессии, но в общий кэш не попадает
+    assert _names(seen) == ["IT"]
+    assert dirty and cached is None
+    assert after_rollback == (False, None)
+    assert fresh == []
+
+
+def test_commit_invalidates_cache(run_pool):
+    async def test(session_pool):
+        async with session_pool() as session:
+            await orm_create_categories(session, ["IT"])
+            await orm_get_categories(session)
+        loaded = reference_cache.categories is not None
+        async with session_pool() as session:
+            session.add(Category(name="Sales"))
+            mark_dirty(session, CATEGORIES)
+            # читатель между mark_dirty и COMMIT снова заполнил бы кэш старыми данными
+            reference_cache.categories = ["stale"]
+            await session.commit()
+        after_commit = reference_cache.categories
+        async with session_pool() as session:
+            fresh = await orm_get_categories(session)
+        return loaded, after_commit, fresh
+
+    loaded, after_commit, fresh = run_pool(test)
+    assert loaded
+    assert after_commit is None
+    assert _names(fresh) == ["IT", "Sales"]
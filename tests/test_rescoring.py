@@ -0,0 +1,100 @@
+import pytest
+
+from database.orm_query import (
+    orm_add_user,
+    orm_add_vacancy,
+    orm_create_categories,
+    orm_get_rescore_job,
+    orm_save_resume,
+    orm_update_rescore_job,
+    orm_update_vacancy,
+)
+from services import rescoring
+
+VACANCY = {"name": "Backend", "description": "d", "requirements": "Python", "image": "i", "category": 1}
+
+
+@pytest.fixture
+def rescored(monkeypatch):
+    """Без LLM и Telegram: пересчёт одного резюме только записывает, что он был."""
+    calls = []
+
+    async def rescore_one(bot, session_pool, sem, vacancy_id, resume_id, content_sha256, file_id):
+        calls.append(resume_id)
+        return True
+
+    async def refresh_checklist(session, vacancy_id):
+        return None
+
+    monkeypatch.setattr(rescoring, "_rescore_one", rescore_one)
+    monkeypatch.setattr(rescoring, "refresh_vacancy_checklist", refresh_checklist)
+    return calls
+
+
+async def _setup(session_pool):
+    async with session_pool() as session:
+        await orm_create_categories(session, ["IT"])
+        vacancy = await orm_add_vacancy(session, VACANCY)
+        await orm_add_user(session, user_id=1)
+        ids = [
+            (await orm_save_resume(session, 1, vacancy.vacancy_id, f"file{n}", f"{n:064x}")).resume_id
+            for n in range(2)
+        ]
+    return vacancy.vacancy_id, ids
+
+
+async def _edit(session_pool, vacancy_id, requirements):
+    async with session_pool() as session:
+        await orm_update_vacancy(session, vacancy_id, {**VACANCY, "requirements": requirements})
+
+
+async def _job(session_pool, vacancy_id):
+    async with session_pool() as session:
+        text_sha = rescoring._text_sha(await rescoring.get_vacancy_text(session, vacancy_id))
+        job = await orm_get_rescore_job(session, vacancy_id, text_sha)
+        return job.status, job.last_resume_id, job.scored
+
+
+def test_text_edited_back_is_rescored(run_pool, rescored):
+    async def test(session_pool):
+        vacancy_id, ids = await _setup(session_pool)
+        await rescoring.rescore_vacancy(None, session_pool, vacancy_id, chat_id=1)
+        await _edit(session_pool, vacancy_id, "Go")
+        await rescoring.rescore_vacancy(None, session_pool, vacancy_id, chat_id=1)
+        await _edit(session_pool, vacancy_id, "Python")
+        await rescoring.rescore_vacancy(None, session_pool, vacancy_id, chat_id=1)
+        return ids, await _job(session_pool, vacancy_id)
+
+    ids, job = run_pool(test)
+    # A, B и снова A — каждый раз пересчитываются все резюме
+    assert rescored == ids * 3
+    assert job == ("done", ids[-1], 2)
+
+
+def test_resume_continues_from_checkpoint(run_pool, rescored):
+    async def test(session_pool):
+        vacancy_id, ids = await _setup(session_pool)
+        await rescoring.rescore_vacancy(None, session_pool, vacancy_id, chat_id=1)
+        rescored.clear()
+        # бот упал после первого резюме
+        async with session_pool() as session:
+            text_sha = rescoring._text_sha(await rescoring.get_vacancy_text(session, vacancy_id))
+            job = await orm_get_rescore_job(session, vacancy_id, text_sha)
+            await orm_update_rescore_job(session, job.job_id, status="running", last_resume_id=ids[0], scored=1)
+        await rescoring.rescore_vacancy(None, session_pool, vacancy_id, chat_id=1, resume=True)
+        return ids, await _job(session_pool, vacancy_id)
+
+    ids, job = run_pool(test)
+    assert rescored == ids[1:]
+    assert job == ("done", ids[-1], 2)
+
+
+def test_resume_skips_finished_job(run_pool, rescored):
+    async def test(session_pool):
+        vacancy_id, ids = await _setup(session_pool)
+        await rescoring.rescore_vacancy(None, session_pool, vacancy_id, chat_id=1)
+        rescored.clear()
+        await rescoring.rescore_vacancy(None, session_pool, vacancy_id, chat_id=1, resume=True)
+
+    run_pool(test)
+    assert rescored == []
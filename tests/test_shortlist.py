@@ -0,0 +1,98 @@
+from database.orm_query import (
+    orm_add_user,
+    orm_add_vacancy,
+    orm_create_categories,
+    orm_get_shortlist_page,
+    orm_save_resume,
+    orm_save_resume_score,
+)
+
+SCORE = {
+    "score_must": 80.0, "score_optional": 0.0,
+    "input_mode": "local_text", "model": "m", "prompt_version": "p", "rules_version": "r",
+}
+
+
+async def _setup(session, scores, checklists=None):
+    """
+    Вакансия и резюме с заданными (overall, must, выполненные требования).
+    checklists — порядок пунктов, по которому оценено каждое резюме (по умолчанию SQL, Docker).
+    """
+    await orm_create_categories(session, ["IT"])
+    vacancy = await orm_add_vacancy(session, {
+        "name": "v", "description": "d", "requirements": "r", "image": "i", "category": 1,
+    })
+    await orm_add_user(session, user_id=1)
+    ids = []
+    for n, (overall, must, met) in enumerate(scores):
+        checklist = checklists[n] if checklists else ("SQL", "Docker")
+        resume = await orm_save_resume(session, 1, vacancy.vacancy_id, f"file{n}", f"{n:064x}")
+        items = [
+            {"req_index": i, "requirement": text, "must": True, "status": 1.0 if text in met else 0.0, "years": None}
+            for i, text in enumerate(checklist)
+        ]
+        await orm_save_resume_score(
+            session, resume.resume_id, vacancy.vacancy_id,
+            {**SCORE, "score_overall": overall, "score_must": must}, items,
+        )
+        ids.append(resume.resume_id)
+    return vacancy.vacancy_id, ids
+
+
+def _ids(rows):
+    return [score.resume_id for score, _, _ in rows]
+
+
+def _cursor(rows, index):
+    score = rows[index][0]
+    return score.score_overall, score.resume_id
+
+
+def test_pages_forward_and_back_with_ties(run_db):
+    async def test(session):
+        vacancy_id, ids = await _setup(session, [(90, 80, ()), (70, 80, ()), (90, 80, ()), (70, 80, ()), (50, 80, ())])
+        first, more1 = await orm_get_shortlist_page(session, vacancy_id, 2)
+        second, more2 = await orm_get_shortlist_page(session, vacancy_id, 2, cursor=_cursor(first, -1))
+        third, more3 = await orm_get_shortlist_page(session, vacancy_id, 2, cursor=_cursor(second, -1))
+        back, more_back = await orm_get_shortlist_page(session, vacancy_id, 2, cursor=_cursor(third, 0), backward=True)
+        start, more_start = await orm_get_shortlist_page(session, vacancy_id, 2, cursor=_cursor(back, 0), backward=True)
+        return ids, [(_ids(first), more1), (_ids(second), more2), (_ids(third), more3),
+                     (_ids(back), more_back), (_ids(start), more_start)]
+
+    ids, pages = run_db(test)
+    # при равной оценке порядок — по resume_id, так что ни одна запись не повторяется и не теряется
+    assert pages == [
+        ([ids[0], ids[2]], True),
+        ([ids[1], ids[3]], True),
+        ([ids[4]], False),
+        ([ids[1], ids[3]], True),
+        ([ids[0], ids[2]], False),
+    ]
+
+
+def test_min_must_filter(run_db):
+    async def test(session):
+        vacancy_id, ids = await _setup(session, [(90, 40, ()), (80, 100, ()), (60, 70, ())])
+        rows, more = await orm_get_shortlist_page(session, vacancy_id, 10, min_must=70)
+        return ids, _ids(rows), more
+
+    ids, rows, more = run_db(test)
+    assert rows == [ids[1], ids[2]]
+    assert not more
+
+
+def test_requirement_filter_uses_text_not_index(run_db):
+    async def test(session):
+        # второе резюме оценено до правки вакансии: Docker тогда был первым пунктом
+        vacancy_id, ids = await _setup(
+            session,
+            [(90, 80, ("SQL",)), (80, 80, ("Docker",)), (70, 80, ("SQL", "Docker"))],
+            checklists=[("SQL", "Docker"), ("Docker", "SQL"), ("SQL", "Docker")],
+        )
+        rows, _ = await orm_get_shortlist_page(session, vacancy_id, 10, requirement="Docker")
+        missing, _ = await orm_get_shortlist_page(session, vacancy_id, 10, requirement="Kubernetes")
+        return ids, _ids(rows), _ids(missing)
+
+    ids, docker, missing = run_db(test)
+    assert docker == [ids[1], ids[2]]
+    assert missing == []
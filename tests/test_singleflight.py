@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    async def main():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+        return calls, results, flight.inflight
+
+    calls, results, inflight = asyncio.run(main())
+    assert calls == 1
+    assert results == ["result"] * 5
+    assert inflight == 0
+
+
+def test_leader_error_is_shared_with_followers():
+    async def main():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_follower_takes_over_when_leader_is_cancelled():
+    async def main():
+        flight = SingleFlight()
+        started = asyncio.Event()
+        calls = []
+
+        async def slow():
+            calls.append("leader")
+            started.set()
+            await asyncio.sleep(10)
+
+        async def fast():
+            calls.append("follower")
+            return "follower result"
+
+        leader = asyncio.create_task(flight.do("k", slow))
+        await started.wait()
+        follower = asyncio.create_task(flight.do("k", fast))
+        await asyncio.sleep(0)
+        leader.cancel()
+        result = await follower
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return calls, result, flight.inflight
+
+    calls, result, inflight = asyncio.run(main())
+    # ведущего отменили — ожидающий не получает CancelledError, а выполняет работу сам
+    assert calls == ["leader", "follower"]
+    assert result == "follower result"
+    assert inflight == 0
+
+
+def test_cancelled_follower_does_not_cancel_leader():
+    async def main():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "done"
+
+        leader = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        release.set()
+        return await leader
+
+    assert asyncio.run(main()) == "done"
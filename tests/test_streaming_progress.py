@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from services import llm_matching
+
+REQS = [
+    {"text": "Python", "tags": ["python"], "must": True, "weight": 1.0, "min_years": None, "level": None},
+    {"text": "Docker", "tags": ["docker"], "must": True, "weight": 1.0, "min_years": None, "level": None},
+    {"text": "SQL", "tags": ["sql"], "must": False, "weight": 1.0, "min_years": None, "level": None},
+]
+
+SINK_DELAY = 0.2
+
+
+class _Latencies:
+    def __init__(self):
+        self.values = []
+
+    def observe(self, value, **labels):
+        self.values.append((labels["call"], value))
+
+
+@pytest.fixture
+def latencies(monkeypatch):
+    recorder = _Latencies()
+    monkeypatch.setattr(llm_matching, "LLM_CALL_SECONDS", recorder)
+    return recorder
+
+
+def _score_with_sink(run_db, sink):
+    async def test(session):
+        token = llm_matching._progress_sink.set(sink)
+        try:
+            return await llm_matching._score_text_incremental(
+                session, "Python developer, Docker", "r" * 64, REQS, "test-model",
+            )
+        finally:
+            llm_matching._progress_sink.reset(token)
+
+    return run_db(test)
+
+
+def test_progress_edits_are_outside_llm_latency(run_db, latencies):
+    sent = []
+
+    async def slow_sink(reqs, per_req):
+        await asyncio.sleep(SINK_DELAY)
+        sent.append([item["req_index"] for item in per_req])
+
+    per_req = _score_with_sink(run_db, slow_sink)
+    assert [item["status"] for item in per_req] == [1.0, 1.0, 0.0]
+    # три пункта пришли, пока шла первая правка, — в LLM-задержку она не попала
+    [(call, latency)] = latencies.values
+    assert call == "score_requirements_from_text"
+    assert latency < SINK_DELAY
+    # правки идут по одной и без пропуска последней версии; все дошли до возврата из оценки
+    assert sent[-1] == [0, 1, 2]
+    assert len(sent) <= 2
+
+
+def test_failing_sink_does_not_break_scoring(run_db, latencies):
+    async def failing_sink(reqs, per_req):
+        raise RuntimeError("message was deleted")
+
+    per_req = _score_with_sink(run_db, failing_sink)
+    assert [item["req_index"] for item in per_req] == [0, 1, 2]
@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+# LRU-кэш в памяти процесса с ограничением по числу записей, байтам и TTL
+class MemoryCache:
+    def __init__(self, max_items: int = 1024, max_bytes: int = 32 * 1024 * 1024, ttl: float = 3600.0):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (value, size, expires_at)
+        self._data: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        value, size, expires_at = item
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, size: int) -> None:
+        if self.max_items <= 0 or size > self.max_bytes:
+            return
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (value, size, time.monotonic() + self.ttl)
+        self.bytes += size
+        while len(self._data) > self.max_items or self.bytes > self.max_bytes:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        if key in self._data:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "items": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._data.pop(key)
+        self.bytes -= size
@@ -1,4 +1,5 @@
 import math
+from typing import Any, Awaitable, Callable
 
 # Простой пагинатор
 class Paginator:
@@ -38,4 +39,66 @@ class Paginator:
         if self.page > 1:
             self.page -= 1
             return self.__get_slice()
-        raise IndexError(f'Previous page does not exist. Use has_previous() to check before.')
\ No newline at end of file
+        raise IndexError(f'Previous page does not exist. Use has_previous() to check before.')
+
+
+# Пагинатор поверх запросов к БД: в память попадает только текущая страница.
+# fetch(limit, offset, cursor, backward) выбирает записи в порядке листания: по курсору (keyset) —
+# после/перед граничной записью соседней страницы, без курсора — по номеру страницы.
+# Одна лишняя запись в сторону листания показывает, есть ли страница дальше, так что
+# номера страниц, сбитые удалёнными или добавленными записями, не прячут крайние записи.
+class QueryPaginator:
+    def __init__(
+        self,
+        fetch: Callable[[int, int, Any, bool], Awaitable[list]],
+        total: int,
+        page: int = 1,
+        per_page: int = 1,
+        cursor: Any = None,
+        backward: bool = False,
+    ):
+        self.fetch = fetch
+        self.per_page = per_page
+        self.len = total
+        self.pages = math.ceil(self.len / self.per_page)
+        self.page = min(max(page, 1), max(self.pages, 1))
+        self.cursor = cursor
+        self.backward = backward
+        self._has_next = False
+        self._has_previous = False
+
+    async def get_page(self):
+        page_items = []
+        if self.cursor is not None:
+            page_items = await self.fetch(self.per_page + 1, 0, self.cursor, self.backward)
+        if page_items and self.backward:
+            # лишняя запись — самая ранняя
+            self._has_previous = len(page_items) > self.per_page
+            self._has_next = True
+            page_items = page_items[-self.per_page:]
+        elif page_items:
+            self._has_next = len(page_items) > self.per_page
+            self._has_previous = True
+            page_items = page_items[:self.per_page]
+        else:
+            # первая страница, устаревший курсор (за ним записей не осталось) или курсора нет
+            page_items = await self.fetch(self.per_page + 1, (self.page - 1) * self.per_page, None, False)
+            self._has_next = len(page_items) > self.per_page
+            self._has_previous = self.page > 1
+            page_items = page_items[:self.per_page]
+        # номер страницы и их число — по тому, что реально нашлось
+        self.page = max(self.page, 2) if self._has_previous else 1
+        if not self._has_next:
+            self.pages = self.page
+        self.pages = max(self.pages, self.page + int(self._has_next))
+        return page_items
+
+    def has_next(self):
+        if self._has_next:
+            return self.page + 1
+        return False
+
+    def has_previous(self):
+        if self._has_previous:
+            return self.page - 1
+        return False
@@ -0,0 +1,66 @@
+import json
+from typing import Any
+
+# msgpack и zstandard — опциональные зависимости: без них payload кодируется в JSON без сжатия
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# первый байт закодированного payload — формат
+FORMAT_MSGPACK = 0x01
+FORMAT_MSGPACK_ZSTD = 0x02
+FORMAT_JSON = 0x03
+FORMAT_JSON_ZSTD = 0x04
+
+
+class PayloadDecodeError(ValueError):
+    """Неизвестный формат или нет библиотеки, которой payload был закодирован."""
+
+
+class PayloadCodec:
+    def __init__(self, zstd_level: int = 3, compress_min_bytes: int = 512):
+        """
+        Бинарное представление кэшированных payload: байт версии формата + msgpack (или JSON),
+        крупные payload дополнительно сжимаются zstd.
+
+        :param zstd_level: Уровень сжатия zstd.
+        :param compress_min_bytes: Payload меньше этого размера не сжимаются.
+        """
+        self.compress_min_bytes = compress_min_bytes
+        self._compressor = zstandard.ZstdCompressor(level=zstd_level) if zstandard else None
+        self._decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+    def encode(self, payload: Any) -> bytes:
+        if msgpack is not None:
+            fmt, fmt_zstd = FORMAT_MSGPACK, FORMAT_MSGPACK_ZSTD
+            body = msgpack.packb(payload, use_bin_type=True)
+        else:
+            fmt, fmt_zstd = FORMAT_JSON, FORMAT_JSON_ZSTD
+            body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if self._compressor is not None and len(body) >= self.compress_min_bytes:
+            compressed = self._compressor.compress(body)
+            if len(compressed) < len(body):
+                return bytes([fmt_zstd]) + compressed
+        return bytes([fmt]) + body
+
+    def decode(self, blob: bytes) -> Any:
+        if not blob:
+            raise PayloadDecodeError("empty payload")
+        fmt, body = blob[0], blob[1:]
+        if fmt in (FORMAT_MSGPACK_ZSTD, FORMAT_JSON_ZSTD):
+            if self._decompressor is None:
+                raise PayloadDecodeError("zstandard is not installed")
+            body = self._decompressor.decompress(body)
+        if fmt in (FORMAT_MSGPACK, FORMAT_MSGPACK_ZSTD):
+            if msgpack is None:
+                raise PayloadDecodeError("msgpack is not installed")
+            return msgpack.unpackb(body, raw=False, strict_map_key=False)
+        if fmt in (FORMAT_JSON, FORMAT_JSON_ZSTD):
+            return json.loads(body)
+        raise PayloadDecodeError(f"unknown payload format {fmt:#x}")